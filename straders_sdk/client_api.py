@@ -1,18 +1,34 @@
+import math
+import requests
 from .models_misc import Waypoint
-from .responses import SpaceTradersResponse
+from .responses import SpaceTradersResponse, RemoteSpaceTradersRespose
 from .client_interface import SpaceTradersClient
 from .responses import SpaceTradersResponse
 from .utils import (
     ApiConfig,
     _url,
     get_and_validate,
+    get_raw,
     patch_and_validate,
     post_and_validate,
     get_and_validate_paginated,
+    iter_and_validate_paginated,
     get_and_validate_page,
+    get_and_validate_async,
+    post_and_validate_async,
+    patch_and_validate_async,
     waypoint_to_system,
+    queue_many,
+    _wait_for_response,
+    _wait_for_raw_response,
 )
 from .resp_local_resp import LocalSpaceTradersRespose  #
+from .request_consumer import (
+    TRAFFIC_NAVIGATION,
+    TRAFFIC_EXTRACTION,
+    TRAFFIC_MARKET_INTEL,
+    TRAFFIC_BULK_SYNC,
+)
 from .models_misc import (
     Waypoint,
     Survey,
@@ -58,7 +74,9 @@ class SpaceTradersApiClient(SpaceTradersClient):
 
     def agents_view_one(self, agent_symbol: str) -> "Agent" or SpaceTradersResponse:
         url = _url(f"/agents/{agent_symbol}")
-        resp = get_and_validate(url, headers=self._headers(), priority=self.priority)
+        resp = get_and_validate(
+            url, headers=self._headers(), priority=self.priority, session=self.session
+        )
         if resp:
             return Agent.from_json(resp.data)
         return resp
@@ -70,7 +88,9 @@ class SpaceTradersApiClient(SpaceTradersClient):
 
     def view_my_self(self) -> "Agent" or SpaceTradersResponse:
         url = _url("my/agent")
-        resp = get_and_validate(url, headers=self._headers(), priority=self.priority)
+        resp = get_and_validate(
+            url, headers=self._headers(), priority=self.priority, session=self.session
+        )
         if resp:
             self.current_agent = Agent.from_json(resp.data)
             self.current_agent_symbol = self.current_agent.symbol
@@ -86,6 +106,7 @@ class SpaceTradersApiClient(SpaceTradersClient):
             50,
             headers=self._headers(),
             priority=self.priority,
+            session=self.session,
         )
         if resp:
             return [Contract.from_json(d) for d in resp.data]
@@ -98,7 +119,9 @@ class SpaceTradersApiClient(SpaceTradersClient):
         if waypoint_symbol == "":
             raise ValueError("waypoint_symbol cannot be empty")
         url = _url(f"systems/{system_symbol}/waypoints/{waypoint_symbol}")
-        resp = get_and_validate(url, headers=self._headers(), priority=self.priority)
+        resp = get_and_validate(
+            url, headers=self._headers(), priority=self.priority, session=self.session
+        )
         if not resp:
             print(resp.error)
             return resp
@@ -126,12 +149,35 @@ class SpaceTradersApiClient(SpaceTradersClient):
             50,
             headers=self._headers(),
             priority=self.priority,
+            session=self.session,
+            traffic_class=TRAFFIC_BULK_SYNC,
         )
         if resp:
             new_wayps = {d["symbol"]: Waypoint.from_json(d) for d in resp.data}
             return new_wayps
         return resp
 
+    def iter_waypoints(self, system_symbol: str):
+        """yields every waypoint in a system, a page at a time, while later pages are still downloading.
+        Stops early (logging the error) if a page fails."""
+        url = _url(f"systems/{system_symbol}/waypoints")
+        for resp in iter_and_validate_paginated(
+            url,
+            20,
+            50,
+            headers=self._headers(),
+            priority=self.priority,
+            session=self.session,
+            traffic_class=TRAFFIC_BULK_SYNC,
+        ):
+            if not resp:
+                logger.error(
+                    "Couldn't fetch waypoints for %s - %s", system_symbol, resp.error
+                )
+                return
+            for d in resp.data:
+                yield Waypoint.from_json(d)
+
     def _headers(self) -> dict:
         if self.token:
             return {"Authorization": f"Bearer {self.token}"}
@@ -140,9 +186,27 @@ class SpaceTradersApiClient(SpaceTradersClient):
     def update(self, response_json: dict):
         pass
 
+    def batch(
+        self, priority: float = None, ttl: float = None, traffic_class: str = None
+    ) -> "ApiBatch":
+        """collects requests and queues them together, in one priority band, when the `with` block ends.
+
+        with client.batch() as batch:
+            extracts = [batch.ship_extract(ship) for ship in miners]
+        results = batch.gather()
+        """
+        return ApiBatch(
+            self,
+            priority=self.priority if priority is None else priority,
+            ttl=ttl,
+            traffic_class=traffic_class,
+        )
+
     def list_factions(self) -> list[Faction] or SpaceTradersResponse:
         url = _url("/factions")
-        resp = get_and_validate_paginated(url, 20, 2)
+        resp = get_and_validate_paginated(
+            url, 20, 2, session=self.session, traffic_class=TRAFFIC_BULK_SYNC
+        )
         if resp:
             return [Faction.from_json(d) for d in resp.data]
         return resp
@@ -152,7 +216,9 @@ class SpaceTradersApiClient(SpaceTradersClient):
         data = {"symbol": callsign, "faction": faction}
         if email is not None:
             data["email"] = email
-        resp = post_and_validate(url, data, priority=self.priority)
+        resp = post_and_validate(
+            url, data, priority=self.priority, session=self.session
+        )
         if resp:
             self.token = resp.data.get("token")
         return resp
@@ -162,7 +228,13 @@ class SpaceTradersApiClient(SpaceTradersClient):
         url = _url(f"my/ships/{ship.name}/orbit")
         if ship.nav.status == "IN_ORBIT":
             return LocalSpaceTradersRespose(None, 0, None, url=url)
-        resp = post_and_validate(url, headers=self._headers(), priority=self.priority)
+        resp = post_and_validate(
+            url,
+            headers=self._headers(),
+            priority=self.priority,
+            session=self.session,
+            traffic_class=TRAFFIC_NAVIGATION,
+        )
         if resp:
             self.update(resp.data)
         return resp
@@ -176,6 +248,8 @@ class SpaceTradersApiClient(SpaceTradersClient):
             data,
             headers=self._headers(),
             priority=self.priority,
+            session=self.session,
+            traffic_class=TRAFFIC_NAVIGATION,
         )
         if resp:
             self.update(resp.data)
@@ -194,6 +268,8 @@ class SpaceTradersApiClient(SpaceTradersClient):
             data,
             headers=self._headers(),
             priority=self.priority + MOVEMENT_OFFSET,
+            session=self.session,
+            traffic_class=TRAFFIC_NAVIGATION,
         )
         if resp:
             self.update(resp.data)
@@ -202,7 +278,9 @@ class SpaceTradersApiClient(SpaceTradersClient):
     def ship_create_chart(self, ship: "Ship"):
         """my/ships/:shipSymbol/chart"""
         url = _url(f"my/ships/{ship.name}/chart")
-        resp = post_and_validate(url, headers=self._headers(), priority=self.priority)
+        resp = post_and_validate(
+            url, headers=self._headers(), priority=self.priority, session=self.session
+        )
         if resp:
             self.update(resp.data)
         return resp
@@ -215,6 +293,7 @@ class SpaceTradersApiClient(SpaceTradersClient):
             url,
             headers=self._headers(),
             priority=self.priority + COOLDOWN_OFFSET,
+            session=self.session,
         )
         if resp:
             self.update(resp.data)
@@ -234,6 +313,7 @@ class SpaceTradersApiClient(SpaceTradersClient):
             url,
             headers=self._headers(),
             priority=self.priority + COOLDOWN_OFFSET,
+            session=self.session,
         )
         if resp:
             self.update(resp.data)
@@ -253,6 +333,8 @@ class SpaceTradersApiClient(SpaceTradersClient):
             data,
             headers=self._headers(),
             priority=self.priority + MOVEMENT_OFFSET,
+            session=self.session,
+            traffic_class=TRAFFIC_NAVIGATION,
         )
         if resp:
             self.update(resp.data)
@@ -267,6 +349,8 @@ class SpaceTradersApiClient(SpaceTradersClient):
             data,
             headers=self._headers(),
             priority=self.priority + COOLDOWN_OFFSET,
+            session=self.session,
+            traffic_class=TRAFFIC_NAVIGATION,
         )
         if resp:
             self.update(resp.data)
@@ -275,7 +359,9 @@ class SpaceTradersApiClient(SpaceTradersClient):
     def ship_negotiate(self, ship: "Ship") -> "Contract" or SpaceTradersResponse:
         "/my/ships/{shipSymbol}/negotiate/contract"
         url = _url(f"my/ships/{ship.name}/negotiate/contract")
-        resp = post_and_validate(url, headers=self._headers(), priority=self.priority)
+        resp = post_and_validate(
+            url, headers=self._headers(), priority=self.priority, session=self.session
+        )
         if resp:
             resp = Contract.from_json(resp.data.get("contract"))
         return resp
@@ -290,7 +376,12 @@ class SpaceTradersApiClient(SpaceTradersClient):
         if ship.seconds_until_cooldown > 0:
             return LocalSpaceTradersRespose("Ship still on cooldown", 0, 4200, url=url)
 
-        resp = post_and_validate(url=url, headers=self._headers(), session=self.session)
+        resp = post_and_validate(
+            url=url,
+            headers=self._headers(),
+            session=self.session,
+            traffic_class=TRAFFIC_EXTRACTION,
+        )
         if resp:
             self.update(resp.data)
             ship.update(resp.data)
@@ -317,6 +408,8 @@ class SpaceTradersApiClient(SpaceTradersClient):
             json=data,
             headers=self._headers(),
             priority=self.priority + COOLDOWN_OFFSET,
+            session=self.session,
+            traffic_class=TRAFFIC_EXTRACTION,
         )
         if resp:
             self.update(resp.data)
@@ -337,7 +430,11 @@ class SpaceTradersApiClient(SpaceTradersClient):
 
         data = {"produce": trade_symbol}
         resp = post_and_validate(
-            url, json=data, headers=self._headers(), session=self.session
+            url,
+            json=data,
+            headers=self._headers(),
+            session=self.session,
+            traffic_class=TRAFFIC_EXTRACTION,
         )
 
         if resp:
@@ -351,7 +448,13 @@ class SpaceTradersApiClient(SpaceTradersClient):
 
         if ship.nav.status == "DOCKED":
             return LocalSpaceTradersRespose(None, 200, None, url=url)
-        resp = post_and_validate(url, headers=self._headers(), priority=self.priority)
+        resp = post_and_validate(
+            url,
+            headers=self._headers(),
+            priority=self.priority,
+            session=self.session,
+            traffic_class=TRAFFIC_NAVIGATION,
+        )
         if resp:
             self.update(resp.data)
             ship.update(resp.data)
@@ -371,6 +474,8 @@ class SpaceTradersApiClient(SpaceTradersClient):
             headers=self._headers(),
             priority=self.priority,
             json=body,
+            session=self.session,
+            traffic_class=TRAFFIC_NAVIGATION,
         )
         if resp:
             self.update(resp.data)
@@ -392,6 +497,7 @@ class SpaceTradersApiClient(SpaceTradersClient):
             data,
             headers=self._headers(),
             priority=self.priority,
+            session=self.session,
         )
         if resp:
             self.update(resp.data)
@@ -427,6 +533,8 @@ class SpaceTradersApiClient(SpaceTradersClient):
             url,
             headers=self._headers(),
             priority=self.priority + COOLDOWN_OFFSET,
+            session=self.session,
+            traffic_class=TRAFFIC_EXTRACTION,
         )
 
         self.update(resp.data)
@@ -450,6 +558,7 @@ class SpaceTradersApiClient(SpaceTradersClient):
             data,
             headers=self._headers(),
             priority=self.priority,
+            session=self.session,
         )
         self.update(resp.data)
 
@@ -465,6 +574,7 @@ class SpaceTradersApiClient(SpaceTradersClient):
             json=data,
             headers=self._headers(),
             priority=self.priority,
+            session=self.session,
         )
         if resp:
             self.update(resp.data)
@@ -483,6 +593,7 @@ class SpaceTradersApiClient(SpaceTradersClient):
             data,
             headers=self._headers(),
             priority=self.priority,
+            session=self.session,
         )
         if resp:
             self.update(resp.data)
@@ -497,7 +608,11 @@ class SpaceTradersApiClient(SpaceTradersClient):
         url = _url(f"my/ships/{ship.name}/jettison")
         data = {"symbol": trade_symbol, "units": quantity}
         resp = post_and_validate(
-            url, data, headers=self._headers(), priority=self.priority
+            url,
+            data,
+            headers=self._headers(),
+            priority=self.priority,
+            session=self.session,
         )
         if resp:
             ship.update(resp.data)
@@ -544,6 +659,8 @@ class SpaceTradersApiClient(SpaceTradersClient):
             page_number,
             headers=self._headers(),
             priority=self.priority,
+            session=self.session,
+            traffic_class=TRAFFIC_BULK_SYNC,
         )
 
         if resp:
@@ -558,14 +675,37 @@ class SpaceTradersApiClient(SpaceTradersClient):
             page_limit=999,
             headers=self._headers(),
             priority=self.priority,
+            session=self.session,
+            traffic_class=TRAFFIC_BULK_SYNC,
         )
         if resp:
             resp = [System.from_json(d) for d in resp.data]
         return resp
 
+    def iter_systems(self):
+        """yields every system in the galaxy, a page at a time, while later pages are still downloading.
+        Stops early (logging the error) if a page fails."""
+        url = _url("systems")
+        for resp in iter_and_validate_paginated(
+            url,
+            per_page=20,
+            page_limit=999,
+            headers=self._headers(),
+            priority=self.priority,
+            session=self.session,
+            traffic_class=TRAFFIC_BULK_SYNC,
+        ):
+            if not resp:
+                logger.error("Couldn't fetch systems - %s", resp.error)
+                return
+            for d in resp.data:
+                yield System.from_json(d)
+
     def systems_view_one(self, system_symbol: str) -> System or SpaceTradersResponse:
         url = _url(f"systems/{system_symbol}")
-        resp = get_and_validate(url, headers=self._headers(), priority=self.priority)
+        resp = get_and_validate(
+            url, headers=self._headers(), priority=self.priority, session=self.session
+        )
         if resp:
             return System.from_json(resp.data)
         return resp
@@ -574,7 +714,13 @@ class SpaceTradersApiClient(SpaceTradersClient):
         self, wp: Waypoint
     ) -> ConstructionSite or SpaceTradersResponse:
         url = _url(f"systems/{wp.system_symbol}/waypoints/{wp.symbol}/construction")
-        resp = get_and_validate(url, headers=self._headers(), priority=self.priority)
+        resp = get_and_validate(
+            url,
+            headers=self._headers(),
+            priority=self.priority,
+            session=self.session,
+            traffic_class=TRAFFIC_MARKET_INTEL,
+        )
         if resp:
             return ConstructionSite.from_json(resp.data)
         return resp
@@ -582,11 +728,33 @@ class SpaceTradersApiClient(SpaceTradersClient):
     def system_market(self, wp: Waypoint) -> Market:
         # /systems/{systemSymbol}/waypoints/{waypointSymbol}/market
         url = _url(f"systems/{wp.system_symbol}/waypoints/{wp.symbol}/market")
-        resp = get_and_validate(url, headers=self._headers(), priority=self.priority)
+        resp = get_and_validate(
+            url,
+            headers=self._headers(),
+            priority=self.priority,
+            session=self.session,
+            traffic_class=TRAFFIC_MARKET_INTEL,
+        )
         if resp:
             resp = Market.from_json(resp.data)
         return resp
 
+    def system_market_struct(
+        self, wp: Waypoint
+    ) -> "MarketStruct" or SpaceTradersResponse:
+        "as system_market, but decoded straight into a models_structs.MarketStruct. Needs msgspec."
+        from .models_structs import decode_market
+
+        resp = get_raw(
+            _url(f"systems/{wp.system_symbol}/waypoints/{wp.symbol}/market"),
+            headers=self._headers(),
+            priority=self.priority,
+            session=self.session,
+            traffic_class=TRAFFIC_MARKET_INTEL,
+        )
+        failed = _failed(resp)
+        return failed if failed is not None else decode_market(resp.content)
+
     def system_shipyard(self, wp: Waypoint) -> Shipyard or SpaceTradersResponse:
         """View the types of ships available at a shipyard.
 
@@ -598,7 +766,13 @@ class SpaceTradersApiClient(SpaceTradersClient):
         """
 
         url = _url(f"systems/{wp.system_symbol}/waypoints/{wp.symbol}/shipyard")
-        resp = get_and_validate(url, headers=self._headers(), priority=self.priority)
+        resp = get_and_validate(
+            url,
+            headers=self._headers(),
+            priority=self.priority,
+            session=self.session,
+            traffic_class=TRAFFIC_MARKET_INTEL,
+        )
 
         if resp:
             return Shipyard.from_json(resp.data)
@@ -608,7 +782,13 @@ class SpaceTradersApiClient(SpaceTradersClient):
     def system_jumpgate(self, wp: Waypoint) -> JumpGate or SpaceTradersResponse:
         """/systems/{systemSymbol}/waypoints/{waypointSymbol}/jump-gate"""
         url = _url(f"systems/{wp.system_symbol}/waypoints/{wp.symbol}/jump-gate")
-        resp = get_and_validate(url, headers=self._headers(), priority=self.priority)
+        resp = get_and_validate(
+            url,
+            headers=self._headers(),
+            priority=self.priority,
+            session=self.session,
+            traffic_class=TRAFFIC_MARKET_INTEL,
+        )
         if resp:
             gate = JumpGate.from_json(wp.symbol, resp.data)
             gate.waypoint_symbol = wp.symbol
@@ -619,7 +799,13 @@ class SpaceTradersApiClient(SpaceTradersClient):
         """/my/ships/{shipSymbol}/cooldown"""
         # /my/ships/{shipSymbol}/cooldown
         url = _url(f"my/ships/{ship.name}/cooldown")
-        resp = get_and_validate(url, headers=self._headers(), priority=self.priority)
+        resp = get_and_validate(
+            url,
+            headers=self._headers(),
+            priority=self.priority,
+            session=self.session,
+            traffic_class=TRAFFIC_EXTRACTION,
+        )
         if resp and "expiration" in resp.data:
             ship.update({"cooldown": resp.data})
         else:
@@ -636,6 +822,8 @@ class SpaceTradersApiClient(SpaceTradersClient):
             10,
             headers=self._headers(),
             priority=self.priority,
+            session=self.session,
+            traffic_class=TRAFFIC_BULK_SYNC,
         )
         if resp:
             resp = {ship["symbol"]: Ship.from_json(ship) for ship in resp.data}
@@ -645,11 +833,70 @@ class SpaceTradersApiClient(SpaceTradersClient):
     def ships_view_one(self, symbol: str) -> "Ship" or SpaceTradersResponse:
         "/my/ships/{shipSymbol}"
         url = _url(f"my/ships/{symbol}")
-        resp = get_and_validate(url, headers=self._headers(), priority=self.priority)
+        resp = get_and_validate(
+            url, headers=self._headers(), priority=self.priority, session=self.session
+        )
         if resp:
             return Ship.from_json(resp.data)
         return resp
 
+    def ships_view_structs(self) -> list["ShipStruct"] or SpaceTradersResponse:
+        """/my/ships, decoded straight from each page's body into models_structs.ShipStruct -
+        no dicts or Ship objects along the way. Needs msgspec."""
+        # msgspec is optional, so is this
+        from .models_structs import decode_ships_page
+
+        url = _url("my/ships")
+        first = get_raw(
+            url,
+            params={"limit": 20, "page": 1},
+            headers=self._headers(),
+            priority=self.priority,
+            session=self.session,
+            traffic_class=TRAFFIC_BULK_SYNC,
+        )
+        failed = _failed(first)
+        if failed is not None:
+            return failed
+        ships, meta = decode_ships_page(first.content)
+        # the same 9 page cap as ships_view
+        last_page = min(9, math.ceil(meta.get("total", len(ships)) / 20))
+        packages = queue_many(
+            [
+                {
+                    "url": url,
+                    "params": {"limit": 20, "page": page},
+                    "headers": self._headers(),
+                }
+                for page in range(2, last_page + 1)
+            ],
+            priority=self.priority,
+            session=self.session,
+            traffic_class=TRAFFIC_BULK_SYNC,
+        )
+        for package in packages:
+            page = _wait_for_raw_response(package, url)
+            failed = _failed(page)
+            if failed is not None:
+                return failed
+            ships.extend(decode_ships_page(page.content)[0])
+        return ships
+
+    def ships_view_one_struct(
+        self, symbol: str
+    ) -> "ShipStruct" or SpaceTradersResponse:
+        "/my/ships/{shipSymbol}, decoded straight into a models_structs.ShipStruct. Needs msgspec."
+        from .models_structs import decode_ship
+
+        resp = get_raw(
+            _url(f"my/ships/{symbol}"),
+            headers=self._headers(),
+            priority=self.priority,
+            session=self.session,
+        )
+        failed = _failed(resp)
+        return failed if failed is not None else decode_ship(resp.content)
+
     def ships_purchase(
         self, ship_type: str, shipyard_waypoint: str
     ) -> tuple[Ship, Agent] or SpaceTradersResponse:
@@ -660,6 +907,7 @@ class SpaceTradersApiClient(SpaceTradersClient):
             data,
             headers=self._headers(),
             priority=self.priority,
+            session=self.session,
         )
         if not resp:
             return resp
@@ -679,6 +927,7 @@ class SpaceTradersApiClient(SpaceTradersClient):
             data,
             headers=self._headers(),
             priority=self.priority,
+            session=self.session,
         )
         return resp
 
@@ -688,7 +937,9 @@ class SpaceTradersApiClient(SpaceTradersClient):
         url = _url(f"/my/contracts/{contract.id}/deliver")
         data = {"shipSymbol": ship.name, "tradeSymbol": trade_symbol, "units": units}
         headers = self._headers()
-        resp = post_and_validate(url, data, headers=headers, priority=self.priority)
+        resp = post_and_validate(
+            url, data, headers=headers, priority=self.priority, session=self.session
+        )
         if not resp:
             print(f"failed to deliver to contract {resp.status_code}, {resp.error}")
             return resp
@@ -697,7 +948,9 @@ class SpaceTradersApiClient(SpaceTradersClient):
     def contracts_fulfill(self, contract: Contract):
         url = _url(f"/my/contracts/{contract.id}/fulfill")
         headers = self._headers()
-        resp = post_and_validate(url, headers=headers, priority=self.priority)
+        resp = post_and_validate(
+            url, headers=headers, priority=self.priority, session=self.session
+        )
         if not resp:
             print(f"failed to fulfill contract {resp.status_code}, {resp.error}")
             return resp
@@ -705,8 +958,425 @@ class SpaceTradersApiClient(SpaceTradersClient):
             contract.update(resp.data["contract"])
         return contract
 
+    # async versions of the hot-path endpoints. These share the rate limit of the synchronous methods,
+    # but the caller awaits the response instead of blocking a thread.
+
+    async def agents_view_one_async(
+        self, agent_symbol: str
+    ) -> "Agent" or SpaceTradersResponse:
+        url = _url(f"/agents/{agent_symbol}")
+        resp = await get_and_validate_async(
+            url, headers=self._headers(), priority=self.priority, session=self.session
+        )
+        if resp:
+            return Agent.from_json(resp.data)
+        return resp
+
+    async def view_my_self_async(self) -> "Agent" or SpaceTradersResponse:
+        url = _url("my/agent")
+        resp = await get_and_validate_async(
+            url, headers=self._headers(), priority=self.priority, session=self.session
+        )
+        if resp:
+            self.current_agent = Agent.from_json(resp.data)
+            self.current_agent_symbol = self.current_agent.symbol
+            return self.current_agent
+        return resp
+
+    async def waypoints_view_one_async(
+        self, waypoint_symbol
+    ) -> Waypoint or SpaceTradersResponse:
+        if waypoint_symbol == "":
+            raise ValueError("waypoint_symbol cannot be empty")
+        system_symbol = waypoint_to_system(waypoint_symbol)
+        url = _url(f"systems/{system_symbol}/waypoints/{waypoint_symbol}")
+        resp = await get_and_validate_async(
+            url, headers=self._headers(), priority=self.priority, session=self.session
+        )
+        if resp:
+            return Waypoint.from_json(resp.data)
+        return resp
+
+    async def systems_view_one_async(
+        self, system_symbol: str
+    ) -> System or SpaceTradersResponse:
+        url = _url(f"systems/{system_symbol}")
+        resp = await get_and_validate_async(
+            url, headers=self._headers(), priority=self.priority, session=self.session
+        )
+        if resp:
+            return System.from_json(resp.data)
+        return resp
+
+    async def system_market_async(self, wp: Waypoint) -> Market or SpaceTradersResponse:
+        url = _url(f"systems/{wp.system_symbol}/waypoints/{wp.symbol}/market")
+        resp = await get_and_validate_async(
+            url,
+            headers=self._headers(),
+            priority=self.priority,
+            session=self.session,
+            traffic_class=TRAFFIC_MARKET_INTEL,
+        )
+        if resp:
+            return Market.from_json(resp.data)
+        return resp
+
+    async def system_shipyard_async(
+        self, wp: Waypoint
+    ) -> Shipyard or SpaceTradersResponse:
+        url = _url(f"systems/{wp.system_symbol}/waypoints/{wp.symbol}/shipyard")
+        resp = await get_and_validate_async(
+            url,
+            headers=self._headers(),
+            priority=self.priority,
+            session=self.session,
+            traffic_class=TRAFFIC_MARKET_INTEL,
+        )
+        if resp:
+            return Shipyard.from_json(resp.data)
+        return resp
+
+    async def ships_view_one_async(self, symbol: str) -> "Ship" or SpaceTradersResponse:
+        url = _url(f"my/ships/{symbol}")
+        resp = await get_and_validate_async(
+            url, headers=self._headers(), priority=self.priority, session=self.session
+        )
+        if resp:
+            return Ship.from_json(resp.data)
+        return resp
+
+    async def ship_cooldown_async(self, ship: "Ship") -> SpaceTradersResponse:
+        url = _url(f"my/ships/{ship.name}/cooldown")
+        resp = await get_and_validate_async(
+            url,
+            headers=self._headers(),
+            priority=self.priority,
+            session=self.session,
+            traffic_class=TRAFFIC_EXTRACTION,
+        )
+        if resp and "expiration" in resp.data:
+            ship.update({"cooldown": resp.data})
+        else:
+            ship._cooldown_expiration = datetime.utcnow()
+        return resp
+
+    async def ship_orbit_async(self, ship: Ship) -> SpaceTradersResponse:
+        url = _url(f"my/ships/{ship.name}/orbit")
+        if ship.nav.status == "IN_ORBIT":
+            return LocalSpaceTradersRespose(None, 0, None, url=url)
+        resp = await post_and_validate_async(
+            url,
+            headers=self._headers(),
+            priority=self.priority,
+            session=self.session,
+            traffic_class=TRAFFIC_NAVIGATION,
+        )
+        if resp:
+            ship.update(resp.data)
+        return resp
+
+    async def ship_dock_async(self, ship: Ship) -> SpaceTradersResponse:
+        url = _url(f"my/ships/{ship.name}/dock")
+        if ship.nav.status == "DOCKED":
+            return LocalSpaceTradersRespose(None, 200, None, url=url)
+        resp = await post_and_validate_async(
+            url,
+            headers=self._headers(),
+            priority=self.priority,
+            session=self.session,
+            traffic_class=TRAFFIC_NAVIGATION,
+        )
+        if resp:
+            ship.update(resp.data)
+        return resp
+
+    async def ship_patch_nav_async(
+        self, ship: Ship, flight_mode: str
+    ) -> SpaceTradersResponse:
+        url = _url(f"my/ships/{ship.name}/nav")
+        data = {"flightMode": flight_mode}
+        resp = await patch_and_validate_async(
+            url,
+            data,
+            headers=self._headers(),
+            priority=self.priority,
+            session=self.session,
+            traffic_class=TRAFFIC_NAVIGATION,
+        )
+        if resp:
+            ship.update({"nav": resp.data})
+        return resp
+
+    async def ship_move_async(
+        self, ship: Ship, dest_waypoint_symbol: str
+    ) -> SpaceTradersResponse:
+        if ship.nav.status == "DOCKED":
+            await self.ship_orbit_async(ship)
+        url = _url(f"my/ships/{ship.name}/navigate")
+        data = {"waypointSymbol": dest_waypoint_symbol}
+        resp = await post_and_validate_async(
+            url,
+            data,
+            headers=self._headers(),
+            priority=self.priority + MOVEMENT_OFFSET,
+            session=self.session,
+            traffic_class=TRAFFIC_NAVIGATION,
+        )
+        if resp:
+            ship.update(resp.data)
+        return resp
+
+    async def ship_refuel_async(
+        self, ship: Ship, from_cargo: bool = False
+    ) -> SpaceTradersResponse:
+        if ship.nav.status == "IN_ORBIT":
+            await self.ship_dock_async(ship)
+        url = _url(f"my/ships/{ship.name}/refuel")
+        resp = await post_and_validate_async(
+            url,
+            json={"fromCargo": from_cargo},
+            headers=self._headers(),
+            priority=self.priority,
+            session=self.session,
+            traffic_class=TRAFFIC_NAVIGATION,
+        )
+        if resp:
+            ship.update(resp.data)
+        return resp
+
+    async def ship_extract_async(
+        self, ship: Ship, survey: Survey = None
+    ) -> SpaceTradersResponse:
+        url = (
+            _url(f"my/ships/{ship.name}/extract/survey")
+            if survey
+            else _url(f"my/ships/{ship.name}/extract")
+        )
+        if not ship.can_extract:
+            return LocalSpaceTradersRespose("Ship cannot extract", 0, 4227, url=url)
+        if ship.seconds_until_cooldown > 0:
+            return LocalSpaceTradersRespose("Ship still on cooldown", 0, 4200, url=url)
+
+        data = survey.to_json() if survey is not None else None
+        resp = await post_and_validate_async(
+            url,
+            json=data,
+            headers=self._headers(),
+            priority=self.priority + COOLDOWN_OFFSET,
+            session=self.session,
+            traffic_class=TRAFFIC_EXTRACTION,
+        )
+        if resp:
+            ship.update(resp.data)
+        return resp
+
+    async def ship_sell_async(
+        self, ship: Ship, symbol: str, quantity: int
+    ) -> SpaceTradersResponse:
+        url = _url(f"my/ships/{ship.name}/sell")
+        if ship.nav.status != "DOCKED":
+            return LocalSpaceTradersRespose(
+                "Ship must be docked to sell", 0, 0, url=url
+            )
+        data = {"symbol": symbol, "units": quantity}
+        resp = await post_and_validate_async(
+            url,
+            data,
+            headers=self._headers(),
+            priority=self.priority,
+            session=self.session,
+        )
+        if resp:
+            ship.update(resp.data)
+        return resp
+
+    async def ship_purchase_cargo_async(
+        self, ship: "Ship", symbol: str, quantity
+    ) -> SpaceTradersResponse:
+        url = _url(f"my/ships/{ship.name}/purchase")
+        data = {"symbol": symbol, "units": quantity}
+        resp = await post_and_validate_async(
+            url,
+            data,
+            headers=self._headers(),
+            priority=self.priority,
+            session=self.session,
+        )
+        if resp:
+            ship.update(resp.data)
+        return resp
+
 
 def dummy_response(class_name, method_name):
     return LocalSpaceTradersRespose(
         "Not implemented in this client", 0, 0, f"{class_name}.{method_name}"
     )
+
+
+def _failed(
+    response: requests.Response or SpaceTradersResponse,
+) -> SpaceTradersResponse or None:
+    "None for a successful requests.Response - otherwise the SpaceTradersResponse saying what went wrong."
+    if not isinstance(response, requests.Response):
+        return response
+    if response.ok:
+        return None
+    return RemoteSpaceTradersRespose(response)
+
+
+class BatchResult:
+    """one request in an ApiBatch. `result()` waits for the response and returns what the matching
+    client method would have - e.g. a Ship for `ships_view_one`, or the response for `ship_extract`.
+    """
+
+    def __init__(self, url: str, parse=None, response: SpaceTradersResponse = None):
+        self.url = url
+        self.package = None
+        self._parse = parse
+        self._response = response
+        self._result = None
+        self._done = response is not None
+        if self._done:
+            self._result = response
+
+    def result(self, ttl: float = None):
+        if self._done:
+            return self._result
+        if self.package is None:
+            raise RuntimeError("the batch hasn't been submitted yet")
+        self._response = _wait_for_response(self.package, self.url, ttl)
+        self._result = self._response
+        if self._response and self._parse is not None:
+            self._result = self._parse(self._response)
+        self._done = True
+        return self._result
+
+
+class ApiBatch:
+    "requests collected by `SpaceTradersApiClient.batch()` - see there."
+
+    def __init__(
+        self,
+        client: SpaceTradersApiClient,
+        priority: float,
+        ttl: float = None,
+        traffic_class: str = None,
+    ) -> None:
+        self.client = client
+        self.priority = priority
+        self.ttl = ttl
+        self.traffic_class = traffic_class
+        self.results: list[BatchResult] = []
+        self._calls = []
+        self.submitted = False
+
+    def __enter__(self) -> "ApiBatch":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.submit()
+
+    def get(self, url: str, params=None, parse=None) -> BatchResult:
+        return self._add({"method": "GET", "url": url, "params": params}, parse)
+
+    def post(self, url: str, json=None, parse=None) -> BatchResult:
+        return self._add({"method": "POST", "url": url, "json": json}, parse)
+
+    def _add(self, call: dict, parse=None) -> BatchResult:
+        if self.submitted:
+            raise RuntimeError("the batch has already been submitted")
+        call["headers"] = self.client._headers()
+        if call["method"] == "POST":
+            call["headers"]["Content-Type"] = "application/json"
+        result = BatchResult(call["url"], parse)
+        self._calls.append((call, result))
+        self.results.append(result)
+        return result
+
+    def _done(self, url: str, response: SpaceTradersResponse) -> BatchResult:
+        "for requests the client would refuse without asking the server, e.g. an extract during cooldown"
+        result = BatchResult(url, response=response)
+        self.results.append(result)
+        return result
+
+    def submit(self) -> list[BatchResult]:
+        "queues everything collected so far - called for you at the end of the `with` block."
+        if self.submitted:
+            return self.results
+        self.submitted = True
+        packages = queue_many(
+            [call for call, _ in self._calls],
+            priority=self.priority,
+            ttl=self.ttl,
+            session=self.client.session,
+            traffic_class=self.traffic_class,
+        )
+        for (_, result), package in zip(self._calls, packages):
+            result.package = package
+        return self.results
+
+    def gather(self) -> list:
+        "waits for every request, and returns their results in the order they were added."
+        self.submit()
+        return [result.result(self.ttl) for result in self.results]
+
+    def _updates_ship(self, ship: Ship):
+        def parse(resp):
+            self.client.update(resp.data)
+            ship.update(resp.data)
+            return resp
+
+        return parse
+
+    def ships_view_one(self, symbol: str) -> BatchResult:
+        return self.get(
+            _url(f"my/ships/{symbol}"), parse=lambda resp: Ship.from_json(resp.data)
+        )
+
+    def ship_cooldown(self, ship: Ship) -> BatchResult:
+        def parse(resp):
+            if "expiration" in resp.data:
+                ship.update({"cooldown": resp.data})
+            else:
+                ship._cooldown_expiration = datetime.utcnow()
+            return resp
+
+        return self.get(_url(f"my/ships/{ship.name}/cooldown"), parse=parse)
+
+    def ship_orbit(self, ship: Ship) -> BatchResult:
+        url = _url(f"my/ships/{ship.name}/orbit")
+        if ship.nav.status == "IN_ORBIT":
+            return self._done(url, LocalSpaceTradersRespose(None, 0, None, url=url))
+        return self.post(url, parse=self._updates_ship(ship))
+
+    def ship_dock(self, ship: Ship) -> BatchResult:
+        url = _url(f"my/ships/{ship.name}/dock")
+        if ship.nav.status == "DOCKED":
+            return self._done(url, LocalSpaceTradersRespose(None, 200, None, url=url))
+        return self.post(url, parse=self._updates_ship(ship))
+
+    def ship_refuel(self, ship: Ship, from_cargo: bool = False) -> BatchResult:
+        "the ship must already be docked - a batch can't dock first and then refuel."
+        url = _url(f"my/ships/{ship.name}/refuel")
+        return self.post(
+            url, json={"fromCargo": from_cargo}, parse=self._updates_ship(ship)
+        )
+
+    def ship_extract(self, ship: Ship, survey: Survey = None) -> BatchResult:
+        url = (
+            _url(f"my/ships/{ship.name}/extract/survey")
+            if survey
+            else _url(f"my/ships/{ship.name}/extract")
+        )
+        if not ship.can_extract:
+            return self._done(
+                url, LocalSpaceTradersRespose("Ship cannot extract", 0, 4227, url=url)
+            )
+        if ship.seconds_until_cooldown > 0:
+            return self._done(
+                url,
+                LocalSpaceTradersRespose("Ship still on cooldown", 0, 4200, url=url),
+            )
+        data = survey.to_json() if survey is not None else None
+        return self.post(url, json=data, parse=self._updates_ship(ship))
@@ -1,3 +1,4 @@
+from contextlib import nullcontext
 from typing import Protocol, runtime_checkable
 from .models_misc import Waypoint, Survey, Market, Shipyard, JumpGate, ConstructionSite
 from .responses import SpaceTradersResponse
@@ -49,6 +50,22 @@ class SpaceTradersClient(Protocol):
     def view_my_contracts(self) -> list["Contract"] or SpaceTradersResponse:
         pass
 
+    def unit_of_work(self):
+        """A context manager that groups the client's writes inside the `with` block into one transaction.
+        does nothing if the client does not have database connectivity."""
+        return nullcontext()
+
+    def flush(self, timeout: float = None) -> bool:
+        """Waits until any writes the client has queued in the background are saved, so a following read will see them.
+        does nothing if the client does not queue its writes."""
+        return True
+
+    def close(self, timeout: float = None) -> bool:
+        """Saves anything the client has queued in the background, and releases its DB connections and threads.
+        does nothing if the client does not queue its writes or have database connectivity.
+        """
+        return True
+
     def release_connection(self):
         """A method that instructs the SDK to release any applicable DB connections back to a connction pool in multi-threaded applications.
         does nothing if the client does not have database connectivity, or if the client does not support connection pooling.
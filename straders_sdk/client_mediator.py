@@ -56,7 +56,10 @@ class SpaceTradersMediatorClient(SpaceTradersClient):
         session=None,
         connection=None,
         priority=5,
+        write_behind=False,
     ) -> None:
+        """`write_behind` queues DB writes for a background writer instead of waiting on each commit -
+        call `flush()` before reading back something you've just written."""
         self.logger = logging.getLogger(__name__)
 
         self.token = token
@@ -72,6 +75,7 @@ class SpaceTradersMediatorClient(SpaceTradersClient):
                 db_pass=db_pass,
                 db_port=db_port,
                 current_agent_symbol=current_agent_symbol,
+                write_behind=write_behind,
             )
             self.logging_client = SpaceTradersPostgresLoggerClient(
                 db_host=db_host,
@@ -116,10 +120,20 @@ class SpaceTradersMediatorClient(SpaceTradersClient):
         self.surveys: dict[str:Survey] = {}
         self._lock = Lock()
 
+    def flush(self, timeout: float = None) -> bool:
+        "waits for any write-behind DB updates and buffered log events to be saved - see `write_behind`."
+        flushed = self.db_client.flush(timeout)
+        return self.logging_client.flush(timeout) and flushed
+
     def release_connection(self):
         self.db_client.release_connection()
         self.logging_client.release_connection()
 
+    def close(self, timeout: float = None) -> bool:
+        "saves any write-behind DB updates and buffered log events, then releases the clients' connections and threads."
+        closed = self.db_client.close(timeout)
+        return self.logging_client.close(timeout) and closed
+
     @property
     def connection(self):
         return self.db_client.connection
@@ -239,11 +253,13 @@ class SpaceTradersMediatorClient(SpaceTradersClient):
 
             new_ships = resp
             self.ships = self.ships | new_ships
-            for ship in self.ships.values():
-                ship: Ship
-                ship = SingletonShips().add_ship(ship)
-                ship.dirty = True  # force a refresh of the ship into the DB
-                self.db_client.update(ship)
+            # the whole fleet in one transaction
+            with self.db_client.unit_of_work():
+                for ship in self.ships.values():
+                    ship: Ship
+                    ship = SingletonShips().add_ship(ship)
+                    ship.dirty = True  # force a refresh of the ship into the DB
+                    self.db_client.update(ship)
             return new_ships
         return resp
 
@@ -424,8 +440,8 @@ class SpaceTradersMediatorClient(SpaceTradersClient):
             (datetime.now() - start).total_seconds(),
         )
         if wayp:
+            # update() writes it through to the DB as well
             self.update(wayp)
-            self.db_client.update(wayp)
             return wayp
         return wayp
 
@@ -461,11 +477,19 @@ class SpaceTradersMediatorClient(SpaceTradersClient):
             system_symbol, new_wayps, (datetime.now() - start).total_seconds()
         )
         if new_wayps:
-            for new_wayp in new_wayps.values():
-                self.db_client.update(new_wayp)
-                self.update(new_wayp)
+            with self.db_client.unit_of_work():
+                for new_wayp in new_wayps.values():
+                    self.update(new_wayp)
         return new_wayps
 
+    def iter_waypoints(self, system_symbol: str):
+        """yields every waypoint in a system straight from the API, writing each page through to the DB
+        while the rest are still downloading."""
+        self.set_connections()
+        for wayp in self.api_client.iter_waypoints(system_symbol):
+            self.update(wayp)
+            yield wayp
+
     def view_my_ships_one(
         self, ship_id: str, force=False
     ) -> Ship or SpaceTradersResponse:
@@ -523,6 +547,16 @@ class SpaceTradersMediatorClient(SpaceTradersClient):
                 self.db_client.update(syst)
             return {d.symbol: d for d in resp}
 
+    def iter_systems(self):
+        """yields every system in the galaxy straight from the API, writing each one through to the DB
+        while the rest are still downloading - a page is let go once its systems are yielded,
+        so only the pages not read yet are held, not the whole galaxy.
+        """
+        self.set_connections()
+        for syst in self.api_client.iter_systems():
+            self.db_client.update(syst)
+            yield syst
+
     def systems_view_one(
         self, system_symbol: str, force=False
     ) -> System or SpaceTradersResponse:
@@ -953,8 +987,9 @@ class SpaceTradersMediatorClient(SpaceTradersClient):
         )
         if resp:
             ship.update(resp.data)
-            self.db_client.update(ship)
-            self.db_client.update(resp.data)
+            with self.db_client.unit_of_work():
+                self.db_client.update(ship)
+                self.db_client.update(resp.data)
             self.ships[ship.name] = ship
         return resp
 
@@ -1134,8 +1169,9 @@ class SpaceTradersMediatorClient(SpaceTradersClient):
         )
         if resp:
             ship.update(resp.data)
-            self.db_client.update(ship)
-            self.db_client.update(resp.data)
+            with self.db_client.unit_of_work():
+                self.db_client.update(ship)
+                self.db_client.update(resp.data)
         return resp
 
     def ship_sell(
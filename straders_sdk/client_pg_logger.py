@@ -10,14 +10,34 @@ from .pg_pieces.upsert_ship import _upsert_damage_event
 from straders_sdk.utils import (
     try_execute_select,
     try_execute_upsert,
+    try_execute_values,
     waypoint_to_system,
 )
+from .resp_local_resp import LocalSpaceTradersRespose
+from .write_behind import WriteBehindQueue, close_at_exit
+from time import monotonic
 import psycopg2
 import uuid
 import json
 import logging
 from .pg_connection_pool import PGConnectionPool as PG
 
+# events are buffered and written in batches, rather than a round trip and a commit per API call.
+# a batch goes out every LOG_FLUSH_EVENTS events, or LOG_FLUSH_SECONDS after the first event in it - whichever comes first.
+LOG_FLUSH_EVENTS = 50
+LOG_FLUSH_SECONDS = 0.5
+LOG_MAX_BUFFERED = 10000
+# a batch that fails is retried with the next one, this many times, before its events are given up on.
+LOG_WRITE_ATTEMPTS = 3
+
+_LOG_SQL = """INSERT INTO public.logging(
+	event_name, event_timestamp, agent_name, ship_symbol, session_id, endpoint_name, new_credits, status_code, error_code, event_params, duration_seconds, event_priority)
+	VALUES %s on conflict do nothing;"""
+# the timestamp is when the event was logged, not when its batch was written - so it's passed as an age.
+_LOG_TEMPLATE = (
+    "(%s, NOW() - make_interval(secs => %s), %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"
+)
+
 
 class SpaceTradersPostgresLoggerClient(SpaceTradersClient):
     token: str = None
@@ -41,6 +61,18 @@ class SpaceTradersPostgresLoggerClient(SpaceTradersClient):
 
         self.current_agent_symbol = current_agent_symbol
         utils.st_log_client = self
+        self._unwritten = []
+        self._unwritten_attempts = 0
+        self._events = WriteBehindQueue(
+            self._write_events,
+            max_pending=LOG_MAX_BUFFERED,
+            batch_size=LOG_FLUSH_EVENTS,
+            linger_seconds=LOG_FLUSH_SECONDS,
+            name=f"PGLogger-{self.session_id[:8]}",
+            coalesce=False,
+        )
+        # don't lose the last few events when the process exits
+        close_at_exit(self)
 
     @property
     def connection(self):
@@ -64,6 +96,87 @@ class SpaceTradersPostgresLoggerClient(SpaceTradersClient):
         else:
             raise ValueError("Connection must be a psycopg2 connection object")
 
+    def flush(self, timeout: float = None) -> bool:
+        "writes every buffered event - False if `timeout` passed first."
+        return self._events.flush(timeout)
+
+    def close(self, timeout: float = None) -> bool:
+        "drains the event buffer, stops the writer, and hands the client's connection back to the pool."
+        flushed = self._events.close(timeout)
+        if flushed and self._unwritten:
+            # one last go at a batch that failed, now the writer has stopped
+            self._write_events([])
+        self.release_connection()
+        return flushed and not self._unwritten
+
+    def _queue_event(
+        self,
+        event_name,
+        ship_name,
+        endpoint_name=None,
+        new_credits=None,
+        status_code=0,
+        error_code=0,
+        event_params=None,
+        duration_seconds=None,
+        priority=None,
+    ) -> SpaceTradersResponse:
+        try:
+            self._events.put(
+                (
+                    monotonic(),
+                    event_name,
+                    self.current_agent_symbol,
+                    ship_name,
+                    self.session_id,
+                    endpoint_name,
+                    new_credits,
+                    status_code,
+                    error_code,
+                    json.dumps(event_params if event_params is not None else {}),
+                    duration_seconds,
+                    priority,
+                )
+            )
+        except RuntimeError as err:  # closed
+            return LocalSpaceTradersRespose(
+                error=str(err), status_code=0, error_code=0, url=f"{__name__}.log_event"
+            )
+        return LocalSpaceTradersRespose(None, None, None, url=f"{__name__}.log_event")
+
+    def _write_events(self, events: list):
+        """runs on the buffer's writer thread - on a connection of its own, since the ship threads share the client's,
+        checked out for the batch and handed straight back. Events from a batch that failed go out again with this one.
+        """
+        events = self._unwritten + events
+        now = monotonic()
+        rows = [(event[1], now - event[0], *event[2:]) for event in events]
+        connection = self.connection_pool.get_connection()
+        try:
+            resp = try_execute_values([(_LOG_SQL, rows, _LOG_TEMPLATE)], connection)
+        finally:
+            if connection is not None:
+                self.connection_pool.return_connection(connection)
+        if resp:
+            self._unwritten, self._unwritten_attempts = [], 0
+            return
+        self._unwritten_attempts += 1
+        if self._unwritten_attempts >= LOG_WRITE_ATTEMPTS:
+            self.logger.error(
+                "Couldn't log %s events because %s - giving up on them",
+                len(rows),
+                resp.error,
+            )
+            self._unwritten, self._unwritten_attempts = [], 0
+            return
+        self.logger.warning(
+            "Couldn't log %s events because %s - retrying with the next batch",
+            len(rows),
+            resp.error,
+        )
+        # the oldest go first if the database stays away long enough for them to pile up
+        self._unwritten = events[-LOG_MAX_BUFFERED:]
+
     def log_beginning(
         self,
         behaviour_name: str,
@@ -109,42 +222,17 @@ class SpaceTradersPostgresLoggerClient(SpaceTradersClient):
         if behaviour_params is None:
             behaviour_params = {}
         behaviour_params["script_name"] = behaviour_name
-        sql = """INSERT INTO public.logging( event_name, event_timestamp, agent_name, ship_symbol, session_id, endpoint_name, new_credits, status_code, error_code, event_params)
-        values (%s, NOW(), %s, %s, %s, %s, %s, %s, %s, %s) on conflict(ship_symbol, event_timestamp) do nothing;"""
-        return try_execute_upsert(
-            sql=sql,
-            params=(
-                event_name,
-                self.current_agent_symbol,
-                ship_name,
-                self.session_id,
-                None,
-                starting_credits,
-                0,
-                0,
-                json.dumps(behaviour_params),
-            ),
+        return self._queue_event(
+            event_name,
+            ship_name,
+            new_credits=starting_credits,
+            event_params=behaviour_params,
         )
 
     def log_custom_event(
         self, event_name, ship_name, event_params={}
     ) -> SpaceTradersResponse:
-        sql = """INSERT INTO public.logging( event_name, event_timestamp, agent_name, ship_symbol, session_id, endpoint_name, new_credits, status_code, error_code, event_params)
-        values (%s, NOW(), %s, %s, %s, %s, %s, %s, %s, %s) on conflict(ship_symbol, event_timestamp) do nothing;"""
-        return try_execute_upsert(
-            sql=sql,
-            params=(
-                event_name,
-                self.current_agent_symbol,
-                ship_name,
-                self.session_id,
-                None,
-                None,
-                0,
-                0,
-                json.dumps(event_params),
-            ),
-        )
+        return self._queue_event(event_name, ship_name, event_params=event_params)
 
     def log_event(
         self,
@@ -177,32 +265,17 @@ class SpaceTradersPostgresLoggerClient(SpaceTradersClient):
 
         if isinstance(ship_name, Ship):
             ship_name = ship_name.name
-        sql = """INSERT INTO public.logging(
-	event_name, event_timestamp, agent_name, ship_symbol, session_id, endpoint_name, new_credits, status_code, error_code, event_params, duration_seconds, event_priority)
-	VALUES (%s, NOW(), %s, %s, %s, %s, %s, %s, %s, %s, %s, %s) on conflict (event_timestamp, ship_symbol) do nothing;"""
-
-        resp = try_execute_upsert(
-            sql,
-            (
-                event_name,
-                self.current_agent_symbol,
-                ship_name,
-                self.session_id,
-                endpoint_name,
-                new_credits,
-                status_code,
-                error_code,
-                json.dumps(event_params),
-                duration_seconds,
-                priority,
-            ),
-            self.connection,
-        )
-        # if not resp:
-        #    logging.error("Couldn't log event %s because %s", event_name, resp.error)
-        # else:
-        #    logging.debug("Logged event %s - %s", event_name, status_code)
-        return resp
+        return self._queue_event(
+            event_name,
+            ship_name,
+            endpoint_name,
+            new_credits,
+            status_code,
+            error_code,
+            event_params,
+            duration_seconds,
+            priority,
+        )
 
     def update(self, update_obj: SpaceTradersResponse):
         if isinstance(update_obj, SpaceTradersResponse):
@@ -36,9 +36,53 @@ from .pg_pieces.construction_sites import (
 from .resp_local_resp import LocalSpaceTradersRespose
 from .models_misc import RouteNode, ConstructionSite
 from .models_ship import Ship, ShipInventory, ShipNav, ShipModule, ShipMount
-from .utils import try_execute_select, try_execute_upsert
+from .utils import try_execute_select, try_execute_upsert, unit_of_work
 import psycopg2
 from .constants import ORBITAL_TYPES, PARENT_TYPES
+from .write_behind import WriteBehindQueue, close_at_exit
+
+_UPSERTABLE = (
+    JumpGate,
+    Survey,
+    Waypoint,
+    Shipyard,
+    Market,
+    Ship,
+    System,
+    Agent,
+    Contract,
+    ConstructionSite,
+)
+
+
+# waypoints with their traits and chart in one query - not a trait query and a chart query per waypoint.
+_WAYPOINTS_SQL = """SELECT w.waypoint_symbol, w.type, w.system_symbol, w.x, w.y --0-4
+    , w.checked, w.modifiers, w.under_construction, w.parent_symbol, w.orbital_symbols --5-9
+    , wc.submitted_by, wc.submitted_on --10-11
+    , coalesce(
+        (SELECT json_agg(json_build_array(wt.trait_symbol, wt.name, wt.description))
+        FROM waypoint_traits wt WHERE wt.waypoint_symbol = w.waypoint_symbol)
+    , '[]') --12
+FROM waypoints w
+LEFT JOIN waypoint_charts wc ON w.waypoint_symbol = wc.waypoint_symbol"""
+
+
+def _waypoint_from_row(row) -> Waypoint:
+    "a row of _WAYPOINTS_SQL"
+    chart = {"submittedBy": row[10], "submittedOn": row[11]} if row[10] else {}
+    return Waypoint(
+        row[2],
+        row[0],
+        row[1],
+        row[3],
+        row[4],
+        orbits=row[8],
+        orbitals=[{"symbol": o} for o in row[9] or []],
+        traits=[WaypointTrait(*trait) for trait in row[12]],
+        chart=chart,
+        modifiers=row[6],
+        under_construction=row[7],
+    )
 
 
 class SpaceTradersPostgresClient(SpaceTradersClient):
@@ -53,7 +97,11 @@ class SpaceTradersPostgresClient(SpaceTradersClient):
         db_pass,
         current_agent_symbol,
         db_port=None,
+        write_behind=False,
     ) -> None:
+        """with `write_behind`, `update` queues the object and returns straight away - a background writer saves
+        queued objects in batches, latest state wins. Call `flush()` before a read that needs its own writes.
+        """
         if not db_host or not db_name or not db_user or not db_pass:
             raise ValueError("Missing database connection information")
         self._connection = None
@@ -64,6 +112,12 @@ class SpaceTradersPostgresClient(SpaceTradersClient):
         self.logger = logging.getLogger(__name__)
         self._ship_mounts = {}
         self._ship_modules = {}
+        self.write_behind = None
+        if write_behind:
+            self.write_behind = WriteBehindQueue(
+                self._write_batch, name=f"WriteBehind-{current_agent_symbol}"
+            )
+            close_at_exit(self)
 
     @property
     def connection(self):
@@ -74,11 +128,27 @@ class SpaceTradersPostgresClient(SpaceTradersClient):
             self._connection = self.connection_pool.get_connection()
         return self._connection
 
+    def unit_of_work(self):
+        """groups every write made inside the `with` block into one transaction on this client's connection -
+        committed once at the end, or not at all if anything fails."""
+        return unit_of_work(self.connection)
+
     def release_connection(self):
         if self._connection:
             self.connection_pool.return_connection(self._connection)
             self._connection = None
 
+    def close(self, timeout: float = None) -> bool:
+        """writes everything still queued, stops the write-behind writer, and hands the connection back to the pool.
+        Later updates are written straight away. False if `timeout` passed before the queue drained.
+        """
+        flushed = True
+        if self.write_behind is not None:
+            flushed = self.write_behind.close(timeout)
+            self.write_behind = None
+        self.release_connection()
+        return flushed
+
     def assign_connection(self, connection):
         if isinstance(connection, psycopg2.extensions.connection):
             self._connection = connection
@@ -90,28 +160,66 @@ class SpaceTradersPostgresClient(SpaceTradersClient):
 
     def update(self, update_obj) -> SpaceTradersResponse:
         "Accepts objects and stores them in the DB"
+        if self.write_behind is not None and isinstance(update_obj, _UPSERTABLE):
+            self.write_behind.put(update_obj)
+            return LocalSpaceTradersRespose(
+                None, None, None, url=f"{__name__}.update (queued)"
+            )
+        return self._upsert(update_obj, self.connection)
+
+    def _upsert(self, update_obj, connection) -> SpaceTradersResponse:
         if isinstance(update_obj, JumpGate):
-            return _upsert_jump_gate(update_obj, self.connection)
+            return _upsert_jump_gate(update_obj, connection)
         if isinstance(update_obj, Survey):
-            return _upsert_survey(update_obj, self.connection)
+            return _upsert_survey(update_obj, connection)
         if isinstance(update_obj, Waypoint):
-            return _upsert_waypoint(update_obj, self.connection)
+            return _upsert_waypoint(update_obj, connection)
         if isinstance(update_obj, Shipyard):
-            return _upsert_shipyard(update_obj, self.connection)
+            return _upsert_shipyard(update_obj, connection)
         if isinstance(update_obj, Market):
-            return _upsert_market(update_obj, self.connection)
+            return _upsert_market(update_obj, connection)
         if isinstance(update_obj, Ship):
-            return _upsert_ship(update_obj, self.connection)
+            return _upsert_ship(update_obj, connection)
         if isinstance(update_obj, System):
-            return _upsert_system(update_obj, self.connection)
+            return _upsert_system(update_obj, connection)
         if isinstance(update_obj, Agent):
-            return _upsert_agent(update_obj, self.connection)
+            return _upsert_agent(update_obj, connection)
         if isinstance(update_obj, Contract):
-            return _upsert_contract(
-                self.current_agent_symbol, update_obj, self.connection
-            )
+            return _upsert_contract(self.current_agent_symbol, update_obj, connection)
         if isinstance(update_obj, ConstructionSite):
-            return _upsert_construction_site(update_obj, self.connection)
+            return _upsert_construction_site(update_obj, connection)
+
+    def _write_batch(self, objects: list):
+        """the write-behind writer - a batch is one transaction, on a connection of its own,
+        checked out for the batch and handed straight back."""
+        connection = self.connection_pool.get_connection()
+        try:
+            self._write_batch_on(objects, connection)
+        finally:
+            if connection is not None:
+                self.connection_pool.return_connection(connection)
+
+    def _write_batch_on(self, objects: list, connection):
+        with unit_of_work(connection) as unit:
+            for update_obj in objects:
+                self._upsert(update_obj, connection)
+        if unit:
+            return
+        # don't let one bad object lose the whole batch
+        self.logger.warning(
+            "Write-behind batch failed (%s) - retrying one by one", unit.error
+        )
+        for update_obj in objects:
+            with unit_of_work(connection) as unit:
+                self._upsert(update_obj, connection)
+            if not unit:
+                self.logger.error("Couldn't write %s - %s", update_obj, unit.error)
+
+    def flush(self, timeout: float = None) -> bool:
+        "waits until every queued write-behind update has been written - False if `timeout` passed first."
+        if self.write_behind is None:
+            return True
+        return self.write_behind.flush(timeout)
 
     def register(self, callsign, faction="COSMIC", email=None) -> SpaceTradersResponse:
         return dummy_response(__class__.__name__, "register")
@@ -185,45 +293,13 @@ class SpaceTradersPostgresClient(SpaceTradersClient):
             Either a dict of Waypoint objects or a SpaceTradersResponse object on failure.
         """
 
-        sql = """SELECT w.waypoint_symbol, type, system_symbol, x, y --0-4
-         , checked, modifiers, under_construction, parent_symbol, orbital_symbols --5-9 
-        FROM waypoints w 
-        left join waypoint_charts wc on w.waypoint_symbol = wc.waypoint_symbol 
-         
-           WHERE system_symbol = %s"""
+        sql = _WAYPOINTS_SQL + " WHERE w.system_symbol = %s"
         rows = try_execute_select(sql, (system_symbol,), self.connection)
+        if not isinstance(rows, list):
+            return rows
         waypoints = {}
-
         for row in rows:
-            waypoint_symbol = row[0]
-            new_sql = """SELECT * FROM waypoint_traits WHERE waypoint_symbol = %s"""
-            trait_rows = try_execute_select(
-                new_sql, (waypoint_symbol,), self.connection
-            )
-            traits = []
-            for trait_row in trait_rows:
-                traits.append(WaypointTrait(trait_row[1], trait_row[2], trait_row[3]))
-            chart = {
-                "waypointSymbol": row[6],
-                "submittedBy": row[7],
-                "submittedOn": row[8],
-            }
-            #            orbitals = [{"symbol": o} for o in row[9] or []]
-
-            orbitals = [{"symbol": o} for o in row[9] or []]
-
-            waypoint = Waypoint(
-                row[2],
-                row[0],
-                row[1],
-                row[3],
-                row[4],
-                orbitals=orbitals,
-                traits=traits,
-                chart=chart,
-                modifiers=row[6],
-                under_construction=row[7],
-            )
+            waypoint = _waypoint_from_row(row)
             waypoints[waypoint.symbol] = waypoint
         return waypoints
 
@@ -239,49 +315,11 @@ class SpaceTradersPostgresClient(SpaceTradersClient):
 
         Returns:
             Either a Waypoint object or a SpaceTradersResponse object on failure."""
-        sql = """SELECT waypoint_symbol, type, system_symbol, x, y --0-4
-         , checked, modifiers, under_construction, parent_symbol, orbital_symbols --5-9
-FROM waypoints WHERE waypoint_symbol = %s LIMIT 1;"""
+        sql = _WAYPOINTS_SQL + " WHERE w.waypoint_symbol = %s LIMIT 1;"
         rows = try_execute_select(sql, (waypoint_symbol,), self.connection)
-        waypoints = []
-
-        for row in rows:
-            waypoint_symbol = row[0]
-            new_sql = """SELECT * FROM waypoint_traits WHERE waypoint_symbol = %s"""
-
-            trait_rows = try_execute_select(
-                new_sql, (waypoint_symbol,), self.connection
-            )
-            traits = []
-            chart_sql = """select waypoint_symbol, submitted_by, submitted_on from waypoint_charts
-where waypoint_symbol = %s"""
-            chart_rows = try_execute_select(
-                chart_sql, (waypoint_symbol,), self.connection
-            )
-            if chart_rows:
-                chart = {
-                    "submittedBy": chart_rows[0][1],
-                    "submittedOn": chart_rows[0][2],
-                }
-            else:
-                chart = {}
-            orbitals = [{"symbol": o} for o in row[9] or []]
-
-            for trait_row in trait_rows:
-                traits.append(WaypointTrait(trait_row[1], trait_row[2], trait_row[3]))
-            waypoint = Waypoint(
-                row[2],
-                row[0],
-                row[1],
-                row[3],
-                row[4],
-                orbitals=orbitals,
-                traits=traits,
-                chart=chart,
-                modifiers=row[6],
-                under_construction=row[7],
-            )
-            waypoints.append(waypoint)
+        if not isinstance(rows, list):
+            return rows
+        waypoints = [_waypoint_from_row(row) for row in rows]
 
         if len(waypoints) > 0:
             waypoints[0]: Waypoint
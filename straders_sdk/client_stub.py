@@ -1,3 +1,4 @@
+from contextlib import nullcontext
 from typing import Protocol
 from .models_misc import Waypoint, Survey, Market
 from .responses import SpaceTradersResponse
@@ -12,6 +13,15 @@ class SpaceTradersStubClient:
     def update(self, update_obj):
         pass
 
+    def unit_of_work(self):
+        return nullcontext()
+
+    def flush(self, timeout: float = None) -> bool:
+        return True
+
+    def close(self, timeout: float = None) -> bool:
+        return True
+
     def register(self, callsign, faction="COSMIC", email=None) -> SpaceTradersResponse:
         pass
 
@@ -457,14 +457,7 @@ class Waypoint:
     def from_json(cls, json_data: dict):
         # a waypoint can be a fully scanned thing, or a stub from scanning the system.
         # future C'tri - there are actually two different kinds of waypoint, SystemWaypoint and Waypoint.
-        if "orbitals" not in json_data:
-            json_data["orbitals"] = []
-        if "traits" not in json_data:
-            json_data["traits"] = []
-        if "chart" not in json_data:
-            json_data["chart"] = {}
-        if "faction" not in json_data:
-            json_data["faction"] = {}
+        # read defaults with .get rather than writing them back - the caller's dict is left untouched.
         modifiers = [s["symbol"] for s in json_data.get("modifiers", [])]
 
         return_obj = cls(
@@ -474,10 +467,10 @@ class Waypoint:
             json_data["x"],
             json_data["y"],
             json_data.get("orbits", ""),
-            json_data["orbitals"],
-            json_data["traits"],
-            json_data["chart"],
-            json_data["faction"],
+            json_data.get("orbitals", []),
+            json_data.get("traits", []),
+            json_data.get("chart", {}),
+            json_data.get("faction", {}),
             modifiers,
             json_data.get("isUnderConstruction", False),
         )
@@ -593,8 +586,9 @@ class System(SymbolClass):
     def from_json(cls, json_data: dict):
         wayps = []
         for wp in json_data.get("waypoints", []):
-            wp["systemSymbol"] = json_data["symbol"]
-            wayps.append(Waypoint.from_json(wp))
+            wayps.append(
+                Waypoint.from_json({**wp, "systemSymbol": json_data["symbol"]})
+            )
         return cls(
             json_data["symbol"],
             json_data["sectorSymbol"],
@@ -782,7 +776,10 @@ class RateLimitDetails:
             response.headers.get("x-ratelimit-reset"), DATE_FORMAT
         )
         self.limit_burst: int = int(response.headers.get("x-ratelimit-burst"))
+        # despite its name, x-ratelimit-per-second is the length of the burst window in seconds, not a rate -
+        # the live API sends limit 2, burst 30, per-second 60: 2 requests a second, plus 30 more per 60 seconds.
         self.limit_per_second: int = int(response.headers.get("x-ratelimit-per-second"))
+        self.burst_window_seconds: int = self.limit_per_second
         pass
 
 
@@ -75,6 +75,19 @@ class SingletonShips:
             return self.ships[ship.name].merge(ship)
 
 
+# which parts of a ship need writing to the DB - `dirty` means all of them.
+DIRTY_FLAGS = (
+    "dirty",
+    "cargo_dirty",
+    "nav_dirty",
+    "fuel_dirty",
+    "mounts_dirty",
+    "frame_dirty",
+    "engine_dirty",
+    "cooldown_dirty",
+)
+
+
 class Ship:
     name: str
     role: str
@@ -288,6 +301,18 @@ class Ship:
 
         pass
 
+    def take_dirty_flags(self) -> set:
+        "the names of the dirty flags that are set - clearing them, so changes from here on are flagged afresh."
+        flags = {flag for flag in DIRTY_FLAGS if getattr(self, flag)}
+        for flag in flags:
+            setattr(self, flag, False)
+        return flags
+
+    def restore_dirty_flags(self, flags: set):
+        "puts back flags taken by `take_dirty_flags` - e.g. when the write they were taken for didn't happen."
+        for flag in flags:
+            setattr(self, flag, True)
+
     def mark_clean(self):
         self.dirty = False
         self.cargo_dirty = False
@@ -0,0 +1,294 @@
+"""Typed, single-pass decoding of API responses, using msgspec structs.
+
+This is an optional fast path for the hot endpoints - fleet, market, waypoint and system snapshots.
+The decoders go straight from the response bytes to `__slots__`-backed struct instances in one pass,
+without building intermediate dicts. The structs mirror the API's json schema (snake_case field names),
+they are not the behaviour-rich classes in models_ship / models_misc - the `from_json` classmethods
+on those remain the compatibility path.
+
+Requires `msgspec` (pip install msgspec), which isn't a hard dependency of the SDK.
+
+SpaceTradersApiClient's `ships_view_structs`, `ships_view_one_struct` and `system_market_struct` use them,
+or fetch the undecoded response yourself with utils.get_raw:
+
+    response = get_raw(url, headers=headers, priority=5)
+    ships = decode_ships(response.content)
+"""
+
+from typing import Optional
+import msgspec
+
+
+class _Model(msgspec.Struct, kw_only=True, rename="camel", gc=False):
+    pass
+
+
+class RouteWaypointStruct(_Model):
+    symbol: str
+    type: str
+    system_symbol: str
+    x: int
+    y: int
+
+
+class ShipRouteStruct(_Model):
+    destination: RouteWaypointStruct
+    origin: RouteWaypointStruct
+    departure_time: str
+    arrival: str
+    departure: Optional[RouteWaypointStruct] = None
+
+
+class ShipNavStruct(_Model):
+    system_symbol: str
+    waypoint_symbol: str
+    route: ShipRouteStruct
+    status: str
+    flight_mode: str
+
+
+class ShipRequirementsStruct(_Model):
+    power: int = 0
+    crew: int = 0
+    slots: int = 0
+
+
+class ShipFrameStruct(_Model):
+    symbol: str
+    name: str
+    description: str
+    module_slots: int
+    mounting_points: int
+    fuel_capacity: int
+    requirements: ShipRequirementsStruct
+    condition: float = 0
+    integrity: float = 0
+
+
+class ShipReactorStruct(_Model):
+    symbol: str
+    name: str
+    description: str
+    power_output: int
+    requirements: ShipRequirementsStruct
+    condition: float = 0
+    integrity: float = 0
+
+
+class ShipEngineStruct(_Model):
+    symbol: str
+    name: str
+    description: str
+    speed: int
+    requirements: ShipRequirementsStruct
+    condition: float = 0
+    integrity: float = 0
+
+
+class ShipModuleStruct(_Model):
+    symbol: str
+    name: str
+    description: str = ""
+    requirements: ShipRequirementsStruct = msgspec.field(
+        default_factory=ShipRequirementsStruct
+    )
+    capacity: Optional[int] = None
+    range: Optional[int] = None
+
+
+class ShipMountStruct(_Model):
+    symbol: str
+    name: str
+    description: str = ""
+    requirements: ShipRequirementsStruct = msgspec.field(
+        default_factory=ShipRequirementsStruct
+    )
+    strength: Optional[int] = None
+    deposits: list[str] = []
+
+
+class ShipCrewStruct(_Model):
+    current: int
+    capacity: int
+    required: int
+    rotation: str
+    morale: int
+    wages: int
+
+
+class ShipFuelConsumedStruct(_Model):
+    amount: int
+    timestamp: str
+
+
+class ShipFuelStruct(_Model):
+    current: int
+    capacity: int
+    consumed: Optional[ShipFuelConsumedStruct] = None
+
+
+class ShipCooldownStruct(_Model):
+    ship_symbol: str
+    total_seconds: int
+    remaining_seconds: int
+    expiration: Optional[str] = None
+
+
+class ShipCargoItemStruct(_Model):
+    symbol: str
+    name: str
+    description: str
+    units: int
+
+
+class ShipCargoStruct(_Model):
+    capacity: int
+    units: int
+    inventory: list[ShipCargoItemStruct] = []
+
+
+class ShipRegistrationStruct(_Model):
+    name: str
+    faction_symbol: str
+    role: str
+
+
+class ShipStruct(_Model):
+    symbol: str
+    registration: ShipRegistrationStruct
+    nav: ShipNavStruct
+    frame: ShipFrameStruct
+    reactor: ShipReactorStruct
+    engine: ShipEngineStruct
+    crew: Optional[ShipCrewStruct] = None
+    cooldown: Optional[ShipCooldownStruct] = None
+    modules: list[ShipModuleStruct] = []
+    mounts: list[ShipMountStruct] = []
+    cargo: Optional[ShipCargoStruct] = None
+    fuel: Optional[ShipFuelStruct] = None
+
+
+class WaypointTraitStruct(_Model):
+    symbol: str
+    name: str = ""
+    description: str = ""
+
+
+class WaypointOrbitalStruct(_Model):
+    symbol: str
+
+
+class WaypointStruct(_Model):
+    symbol: str
+    type: str
+    system_symbol: str
+    x: int
+    y: int
+    orbitals: list[WaypointOrbitalStruct] = []
+    orbits: Optional[str] = None
+    traits: list[WaypointTraitStruct] = []
+    modifiers: list[WaypointTraitStruct] = []
+    chart: Optional[dict] = None
+    faction: Optional[dict] = None
+    is_under_construction: bool = False
+
+
+class SystemWaypointStruct(_Model):
+    symbol: str
+    type: str
+    x: int
+    y: int
+    orbitals: list[WaypointOrbitalStruct] = []
+    orbits: Optional[str] = None
+
+
+class SystemStruct(_Model):
+    symbol: str
+    sector_symbol: str
+    type: str
+    x: int
+    y: int
+    waypoints: list[SystemWaypointStruct] = []
+    factions: list[dict] = []
+
+
+class MarketTradeGoodStruct(_Model):
+    symbol: str
+    name: str = ""
+    description: str = ""
+
+
+class MarketTradeGoodListingStruct(_Model):
+    symbol: str
+    trade_volume: int
+    type: str
+    supply: str
+    purchase_price: int
+    sell_price: int
+    activity: Optional[str] = None
+
+
+class MarketStruct(_Model):
+    symbol: str
+    exports: list[MarketTradeGoodStruct] = []
+    imports: list[MarketTradeGoodStruct] = []
+    exchange: list[MarketTradeGoodStruct] = []
+    trade_goods: list[MarketTradeGoodListingStruct] = []
+    transactions: list[dict] = []
+
+
+def _envelope_decoder(data_type) -> msgspec.json.Decoder:
+    "a decoder for the API's {'data': ..., 'meta': ...} envelope - only `data` is returned."
+    envelope = msgspec.defstruct(
+        "Envelope",
+        [("data", data_type), ("meta", Optional[dict], None)],
+        kw_only=True,
+    )
+    return msgspec.json.Decoder(envelope)
+
+
+_SHIP_DECODER = _envelope_decoder(ShipStruct)
+_SHIPS_DECODER = _envelope_decoder(list[ShipStruct])
+_WAYPOINT_DECODER = _envelope_decoder(WaypointStruct)
+_WAYPOINTS_DECODER = _envelope_decoder(list[WaypointStruct])
+_SYSTEM_DECODER = _envelope_decoder(SystemStruct)
+_MARKET_DECODER = _envelope_decoder(MarketStruct)
+
+
+# each decoder takes the raw response body, and raises msgspec.ValidationError if it doesn't match the schema.
+
+
+def decode_ship(content: bytes) -> ShipStruct:
+    "/my/ships/{shipSymbol}"
+    return _SHIP_DECODER.decode(content).data
+
+
+def decode_ships(content: bytes) -> list[ShipStruct]:
+    "a page of /my/ships"
+    return _SHIPS_DECODER.decode(content).data
+
+
+def decode_ships_page(content: bytes) -> tuple[list[ShipStruct], dict]:
+    "a page of /my/ships, with its meta - total, page & limit"
+    envelope = _SHIPS_DECODER.decode(content)
+    return envelope.data, envelope.meta or {}
+
+
+def decode_waypoint(content: bytes) -> WaypointStruct:
+    "/systems/{systemSymbol}/waypoints/{waypointSymbol}"
+    return _WAYPOINT_DECODER.decode(content).data
+
+
+def decode_waypoints(content: bytes) -> list[WaypointStruct]:
+    "a page of /systems/{systemSymbol}/waypoints"
+    return _WAYPOINTS_DECODER.decode(content).data
+
+
+def decode_system(content: bytes) -> SystemStruct:
+    "/systems/{systemSymbol}"
+    return _SYSTEM_DECODER.decode(content).data
+
+
+def decode_market(content: bytes) -> MarketStruct:
+    "/systems/{systemSymbol}/waypoints/{waypointSymbol}/market"
+    return _MARKET_DECODER.decode(content).data
@@ -5,17 +5,34 @@ import logging
 import re
 import datetime
 from ..resp_local_resp import LocalSpaceTradersRespose
-from ..utils import try_execute_upsert
+from ..utils import try_execute_upsert, unit_of_work
 
 # from psycopg2 import connection
 
 
 def _upsert_ship(ship: Ship, connection, owner: Agent = None):
+    """writes every dirty part of the ship in one transaction - if any statement fails, none of them are written.
+
+    The dirty flags are taken off the ship before writing, so anything that changes meanwhile is flagged afresh.
+    If the transaction rolls back - this one, or an outer unit of work it joined - they're put back.
+    """
     try:
         match = re.findall(r"(.*)-[0-9A-F]+", ship.name)
         owner_name = match[0]
     except:
         return
+    with unit_of_work(connection) as unit:
+        flags = ship.take_dirty_flags()
+        unit.on_rollback(lambda: ship.restore_dirty_flags(flags))
+        resp = _upsert_ship_parts(ship, connection, owner_name, flags, owner)
+    if not unit:
+        return unit.response()
+    return resp
+
+
+def _upsert_ship_parts(
+    ship: Ship, connection, owner_name: str, flags: set, owner: Agent = None
+):
     resp = LocalSpaceTradersRespose(None, 0, 0, url=f"{__name__}._upsert_ship")
     owner_faction = "" if not owner else owner.starting_faction
     sql = """INSERT into ships (ship_symbol, agent_name, faction_symbol, ship_role, cargo_capacity
@@ -34,7 +51,7 @@ def _upsert_ship(ship: Ship, connection, owner: Agent = None):
             last_updated = NOW() at time zone 'utc';
 
             """
-    if ship.dirty or ship.fuel_dirty or ship.cargo_dirty:
+    if "dirty" in flags or "fuel_dirty" in flags or "cargo_dirty" in flags:
         modules = [m if isinstance(m, str) else m.symbol for m in ship.modules]
         mounts = [m if isinstance(m, str) else m.symbol for m in ship.mounts]
         resp = try_execute_upsert(
@@ -55,39 +72,38 @@ def _upsert_ship(ship: Ship, connection, owner: Agent = None):
         )
         if not resp:
             return resp
-    if ship.mounts_dirty or ship.dirty:
+    if "mounts_dirty" in flags or "dirty" in flags:
         resp = _upsert_ship_mounts(ship, connection)
         if not resp:
             logging.warning("Failed to upsert ship mounts because %s", resp.error)
             return resp
 
-    if ship.cargo_dirty or ship.dirty:
+    if "cargo_dirty" in flags or "dirty" in flags:
         resp = _upsert_ship_cargo(ship, connection)
         if not resp:
             logging.warning("Failed to upsert ship cargo because %s", resp.error)
             return resp
 
-    if ship.nav_dirty or ship.dirty:
+    if "nav_dirty" in flags or "dirty" in flags:
         resp = _upsert_ship_nav(ship, connection)
         if not resp:
             logging.warning("Failed to upsert ship nav because %s", resp.error)
             return resp
-    if ship.dirty or ship.frame_dirty:
+    if "dirty" in flags or "frame_dirty" in flags:
         resp = _upsert_ship_frame(ship, connection)
         if not resp:
             logging.warning("Failed to upsert ship frame because %s", resp.error)
             return resp
-    if ship.engine_dirty or ship.dirty:
+    if "engine_dirty" in flags or "dirty" in flags:
         resp = _upsert_ship_engine(ship, connection)
         if not resp:
             logging.warning("Failed to upsert ship engine because %s", resp.error)
             return resp
-    if ship.cooldown_dirty:
+    if "cooldown_dirty" in flags:
         resp = _upsert_ship_cooldown(ship, connection)
         if not resp:
             logging.warning("Failed to upsert ship cooldown because %s", resp.error)
             return resp
-    ship.mark_clean()
     return resp
 
 
@@ -3,10 +3,17 @@ import psycopg2
 
 from ..models_misc import System
 from ..pg_pieces.upsert_waypoint import _upsert_waypoint
-from ..utils import try_execute_upsert
+from ..utils import try_execute_upsert, unit_of_work
 
 
 def _upsert_system(system: System, connection):
+    "the system and all its waypoints, committed together."
+    with unit_of_work(connection) as unit:
+        _upsert_system_parts(system, connection)
+    return unit.response()
+
+
+def _upsert_system_parts(system: System, connection):
     try:
         sql = """INSERT INTO systems (system_symbol, type, sector_symbol, x, y)
                 VALUES (%s, %s, %s, %s, %s)
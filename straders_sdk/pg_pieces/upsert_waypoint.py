@@ -2,10 +2,17 @@ import psycopg2
 
 
 from ..models_misc import Waypoint, WaypointTrait
-from ..utils import try_execute_upsert
+from ..utils import try_execute_upsert, unit_of_work
 
 
 def _upsert_waypoint(waypoint: Waypoint, connection):
+    "the waypoint, its traits and its chart, as one transaction."
+    with unit_of_work(connection) as unit:
+        _upsert_waypoint_parts(waypoint, connection)
+    return unit.response()
+
+
+def _upsert_waypoint_parts(waypoint: Waypoint, connection):
     checked = (
         len(waypoint.traits) > 0 or waypoint.is_charted
     )  # a system waypoint will not return any traits. Even if it's uncharted, we've checked it.
@@ -0,0 +1,294 @@
+"""A local stand-in for api.spacetraders.io that replays recorded responses.
+
+Point the SDK at it with `ApiConfig(base_url=server.base_url)` to load test the consumer and clients offline.
+Responses are delayed by a configurable latency model, and every response carries the real x-ratelimit-* headers -
+requests over the limit get a 429, just like the real server.
+
+Traffic files are json lines, one response per line:
+    {"method": "GET", "path": "/v2/systems/X1-TEST", "query": {"page": "1"}, "status": 200, "body": {"data": {...}}}
+`path` may contain `*` wildcards, and `query` is optional - if given, every key must match the request's query string.
+Use `TrafficRecorder` as a consumer handler to record real traffic in this format.
+
+    python -m straders_sdk.replay_server traffic.jsonl --port 8080 --latency-ms 250
+"""
+
+import argparse
+import fnmatch
+import json
+import logging
+import random
+import threading
+import urllib.parse
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import sleep
+
+import requests
+
+from .request_consumer import TokenBucket
+from .utils import DATE_FORMAT
+
+
+class RecordedTraffic:
+    "the recorded responses, matched by method, path and (optionally) query string - first match wins."
+
+    def __init__(self, entries: list = None) -> None:
+        self.entries = entries or []
+
+    @classmethod
+    def from_file(cls, path: str) -> "RecordedTraffic":
+        entries = []
+        with open(path, "r", encoding="utf-8") as file:
+            for line in file:
+                if line.strip():
+                    entries.append(json.loads(line))
+        return cls(entries)
+
+    def add(self, method: str, path: str, body: dict, status: int = 200, query=None):
+        self.entries.append(
+            {
+                "method": method,
+                "path": path,
+                "query": query or {},
+                "status": status,
+                "body": body,
+            }
+        )
+
+    def match(self, method: str, path: str, query: dict) -> dict or None:
+        for entry in self.entries:
+            if entry.get("method", "GET").upper() != method.upper():
+                continue
+            if not fnmatch.fnmatchcase(path, entry["path"]):
+                continue
+            expected_query = entry.get("query") or {}
+            if all(
+                str(query.get(key)) == str(value)
+                for key, value in expected_query.items()
+            ):
+                return entry
+        return None
+
+
+class TrafficRecorder:
+    "a RequestConsumer handler that appends every response to a traffic file RecordedTraffic can load."
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+
+    def __call__(self, response: requests.Response):
+        parsed = urllib.parse.urlparse(response.url)
+        query = dict(urllib.parse.parse_qsl(parsed.query))
+        try:
+            body = response.json() if response.content else {}
+        except ValueError:
+            return
+        entry = {
+            "method": response.request.method if response.request else "GET",
+            "path": parsed.path,
+            "query": query,
+            "status": response.status_code,
+            "body": body,
+        }
+        with self._lock, open(self.path, "a", encoding="utf-8") as file:
+            file.write(json.dumps(entry) + "\n")
+
+
+class LatencyModel:
+    "each response is delayed by `base_ms`, plus up to `jitter_ms` of uniformly random extra delay."
+
+    def __init__(self, base_ms: float = 0, jitter_ms: float = 0) -> None:
+        self.base_ms = base_ms
+        self.jitter_ms = jitter_ms
+
+    def sample(self) -> float:
+        "returns a delay in seconds"
+        return (self.base_ms + random.uniform(0, self.jitter_ms)) / 1000
+
+
+class ServerRateLimit:
+    """the server's rate limiting - a steady-state bucket plus a burst bucket, per token.
+    Produces the same x-ratelimit-* headers as the real server."""
+
+    def __init__(
+        self, limit_per_second: int = 2, burst_limit: int = 30, burst_period: int = 60
+    ) -> None:
+        self.limit_per_second = limit_per_second
+        self.burst_limit = burst_limit
+        self.burst_period = burst_period
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _buckets_for(self, key: str) -> tuple:
+        if key not in self._buckets:
+            self._buckets[key] = (
+                TokenBucket(self.limit_per_second, self.limit_per_second),
+                TokenBucket(self.burst_limit, self.burst_limit / self.burst_period),
+            )
+        return self._buckets[key]
+
+    def check(self, key: str) -> tuple[bool, dict]:
+        "takes a token for `key` if there is one. Returns whether the request is allowed, and the headers to send."
+        with self._lock:
+            steady, burst = self._buckets_for(key)
+            allowed = steady.try_take() or burst.try_take()
+            reset_in = steady.seconds_until_token()
+            headers = {
+                "x-ratelimit-type": "IP-based",
+                "x-ratelimit-limit": str(self.limit_per_second),
+                "x-ratelimit-remaining": str(int(steady.tokens)),
+                "x-ratelimit-reset": (
+                    datetime.utcnow() + timedelta(seconds=reset_in)
+                ).strftime(DATE_FORMAT),
+                "x-ratelimit-burst": str(self.burst_limit),
+                # the real server sends the burst window's length under this name - see RateLimitDetails
+                "x-ratelimit-per-second": str(self.burst_period),
+            }
+            if not allowed:
+                headers["retry-after"] = f"{reset_in:.3f}"
+        return allowed, headers
+
+
+class ReplayServer:
+    """serves `traffic` on http://host:port/ from a background thread.
+    Port 0 picks a free port - read `base_url` once it has started."""
+
+    def __init__(
+        self,
+        traffic: RecordedTraffic,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: LatencyModel = None,
+        rate_limit: ServerRateLimit = None,
+    ) -> None:
+        self.traffic = traffic
+        self.latency = latency or LatencyModel()
+        self.rate_limit = rate_limit or ServerRateLimit()
+        self.logger = logging.getLogger("ReplayServer")
+        self.request_count = 0
+        self.rate_limited_count = 0
+        self.unmatched_count = 0
+        self._counter_lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "ReplayServer":
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, daemon=True, name="ReplayServer"
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "ReplayServer":
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def _count(self, counter: str):
+        with self._counter_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def respond(self, method: str, raw_path: str, headers) -> tuple[int, dict, dict]:
+        "works out the status, headers and body for a request - separate from the handler so it's easy to test."
+        self._count("request_count")
+        parsed = urllib.parse.urlparse(raw_path)
+        query = dict(urllib.parse.parse_qsl(parsed.query))
+        key = headers.get("Authorization") or "anonymous"
+
+        allowed, response_headers = self.rate_limit.check(key)
+        if not allowed:
+            self._count("rate_limited_count")
+            body = {
+                "error": {
+                    "message": "You have reached your API limit. Please wait and try again.",
+                    "code": 429,
+                    "data": {"retryAfter": float(response_headers["retry-after"])},
+                }
+            }
+            return 429, response_headers, body
+
+        entry = self.traffic.match(method, parsed.path, query)
+        if entry is None:
+            self._count("unmatched_count")
+            body = {
+                "error": {
+                    "message": f"No recorded response for {method} {parsed.path}",
+                    "code": 404,
+                }
+            }
+            return 404, response_headers, body
+        return entry.get("status", 200), response_headers, entry.get("body", {})
+
+    def _handler_class(self):
+        server = self
+
+        class ReplayRequestHandler(BaseHTTPRequestHandler):
+            def _reply(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                if length:
+                    self.rfile.read(length)
+                sleep(server.latency.sample())
+                status, headers, body = server.respond(
+                    self.command, self.path, self.headers
+                )
+                content = json.dumps(body).encode() if body is not None else b""
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(content)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(content)
+
+            do_GET = _reply
+            do_POST = _reply
+            do_PATCH = _reply
+
+            def log_message(self, format, *args):
+                server.logger.debug(format, *args)
+
+        return ReplayRequestHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("traffic", help="path to a json lines traffic file")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--limit-per-second", type=int, default=2)
+    parser.add_argument("--burst", type=int, default=30)
+    parser.add_argument("--burst-period", type=int, default=60)
+    args = parser.parse_args()
+
+    server = ReplayServer(
+        RecordedTraffic.from_file(args.traffic),
+        host=args.host,
+        port=args.port,
+        latency=LatencyModel(args.latency_ms, args.jitter_ms),
+        rate_limit=ServerRateLimit(
+            args.limit_per_second, args.burst, args.burst_period
+        ),
+    )
+    print(f"Replaying {args.traffic} on {server.base_url}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
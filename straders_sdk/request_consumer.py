@@ -1,38 +1,681 @@
 from datetime import datetime, timedelta
-from dateutil import parser
-from threading import Event, Thread
+from threading import Event, Thread, Lock, Semaphore
+from concurrent.futures import ThreadPoolExecutor, Future, InvalidStateError
 from requests import PreparedRequest
-from time import sleep
+from time import sleep, monotonic
 import requests
-from queue import PriorityQueue
+from queue import PriorityQueue, Queue, Empty, Full
+from collections import deque
+import heapq
+import itertools
 import logging
+import random
+import re
+import urllib.parse
+from .transport import TransportConfig, create_session, connect_failed
 
-# this consumer should be a singleton.
-# it will have a priority queue of special request objects
+# there is one consumer per rate limit key (the bearer token), created on demand and kept in a registry.
+# each one has a priority queue of special request objects
 # request objects have a priority, a time of addition to the queue, a request object, and an event.
 
 instance = None
 
+# defaults match the server's published limits - 2 requests per second, with a burst of 30 requests per 60 seconds.
+# they are overwritten by the x-ratelimit-* headers as soon as the first response comes back.
+DEFAULT_LIMIT_PER_SECOND = 2
+DEFAULT_BURST_LIMIT = 30
+DEFAULT_BURST_PERIOD = 60
+IDLE_POLL_SECONDS = 0.05
+
+# network failures are retried with exponential backoff and jitter, without holding up the rest of the queue.
+RETRY_BASE_SECONDS = 1
+RETRY_MAX_SECONDS = 60
+DEFAULT_MAX_RETRIES = 5
+
+
+# response handlers run on their own workers, with a bounded backlog - when it's full, dispatching blocks (backpressure).
+HANDLER_WORKERS = 2
+HANDLER_BACKLOG = 1000
+
+# a request that has been waiting for a minute is treated as one priority level more urgent than a new one.
+AGING_PRIORITY_PER_SECOND = 1 / 60
+# monotonic, process-wide enqueue sequence - next() on itertools.count is atomic under the GIL.
+_sequence = itertools.count()
+# guards PackageedRequest.waiters - coalesced callers attach and detach from any thread
+_waiters_lock = Lock()
+
+
+# traffic classes share the queue by weight (weighted fair queuing) - when it's saturated, each class with requests waiting
+# gets sends in proportion to its weight, so latency-critical actions keep their headroom and background syncs still progress.
+# numeric priority still orders requests within a class.
+TRAFFIC_NAVIGATION = "navigation"
+TRAFFIC_EXTRACTION = "extraction"
+TRAFFIC_MARKET_INTEL = "market_intel"
+TRAFFIC_BULK_SYNC = "bulk_sync"
+TRAFFIC_GENERAL = "general"
+DEFAULT_TRAFFIC_CLASS = TRAFFIC_GENERAL
+DEFAULT_TRAFFIC_CLASS_WEIGHTS = {
+    TRAFFIC_NAVIGATION: 8,
+    TRAFFIC_EXTRACTION: 4,
+    TRAFFIC_GENERAL: 4,
+    TRAFFIC_MARKET_INTEL: 2,
+    TRAFFIC_BULK_SYNC: 1,
+}
+
+
+class RequestExpiredError(TimeoutError):
+    "the request's deadline passed before it could be sent, so it was dropped."
+
+
+# methods that do the same thing however many times they're sent. Anything else (e.g. a POST to purchase)
+# is only retried if it never reached the server - otherwise the caller gets the error, and decides.
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+
+def is_retryable(request: PreparedRequest, error: Exception) -> bool:
+    "whether a request whose send raised `error` is safe to send again."
+    return request.method in IDEMPOTENT_METHODS or connect_failed(error)
+
+
+def retry_delay(attempt: int) -> float:
+    "seconds to wait before retry number `attempt` (1-based) - exponential backoff with 'equal' jitter."
+    delay = min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** (attempt - 1))
+    return random.uniform(delay / 2, delay)
+
+
+class TokenBucket:
+    "refills continuously at `refill_rate` tokens per second, up to `capacity` tokens."
+
+    def __init__(self, capacity: float, refill_rate: float) -> None:
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.tokens = capacity
+        self._last_refill = monotonic()
+
+    def refill(self, now: float = None):
+        now = now if now is not None else monotonic()
+        elapsed = max(0, now - self._last_refill)
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_rate)
+        self._last_refill = now
+
+    def seconds_until_token(self, now: float = None) -> float:
+        self.refill(now)
+        if self.tokens >= 1:
+            return 0
+        if self.refill_rate <= 0:
+            return float("inf")
+        return (1 - self.tokens) / self.refill_rate
+
+    def try_take(self, now: float = None) -> bool:
+        self.refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def drain(self):
+        self.refill()
+        self.tokens = 0
+
+
+class RateLimiter:
+    """Steady-state and burst token buckets, kept in line with the server's x-ratelimit-* headers.
+
+    Requests draw from the steady bucket first, and only dip into the burst bucket once it's empty.
+    """
+
+    def __init__(
+        self,
+        limit_per_second: float = DEFAULT_LIMIT_PER_SECOND,
+        burst_limit: float = DEFAULT_BURST_LIMIT,
+        burst_period: float = DEFAULT_BURST_PERIOD,
+    ) -> None:
+        self.steady = TokenBucket(limit_per_second, limit_per_second)
+        self.burst = TokenBucket(burst_limit, burst_limit / burst_period)
+        self.blocked_until = 0
+        self._lock = Lock()
+        self.logger = logging.getLogger("RateLimiter")
+
+    def seconds_until_available(self) -> float:
+        "how long until a request can be sent. 0 means one can go right now."
+        with self._lock:
+            now = monotonic()
+            if self.blocked_until > now:
+                return self.blocked_until - now
+            return min(
+                self.steady.seconds_until_token(now),
+                self.burst.seconds_until_token(now),
+            )
+
+    def try_acquire(self) -> bool:
+        "takes a token from the steady bucket, falling back to the burst bucket."
+        with self._lock:
+            now = monotonic()
+            if self.blocked_until > now:
+                return False
+            return self.steady.try_take(now) or self.burst.try_take(now)
+
+    def block_for(self, seconds: float):
+        "empties both buckets and refuses to hand out tokens for `seconds`."
+        with self._lock:
+            self.steady.drain()
+            self.burst.drain()
+            self.blocked_until = max(self.blocked_until, monotonic() + seconds)
+
+    def update_from_response(self, response: requests.Response):
+        """resizes the buckets from the x-ratelimit-* headers, and syncs the steady bucket with the server's remaining count.
+        On a 429, both buckets are emptied until the server's reset time."""
+
+        # models_misc imports utils, which imports this module - so this can't live at the top.
+        from .models_misc import RateLimitDetails
+
+        try:
+            details = RateLimitDetails(response)
+        except (TypeError, ValueError):
+            # not every response carries rate limit headers (e.g. errors from a proxy)
+            if response is not None and response.status_code == 429:
+                self.block_for(1.1)
+            return
+
+        with self._lock:
+            if details.limit > 0 and details.limit != self.steady.capacity:
+                self.steady.capacity = details.limit
+                self.steady.refill_rate = details.limit
+            if details.limit_burst > 0 and details.burst_window_seconds > 0:
+                # the burst bucket refills completely once per window
+                self.burst.capacity = details.limit_burst
+                self.burst.refill_rate = (
+                    details.limit_burst / details.burst_window_seconds
+                )
+            self.steady.refill()
+            self.steady.tokens = min(self.steady.capacity, details.limit_remaining)
+
+        if response.status_code == 429:
+            reset_in = (details.reset_time - datetime.utcnow()).total_seconds()
+            self.block_for(max(0, reset_in) + 0.1)
+            self.logger.debug(
+                "* Rate limited by the server, blocking sends for %s seconds",
+                max(0, reset_in) + 0.1,
+            )
+
+
+class StrideScheduler:
+    """weighted fair queuing across traffic classes, by stride scheduling - each class has a heap of its own,
+    and the non-empty class that has had the least service relative to its weight goes next.
+
+    Not thread safe on its own - FairPriorityQueue and AsyncFairPriorityQueue do the locking.
+    """
+
+    def __init__(self, weights: dict = None) -> None:
+        self.weights = dict(DEFAULT_TRAFFIC_CLASS_WEIGHTS)
+        self.weights.update(weights or {})
+        self._heaps = {}
+        self._pass = {}
+        self._virtual_time = 0
+        self._size = 0
+
+    def weight(self, traffic_class: str) -> float:
+        "unknown classes are weighted like the default class"
+        weight = self.weights.get(traffic_class)
+        if not weight or weight <= 0:
+            weight = self.weights.get(DEFAULT_TRAFFIC_CLASS) or 1
+        return weight
+
+    def push(self, entry, traffic_class: str = None):
+        traffic_class = traffic_class or DEFAULT_TRAFFIC_CLASS
+        heap = self._heaps.setdefault(traffic_class, [])
+        if not heap:
+            # a class that has been idle rejoins at the current virtual time, rather than cashing in the turns it didn't use.
+            self._pass[traffic_class] = max(
+                self._pass.get(traffic_class, 0), self._virtual_time
+            )
+        heapq.heappush(heap, entry)
+        self._size += 1
+
+    def pop(self):
+        "the next entry - IndexError if there isn't one."
+        best_class = None
+        for traffic_class, heap in self._heaps.items():
+            if not heap:
+                continue
+            if best_class is None:
+                best_class = traffic_class
+                continue
+            best_pass, this_pass = self._pass[best_class], self._pass[traffic_class]
+            # ties go to the more urgent request
+            if this_pass < best_pass or (
+                this_pass == best_pass and heap[0] < self._heaps[best_class][0]
+            ):
+                best_class = traffic_class
+        if best_class is None:
+            raise IndexError("pop from an empty StrideScheduler")
+        entry = heapq.heappop(self._heaps[best_class])
+        self._size -= 1
+        self._virtual_time = self._pass[best_class]
+        self._pass[best_class] += 1 / self.weight(best_class)
+        return entry
+
+    def remove(self, package, traffic_class: str = None):
+        "takes `package` (or the tuple holding it) out of its class's heap - returns the entry, or None if it isn't there."
+        heap = self._heaps.get(traffic_class or DEFAULT_TRAFFIC_CLASS, [])
+        for index, entry in enumerate(heap):
+            if entry is package or (isinstance(entry, tuple) and entry[-1] is package):
+                del heap[index]
+                heapq.heapify(heap)
+                self._size -= 1
+                return entry
+        return None
+
+    def escalation(self, package, priority: float, traffic_class: str) -> tuple:
+        """the (priority, traffic class) a queued package should move to when a caller with `priority` and
+        `traffic_class` shares it - the more urgent of each. None if it's already at least that urgent.
+        """
+        priority = min(package.priority, priority)
+        traffic_class = traffic_class or DEFAULT_TRAFFIC_CLASS
+        if self.weight(traffic_class) <= self.weight(package.traffic_class):
+            traffic_class = package.traffic_class
+        if (priority, traffic_class) == (package.priority, package.traffic_class):
+            return None
+        return priority, traffic_class
+
+    def depth_by_class(self) -> dict:
+        return {c: len(heap) for c, heap in self._heaps.items() if heap}
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self):
+        for heap in self._heaps.values():
+            yield from heap
+
+
+def _traffic_class_of(item) -> str:
+    # older callers put (priority, package) tuples on the queue
+    package = item[-1] if isinstance(item, tuple) else item
+    return getattr(package, "traffic_class", None) or DEFAULT_TRAFFIC_CLASS
+
+
+class FairPriorityQueue(PriorityQueue):
+    "a drop-in PriorityQueue that shares itself between traffic classes by weight - see StrideScheduler."
+
+    def __init__(self, maxsize: int = 0, weights: dict = None) -> None:
+        self._weights = weights
+        super().__init__(maxsize)
+
+    def _init(self, maxsize):
+        self.queue = StrideScheduler(self._weights)
+
+    def _qsize(self):
+        return len(self.queue)
+
+    def _put(self, item):
+        self.queue.push(item, _traffic_class_of(item))
+
+    def _get(self):
+        return self.queue.pop()
+
+    def put_many(self, items: list):
+        "puts every item under one lock, so no other put can land between them."
+        with self.not_full:
+            for item in items:
+                self._put(item)
+            self.unfinished_tasks += len(items)
+            self.not_empty.notify(len(items))
+
+    def set_weights(self, weights: dict):
+        with self.mutex:
+            self.queue.weights.update(weights)
+
+    def escalate(self, package, priority: float, traffic_class: str) -> bool:
+        """moves a still-queued package up to a more urgent priority and/or traffic class - see StrideScheduler.escalation.
+        Returns False if it's no longer queued (e.g. it's being sent), or was already urgent enough.
+        """
+        with self.mutex:
+            target = self.queue.escalation(package, priority, traffic_class)
+            if (
+                target is None
+                or self.queue.remove(package, package.traffic_class) is None
+            ):
+                return False
+            package.priority, package.traffic_class = target
+            self.queue.push(package, package.traffic_class)
+            return True
+
+
+# handlers every consumer's pipeline runs - threaded and asyncio, every token, including consumers created later.
+_global_registrations: dict = {}
+
+
+def _registration(handler, pattern: str = None) -> tuple:
+    if not callable(handler):
+        raise ValueError("Handler must be callable")
+    return (handler, re.compile(pattern) if pattern is not None else None)
+
+
+def register_handler(handler, identifier, pattern: str = None):
+    """registers `handler` with every consumer, for every token - including consumers that don't exist yet.
+    Same arguments as RequestConsumer.register_handler. Before consumers were split per token,
+    `RequestConsumer().register_handler` saw all traffic - this is how to get that now.
+    """
+    _global_registrations[identifier] = _registration(handler, pattern)
+
+
+def unregister_handler(identifier):
+    _global_registrations.pop(identifier, None)
+
+
+class HandlerPipeline:
+    """runs response handlers on a small pool of worker threads, so a slow one (e.g. a DB write) never holds up sending.
+
+    Handlers can subscribe to an endpoint pattern - a regex searched for in the response's url path,
+    e.g. r"/market$" - and only see matching responses. The backlog is bounded: once it's full, `dispatch` blocks,
+    slowing the senders down rather than letting unhandled responses pile up."""
+
+    def __init__(
+        self,
+        workers: int = HANDLER_WORKERS,
+        max_backlog: int = HANDLER_BACKLOG,
+        name: str = "ResponseHandlers",
+    ) -> None:
+        self.name = name
+        self.workers = workers
+        self._registrations = {}
+        self._backlog = Queue(maxsize=max_backlog)
+        self._threads = []
+        self._threads_lock = Lock()
+        self.logger = logging.getLogger("HandlerPipeline")
+
+    @property
+    def handlers(self) -> dict:
+        return {i: handler for i, (handler, _) in self._all_registrations().items()}
+
+    def register(self, handler, identifier, pattern: str = None):
+        self._registrations[identifier] = _registration(handler, pattern)
+
+    def unregister(self, identifier):
+        self._registrations.pop(identifier, None)
+
+    def matching(self, response: requests.Response) -> list:
+        "the (identifier, handler) pairs subscribed to this response"
+        path = urllib.parse.urlparse(response.url or "").path
+        return [
+            (identifier, handler)
+            for identifier, (handler, pattern) in self._all_registrations().items()
+            if pattern is None or pattern.search(path)
+        ]
+
+    def _all_registrations(self) -> dict:
+        # this pipeline's own handlers win over a global one with the same identifier
+        return {**_global_registrations, **self._registrations}
+
+    def dispatch(self, response: requests.Response, block: bool = True) -> bool:
+        """hands the response to the workers. Returns False if `block` is False and the backlog is full."""
+        matching = self.matching(response)
+        if not matching:
+            return True
+        self._start_workers()
+        try:
+            self._backlog.put((response, matching), block=block)
+        except Full:
+            return False
+        return True
+
+    def join(self):
+        "waits until every response dispatched so far has been handled"
+        self._backlog.join()
+
+    def backlog(self) -> int:
+        return self._backlog.qsize()
+
+    def _start_workers(self):
+        if len(self._threads) >= self.workers:
+            return
+        with self._threads_lock:
+            while len(self._threads) < self.workers:
+                thread = Thread(
+                    target=self._run,
+                    daemon=True,
+                    name=f"{self.name}-{len(self._threads)}",
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def _run(self):
+        while True:
+            response, matching = self._backlog.get()
+            for identifier, handler in matching:
+                try:
+                    handler(response)
+                except Exception as err:
+                    self.logger.error("Handler %s failed - %s", identifier, err)
+            self._backlog.task_done()
+
+
+def consumer_key_from_headers(headers: dict) -> str:
+    "the rate limit key for a request - the bearer token, or None for anonymous requests."
+    if not headers:
+        return None
+    auth = headers.get("Authorization") or headers.get("authorization")
+    if not auth:
+        return None
+    return auth.removeprefix("Bearer ").strip() or None
+
+
+# upper bounds (seconds) of the wait-time and send-latency histogram buckets.
+HISTOGRAM_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, float("inf"))
+# achieved requests per second is measured over this trailing window.
+THROUGHPUT_WINDOW_SECONDS = 60
+
+
+class Histogram:
+    "fixed-bucket histogram - each bucket counts observations less than or equal to its upper bound."
+
+    def __init__(self, buckets: tuple = HISTOGRAM_BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def observe(self, value: float):
+        for i, upper_bound in enumerate(self.buckets):
+            if value <= upper_bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0,
+            "max": self.max,
+            "buckets": {
+                str(upper_bound): count
+                for upper_bound, count in zip(self.buckets, self.counts)
+            },
+        }
+
+
+class ConsumerStats:
+    "in-process counters for a consumer. Every method is thread safe."
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self.started_at = monotonic()
+        self.sent = 0
+        self.completed = 0
+        self.failed = 0
+        self.rate_limited = 0
+        self.retries = 0
+        self.coalesced = 0
+        self.expired = 0
+        self.in_flight = 0
+        self.wait_time = Histogram()
+        self.send_latency = Histogram()
+        self._send_times = deque()
+
+    def record_send(self, wait_seconds: float, latency_seconds: float):
+        with self._lock:
+            now = monotonic()
+            self.sent += 1
+            self.wait_time.observe(wait_seconds)
+            self.send_latency.observe(latency_seconds)
+            self._send_times.append(now)
+            self._trim(now)
+
+    def increment(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def adjust_in_flight(self, delta: int):
+        with self._lock:
+            self.in_flight += delta
+
+    def _trim(self, now: float):
+        while (
+            self._send_times and self._send_times[0] < now - THROUGHPUT_WINDOW_SECONDS
+        ):
+            self._send_times.popleft()
+
+    def requests_per_second(self) -> float:
+        with self._lock:
+            now = monotonic()
+            self._trim(now)
+            window = min(THROUGHPUT_WINDOW_SECONDS, now - self.started_at)
+            return len(self._send_times) / window if window > 0 else 0
+
+    def to_dict(self) -> dict:
+        requests_per_second = self.requests_per_second()
+        with self._lock:
+            return {
+                "sent": self.sent,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rate_limited": self.rate_limited,
+                "retries": self.retries,
+                "coalesced": self.coalesced,
+                "expired": self.expired,
+                "requests_per_second": requests_per_second,
+                "wait_time": self.wait_time.to_dict(),
+                "send_latency": self.send_latency.to_dict(),
+            }
+
+
+def coalesce_key(request: PreparedRequest) -> tuple:
+    """identical GETs (same url including params, same token) can share one response.
+    Returns None for anything that mustn't be coalesced."""
+    if request is None or request.method != "GET":
+        return None
+    return (request.method, request.url, request.headers.get("Authorization"))
+
+
+def get_consumer(key: str = None, auto_start=True) -> "RequestConsumer":
+    "returns the consumer for the given rate limit key, creating it if necessary."
+    return RequestConsumer(auto_start=auto_start, key=key)
+
+
+def get_consumer_for_headers(headers: dict, auto_start=True) -> "RequestConsumer":
+    return get_consumer(consumer_key_from_headers(headers), auto_start=auto_start)
+
+
+_limiters: dict = {}
+_limiters_lock = Lock()
+
+
+def get_rate_limiter(key: str = None) -> RateLimiter:
+    "the rate limiter for a given key - shared by the threaded and asyncio consumers so they don't overspend."
+    with _limiters_lock:
+        if key not in _limiters:
+            _limiters[key] = RateLimiter()
+        return _limiters[key]
+
+
+_journal = None
+
+
+def use_journal(journal) -> int:
+    """journals every consumer's queue to `journal` (a RequestJournal) from now on, and re-queues whatever
+    the journal recovered from the last run - creating consumers for any keys that don't have one yet.
+    Returns the number of requests re-queued."""
+    global _journal
+    _journal = journal
+    recovered = 0
+    attached = set()
+    for consumer in registered_consumers():
+        recovered += consumer.attach_journal(journal)
+        attached.add(consumer.key)
+    # recovered requests are journaled again as they're re-queued, so the keys just attached show up here too
+    for key in journal.consumer_keys():
+        if key in attached:
+            continue
+        # creating the consumer attaches the journal, and recovers its key
+        consumer = get_consumer(key)
+        recovered += consumer.recovered
+    return recovered
+
+
+def _retire_senders(senders: ThreadPoolExecutor, session):
+    # anything still in flight finishes on the old session - then it can go
+    senders.shutdown(wait=True)
+    session.close()
+
+
+def registered_consumers() -> list["RequestConsumer"]:
+    with RequestConsumer._registry_lock:
+        return list(RequestConsumer._registry.values())
+
 
 class RequestConsumer:
-    _instance = None
+    "one instance per rate limit key - `RequestConsumer()` with no key is the shared, anonymous consumer."
 
-    def __new__(cls, *args, **kwargs):
-        if not cls._instance:
-            cls._instance = super().__new__(cls)
-        return cls._instance
+    _registry: dict = {}
+    _registry_lock = Lock()
 
-    def __init__(self, auto_start=True) -> None:
+    def __new__(cls, *args, key: str = None, **kwargs):
+        with cls._registry_lock:
+            if key not in cls._registry:
+                cls._registry[key] = super().__new__(cls)
+            return cls._registry[key]
+
+    def __init__(
+        self, auto_start=True, key: str = None, transport: TransportConfig = None
+    ) -> None:
         if hasattr(self, "stop_flag"):
+            # the consumer for this key already exists - a transport asked for now still applies
+            if transport is not None and transport != self.transport:
+                self.configure_transport(transport)
             return
-        self.queue = PriorityQueue()
+        self.key = key
+        self.queue = FairPriorityQueue()
         self.stop_flag = False
         self.logger = logging.getLogger("RequestConsumer")
+        # don't put the whole token into thread names / logs
+        name_suffix = key[-6:] if key else "anon"
         self._consumer_thread = Thread(
-            target=self._consume_until_stopped, daemon=auto_start
+            target=self._consume_until_stopped,
+            daemon=auto_start,
+            name=f"RequestConsumer-{name_suffix}",
+        )
+        self.transport = transport or TransportConfig()
+        self._session = create_session(self.transport)
+        self._start_senders()
+        self.limiter = get_rate_limiter(key)
+        self.handler_pipeline = HandlerPipeline(
+            name=f"RequestConsumer-{name_suffix}-handlers"
         )
-        self._session = requests.Session()
-        self.handlers = {}
+        self._retry_heap = []
+        self._retry_lock = Lock()
+        self._retry_sequence = itertools.count()
+        self._inflight = {}
+        self._inflight_lock = Lock()
+        self.metrics = ConsumerStats()
+        self._snapshot_thread = None
+        self.journal = None
+        self.recovered = 0
+        if _journal is not None:
+            self.attach_journal(_journal)
         if auto_start:
             self.start()
         pass
@@ -43,111 +686,522 @@ class RequestConsumer:
     def start(self):
         self.stop_flag = False
         if not self._consumer_thread.is_alive():
+            if self._consumer_thread.ident is not None:
+                # threads can only be started once - replace one that has already run and stopped.
+                self._consumer_thread = Thread(
+                    target=self._consume_until_stopped,
+                    daemon=self._consumer_thread.daemon,
+                    name=self._consumer_thread.name,
+                )
             self._consumer_thread.start()
 
-    def register_handler(self, handler, identifier):
-        if not callable(handler):
-            raise ValueError("Handler must be callable")
-        self.handlers[identifier] = handler
+    def configure_transport(self, transport: TransportConfig):
+        """swaps the consumer's session and senders for ones built from `transport` - pool size, keep-alive, timeouts, HTTP/2.
+        The old session is closed once the sends still using it have finished."""
+        old_session, old_senders = self._session, self._senders
+        self.transport = transport
+        self._session = create_session(transport)
+        self._start_senders()
+        Thread(
+            target=_retire_senders,
+            args=(old_senders, old_session),
+            daemon=True,
+            name=f"{self._consumer_thread.name}-retire",
+        ).start()
+
+    def _start_senders(self):
+        """sends happen on a small pool of workers, so the next request can go out on schedule while earlier ones
+        are still waiting for their response. The rate limiter is still the only thing deciding when a request goes.
+        """
+        workers = max(1, self.transport.max_in_flight)
+        self._senders = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix=f"{self._consumer_thread.name}-send"
+        )
+        self._sender_slots = Semaphore(workers)
+
+    def attach_journal(self, journal, recover: bool = True) -> int:
+        """records this consumer's queued requests in `journal` (a RequestJournal) until they're answered.
+        With `recover`, the GETs left over from a previous run that are still worth sending are queued again -
+        returns how many."""
+        self.journal = journal
+        if not recover:
+            return 0
+        recovered = 0
+        for package in journal.recover(self.key):
+            if self.put(package) is package:
+                recovered += 1
+        self.recovered += recovered
+        return recovered
+
+    def set_traffic_class_weights(self, weights: dict):
+        "e.g. `{'bulk_sync': 2}` - classes not mentioned keep their current weight."
+        self.queue.set_weights(weights)
+
+    def stats(self) -> dict:
+        """a snapshot of the consumer's metrics - queue depth by priority, wait time and send latency histograms,
+        429 / retry / coalesce counts and achieved requests per second."""
+        depth = {}
+        with self.queue.mutex:
+            queued = list(self.queue.queue)
+            depth_by_class = self.queue.queue.depth_by_class()
+        for entry in queued:
+            package = entry[1] if isinstance(entry, tuple) else entry
+            if not isinstance(package, PackageedRequest):
+                continue
+            depth[package.priority] = depth.get(package.priority, 0) + 1
+        with self._retry_lock:
+            awaiting_retry = len(self._retry_heap)
+        snapshot = self.metrics.to_dict()
+        snapshot["queue_depth"] = len(queued)
+        snapshot["queue_depth_by_priority"] = dict(sorted(depth.items()))
+        snapshot["queue_depth_by_class"] = depth_by_class
+        snapshot["awaiting_retry"] = awaiting_retry
+        snapshot["in_flight"] = self.metrics.in_flight
+        snapshot["handler_backlog"] = self.handler_pipeline.backlog()
+        return snapshot
+
+    def start_stats_snapshots(self, interval_seconds: float = 60, callback=None):
+        """every `interval_seconds`, pass a `stats()` snapshot to `callback` - or log it at INFO if no callback is given.
+        Runs until the consumer is stopped."""
+        if callback is not None and not callable(callback):
+            raise ValueError("Callback must be callable")
+        if self._snapshot_thread is not None and self._snapshot_thread.is_alive():
+            return
+
+        def _take_snapshots():
+            while not self.stop_flag:
+                sleep(interval_seconds)
+                snapshot = self.stats()
+                if callback:
+                    callback(snapshot)
+                else:
+                    self.logger.info("Consumer stats: %s", snapshot)
+
+        self._snapshot_thread = Thread(
+            target=_take_snapshots,
+            daemon=True,
+            name=f"{self._consumer_thread.name}-stats",
+        )
+        self._snapshot_thread.start()
+
+    def put(self, package: "PackageedRequest") -> "PackageedRequest":
+        """queues a request - the package orders itself by priority, age and arrival.
+
+        If an identical GET is already queued or in flight, the new request isn't queued at all -
+        the existing package is returned instead, and the caller should wait on that and share its response.
+        """
+        existing = self._coalesce(package)
+        if existing is not None:
+            return existing
+        self._journal_record(package)
+        self.queue.put(package)
+        return package
+
+    def submit_many(
+        self, packages: list["PackageedRequest"], priority: float = None
+    ) -> list["PackageedRequest"]:
+        """queues several requests in one step, in one priority band - e.g. every miner's extract after a shared cooldown.
+
+        They're given the same priority (`priority`, or the first package's) and the same enqueue time,
+        so they sit together in the queue in the order given, and nothing queued meanwhile lands in between.
+        Returns the packages to wait on - as with `put`, identical GETs already in flight are returned instead.
+        """
+        if not packages:
+            return []
+        band = packages[0].priority if priority is None else priority
+        now = monotonic()
+        to_queue = []
+        queued = []
+        for package in packages:
+            package.enqueued_at = now
+            package.priority = band
+            existing = self._coalesce(package)
+            if existing is not None:
+                queued.append(existing)
+                continue
+            self._journal_record(package)
+            to_queue.append(package)
+            queued.append(package)
+        self.queue.put_many(to_queue)
+        return queued
+
+    def _coalesce(self, package: "PackageedRequest") -> "PackageedRequest":
+        "the identical GET already in flight, if there is one - otherwise registers `package` as in flight and returns None."
+        key = coalesce_key(package.request)
+        if key is None:
+            return None
+        with self._inflight_lock:
+            existing = self._inflight.get(key)
+            if existing is None or existing is package:
+                self._inflight[key] = package
+                existing = None
+            else:
+                self.metrics.increment("coalesced")
+                existing.attach(package.deadline)
+        if existing is None:
+            package.coalesce_key = key
+            return None
+        # a more urgent caller shouldn't wait in the less urgent one's place in line
+        self.queue.escalate(existing, package.priority, package.traffic_class)
+        self.logger.debug(
+            "* Coalesced request %s into an identical queued request",
+            package.request.url,
+        )
+        return existing
+
+    def _journal_record(self, package: "PackageedRequest"):
+        # only the first time - retries and 429s come back through put, and are already journaled.
+        if self.journal is None or package.journal_id is not None:
+            return
+        try:
+            package.journal_id = self.journal.record(self.key, package)
+        except Exception as err:
+            # the journal is a safety net - never fail a request because of it.
+            self.logger.warning(
+                "Couldn't journal request %s - %s", package.request.url, err
+            )
+
+    def _complete(self, package: "PackageedRequest"):
+        """resolves the package's future - with the response, or the reason there isn't one -
+        wakes up everyone waiting on its event, and stops new identical requests attaching to it.
+        """
+        if package.coalesce_key is not None:
+            with self._inflight_lock:
+                if self._inflight.get(package.coalesce_key) is package:
+                    del self._inflight[package.coalesce_key]
+        if package.journal_id is not None and self.journal is not None:
+            try:
+                self.journal.remove(package.journal_id)
+            except Exception as err:
+                self.logger.warning("Couldn't clear journaled request - %s", err)
+        try:
+            if package.expired:
+                package.future.set_exception(
+                    RequestExpiredError(f"{package.request.url} expired before sending")
+                )
+            elif package.error is not None:
+                package.future.set_exception(package.error)
+            else:
+                package.future.set_result(package.response)
+        except InvalidStateError:
+            # cancelled by the caller
+            pass
+        package.event.set()
+
+    def submit(
+        self,
+        priority: float,
+        request: PreparedRequest,
+        ttl: float = None,
+        session: requests.Session = None,
+        traffic_class: str = None,
+    ) -> Future:
+        """queues the request and returns a concurrent.futures.Future for the `requests.Response`.
+
+        The future raises RequestExpiredError if `ttl` passes before it's sent, or the network error once retries run out.
+        Callbacks added with `add_done_callback` run on a sender thread, so keep them quick.
+        An identical GET already in flight shares its future - cancelling it cancels it for every caller.
+        """
+        package = PackageedRequest(
+            priority,
+            request,
+            Event(),
+            ttl=ttl,
+            session=session,
+            traffic_class=traffic_class,
+        )
+        package = self.put(package)
+        if not self._consumer_thread.is_alive():
+            self.start()
+        return package.future
+
+    @property
+    def handlers(self) -> dict:
+        return self.handler_pipeline.handlers
+
+    def register_handler(self, handler, identifier, pattern: str = None):
+        """`handler(response)` is called for every response - or, given `pattern`, only for responses whose
+        url path it matches (re.search). Handlers run on the handler pipeline's workers, not the senders.
+
+        Each token has its own consumer, and a handler only sees its consumer's traffic - except on the shared
+        anonymous consumer (`RequestConsumer()`), where it's registered with every consumer, as it always was.
+        See the module level `register_handler`.
+        """
+        if self.key is None:
+            register_handler(handler, identifier, pattern)
+            return
+        self.handler_pipeline.register(handler, identifier, pattern)
+
+    def _schedule_retry(self, package: "PackageedRequest", reason: Exception):
+        """parks a failed request until its backoff has elapsed, or gives up on it once its retry budget is spent -
+        or straight away, if it isn't safe to send again. The consumer thread never sleeps on a retry, so healthy requests keep flowing.
+        """
+        package.attempts += 1
+        if package.attempts > package.max_retries or not is_retryable(
+            package.request, reason
+        ):
+            self.metrics.increment("failed")
+            package.error = reason
+            self.logger.error(
+                "Request %s failed after %s attempts, giving up - reason %s",
+                package.request.url,
+                package.attempts,
+                reason,
+            )
+            self._complete(package)
+            return
+        self.metrics.increment("retries")
+        delay = retry_delay(package.attempts)
+        self.logger.warning(
+            "Request failed, retrying in %.1f seconds (attempt %s of %s) - reason %s",
+            delay,
+            package.attempts,
+            package.max_retries,
+            reason,
+        )
+        with self._retry_lock:
+            heapq.heappush(
+                self._retry_heap,
+                (monotonic() + delay, next(self._retry_sequence), package),
+            )
+
+    def _release_due_retries(self):
+        "moves any retries whose backoff has elapsed back onto the queue, at the front."
+        now = monotonic()
+        with self._retry_lock:
+            while self._retry_heap and self._retry_heap[0][0] <= now:
+                _, _, package = heapq.heappop(self._retry_heap)
+                package.priority = 0
+                self.put(package)
 
     def _consume_until_stopped(self):
         """this method should be tied to the _consumer_thread"""
-        base_mod = 120
-        interval = timedelta(milliseconds=60000 / base_mod)
-        delay_mod = 0
         while not self.stop_flag:
-            if not self.queue.empty():
-                next_request = datetime.now() + interval + timedelta(seconds=delay_mod)
-                tupe = self.queue.get()
-                if isinstance(tupe, tuple):
-                    package = tupe[1]
-                if isinstance(tupe, PackageedRequest):
-                    package = tupe
-                if not isinstance(package, PackageedRequest):
-                    continue
-                if not package.event or not package.request:
-                    continue
-                package: PackageedRequest
-                try:
-                    # print("Doing the thing")
-                    package.response = self._session.send(package.request)
-                    for identifier, handler in self.handlers.items():
-                        handler(package.response)
-                    delay_mod = max(0, delay_mod - 0.5)
-
-                except Exception as e:
-                    package.priority = 0
-                    self.queue.put((0, package))
-                    self.logger.warning(
-                        "Request failed, retrying in 30 seconds - reason %s", e
-                    )
-                    sleep(30)
-                    continue
-
-                if package.response.status_code != 429:
-                    package.event.set()
-                    self.logger.debug(
-                        f"* Completed priority {package.priority} request {package.request.url} after {datetime.now() - package.time_added} - Q[{self.queue.qsize()}]"
-                    )
-                else:
-                    try:
-                        delay_mod = (
-                            parser.parse(
-                                package.response.headers.get("x-ratelimit-reset")[:-1]
-                            )
-                            - datetime.utcnow()
-                        ).total_seconds() + 0.1
-                    except Exception as err:
-                        delay_mod = 1.1
-
-                    # delay_mod = (
-                    #    float(package.response.headers.get("retry-after", 0)) + 0.1
-                    # )
-                    self.logger.debug(
-                        "* Delaying a request for %s because of rate_limiting",
-                        delay_mod,
-                    )
-
-                    package.priority = 0
-                    self.queue.put((0, package))
-                sleep(max(0, (next_request - datetime.now()).total_seconds()))
+            self._release_due_retries()
+            wait = self.limiter.seconds_until_available()
+            if wait > 0:
+                sleep(min(wait, 1))
+                continue
+            # don't take anything off the queue until a sender is free for it -
+            # otherwise requests would wait in the executor instead, out of priority order.
+            slots = self._sender_slots
+            if not slots.acquire(timeout=IDLE_POLL_SECONDS):
+                continue
+            package = self._next_package()
+            if package is None:
+                slots.release()
+                continue
+            if not self.limiter.try_acquire():
+                self.put(package)
+                slots.release()
+                continue
+            self.metrics.adjust_in_flight(1)
+            self._senders.submit(self._send, package, slots)
+
+    def _next_package(self) -> "PackageedRequest":
+        "the next request worth sending - or None if the queue is empty, or the request had expired."
+        try:
+            tupe = self.queue.get(timeout=IDLE_POLL_SECONDS)
+        except Empty:
+            return None
+        package = tupe[1] if isinstance(tupe, tuple) else tupe
+        if not isinstance(package, PackageedRequest):
+            return None
+        if not package.event or not package.request:
+            return None
+        if package.future.cancelled():
+            self._complete(package)
+            return None
+        if package.has_expired():
+            # nobody is waiting on this any more, don't spend rate limit on it.
+            self.metrics.increment("expired")
+            package.expired = True
+            self.logger.debug(
+                "* Dropped expired priority %s request %s after %s",
+                package.priority,
+                package.request.url,
+                datetime.now() - package.time_added,
+            )
+            self._complete(package)
+            return None
+        # from here on it counts as sent - callers can't cancel it, and wait for its answer rather than timing out.
+        if (
+            not package.future.running()
+            and not package.future.set_running_or_notify_cancel()
+        ):
+            self._complete(package)
+            return None
+        return package
+
+    def _send(self, package: "PackageedRequest", slots: Semaphore):
+        "runs on a sender worker - sends the request, then completes, requeues or retries it."
+        try:
+            sent_at = monotonic()
+            try:
+                # a caller-supplied session (e.g. with its own proxies or certs) overrides the consumer's pooled one.
+                session = package.session or self._session
+                package.response = session.send(
+                    package.request, timeout=self.transport.timeout
+                )
+            except Exception as e:
+                self._schedule_retry(package, e)
+                return
+            finally:
+                self.metrics.record_send(
+                    sent_at - package.enqueued_at, monotonic() - sent_at
+                )
+
+            self.limiter.update_from_response(package.response)
+            if package.response.status_code != 429:
+                self.metrics.increment("completed")
+                self._complete(package)
+                self.logger.debug(
+                    f"* Completed priority {package.priority} request {package.request.url} after {datetime.now() - package.time_added} - Q[{self.queue.qsize()}]"
+                )
             else:
-                # delay_mod = max(0, delay_mod - 0.1)
-                sleep(interval.total_seconds())
+                self.metrics.increment("rate_limited")
+                self.logger.debug(
+                    "* Delaying a request for %s because of rate_limiting",
+                    self.limiter.seconds_until_available(),
+                )
+
+                package.priority = 0
+                self.put(package)
+            # after the caller has been woken - handlers never hold up a response.
+            self.handler_pipeline.dispatch(package.response)
+        finally:
+            self.metrics.adjust_in_flight(-1)
+            slots.release()
 
     def validate(self, response: requests.Response):
         pass
 
 
 class PackageedRequest:
-    def __init__(self, priority: float, request: PreparedRequest, event: Event):
-        self.priority = priority
+    """A queued request. Ordered strictly by (rank, sequence) - where rank is the priority,
+    aged by how long the request has been queued - so equal priorities come out first-in-first-out,
+    and low priority requests eventually overtake a steady stream of new high priority ones.
+    """
+
+    __slots__ = (
+        "_priority",
+        "_rank",
+        "request",
+        "response",
+        "event",
+        "time_added",
+        "enqueued_at",
+        "sequence",
+        "attempts",
+        "max_retries",
+        "error",
+        "coalesce_key",
+        "deadline",
+        "expired",
+        "session",
+        "traffic_class",
+        "future",
+        "journal_id",
+        "waiters",
+    )
+
+    def __init__(
+        self,
+        priority: float,
+        request: PreparedRequest,
+        event: Event,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        ttl: float = None,
+        session: requests.Session = None,
+        traffic_class: str = DEFAULT_TRAFFIC_CLASS,
+    ):
         self.request = request
         self.response = None
+        # callers can wait on either - the event is kept for callers that predate the future.
         self.event = event
+        self.future = Future()
         self.time_added = datetime.now()
+        self.enqueued_at = monotonic()
+        self.sequence = next(_sequence)
+        self.attempts = 0
+        self.max_retries = max_retries
+        self.error = None
+        self.coalesce_key = None
+        # monotonic time after which the result is no longer useful - None means it never expires.
+        self.deadline = self.enqueued_at + ttl if ttl is not None else None
+        self.expired = False
+        self.session = session
+        self.traffic_class = traffic_class or DEFAULT_TRAFFIC_CLASS
+        self.journal_id = None
+        # callers sharing this request - the one that queued it, plus any identical requests coalesced into it
+        self.waiters = 1
+        self.priority = priority
 
-    def __lt__(self, other: "PackagedRequest"):
-        if not isinstance(other, PackageedRequest):
-            return True
-        if self.priority < other.priority:
-            return True
+    def has_expired(self) -> bool:
+        return self.deadline is not None and monotonic() > self.deadline
 
-        if self.time_added < other.time_added:
-            return True
+    def cancel_if_unsent(self) -> bool:
+        """for a caller who's given up waiting - True if it can stop waiting, False if the request has already been
+        handed to a sender and its answer should be waited for. The caller detaches, and the request is only
+        cancelled once nobody else is still waiting on it.
+        """
+        with _waiters_lock:
+            if self.future.running():
+                return False
+            if self.future.done():
+                return True
+            self.waiters -= 1
+            if self.waiters > 0:
+                return True
+        # cancel fails if a sender picked it up just now - then it's on the wire, and worth waiting for
+        return self.future.cancel() or self.future.done()
 
-    def __eq__(self, other):
+    def attach(self, deadline: float):
+        "another caller coalesced into this request. They can only extend the shared deadline, never shorten it."
+        with _waiters_lock:
+            self.waiters += 1
+            if self.deadline is not None:
+                self.deadline = (
+                    None if deadline is None else max(self.deadline, deadline)
+                )
+
+    @property
+    def priority(self) -> float:
+        return self._priority
+
+    @priority.setter
+    def priority(self, value: float):
+        # re-prioritising (e.g. to 0 for a retry) keeps the original enqueue time, so it can't be overtaken by newer requests of the same priority.
+        self._priority = value
+        self._rank = value + self.enqueued_at * AGING_PRIORITY_PER_SECOND
+
+    def _key(self) -> tuple:
+        return (self._rank, self.sequence)
+
+    def __lt__(self, other: "PackageedRequest"):
+        if isinstance(other, tuple):
+            other = other[1]
         if not isinstance(other, PackageedRequest):
-            return False
-        return self.priority == other.priority and self.time_added == other.time_added
+            return NotImplemented
+        return self._key() < other._key()
 
-    def __gt__(self, other):
+    def __gt__(self, other: "PackageedRequest"):
+        if isinstance(other, tuple):
+            other = other[1]
         if not isinstance(other, PackageedRequest):
-            return False
-        return not self < other and not self == other
+            return NotImplemented
+        return self._key() > other._key()
 
     def __le__(self, other):
-        return self < other or self == other
+        return not self > other
 
     def __ge__(self, other):
-        return self > other or self == other
+        return not self < other
+
+    def __eq__(self, other):
+        if not isinstance(other, PackageedRequest):
+            return False
+        return self.sequence == other.sequence
+
+    def __hash__(self):
+        return hash(self.sequence)
@@ -0,0 +1,342 @@
+import asyncio
+import itertools
+import logging
+from datetime import datetime
+from time import monotonic
+from weakref import WeakKeyDictionary
+import requests
+from requests import PreparedRequest
+
+from .transport import TransportConfig, create_session
+from .request_consumer import (
+    ConsumerStats,
+    RequestExpiredError,
+    get_rate_limiter,
+    coalesce_key,
+    is_retryable,
+    retry_delay,
+    AGING_PRIORITY_PER_SECOND,
+    DEFAULT_TRAFFIC_CLASS,
+    StrideScheduler,
+    HandlerPipeline,
+    register_handler,
+    DEFAULT_MAX_RETRIES,
+)
+
+# asyncio counterpart of request_consumer.RequestConsumer.
+# there is one consumer per (event loop, rate limit key). Callers await a future instead of parking a thread on an Event,
+# so thousands of ship coroutines can share a single event loop.
+# the rate limiter is shared with the threaded consumer for the same key, so mixing the two doesn't overspend.
+# the consumer task sleeps on its queue rather than polling it, and is cancelled to stop.
+
+
+_sequence = itertools.count()
+
+
+class AsyncPackagedRequest:
+    __slots__ = (
+        "priority",
+        "request",
+        "response",
+        "future",
+        "time_added",
+        "enqueued_at",
+        "sequence",
+        "attempts",
+        "max_retries",
+        "coalesce_key",
+        "deadline",
+        "session",
+        "traffic_class",
+    )
+
+    def __init__(
+        self,
+        priority: float,
+        request: PreparedRequest,
+        future: asyncio.Future,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        ttl: float = None,
+        session: requests.Session = None,
+        traffic_class: str = DEFAULT_TRAFFIC_CLASS,
+    ):
+        self.priority = priority
+        self.request = request
+        self.response = None
+        self.future = future
+        self.time_added = datetime.now()
+        self.enqueued_at = monotonic()
+        self.sequence = next(_sequence)
+        self.attempts = 0
+        self.max_retries = max_retries
+        self.coalesce_key = coalesce_key(request)
+        self.deadline = self.enqueued_at + ttl if ttl is not None else None
+        self.session = session
+        self.traffic_class = traffic_class or DEFAULT_TRAFFIC_CLASS
+
+    def sort_key(self) -> tuple:
+        "same ordering as request_consumer.PackageedRequest - aged priority, then arrival order."
+        return (
+            self.priority + self.enqueued_at * AGING_PRIORITY_PER_SECOND,
+            self.sequence,
+        )
+
+
+class AsyncFairPriorityQueue(asyncio.PriorityQueue):
+    "asyncio counterpart of request_consumer.FairPriorityQueue - entries are (rank, sequence, package)."
+
+    def _init(self, maxsize):
+        self._queue = StrideScheduler()
+
+    def _put(self, item):
+        self._queue.push(item, item[-1].traffic_class)
+
+    def _get(self):
+        return self._queue.pop()
+
+    def set_weights(self, weights: dict):
+        self._queue.weights.update(weights)
+
+    def escalate(self, package, priority: float, traffic_class: str) -> bool:
+        "same as FairPriorityQueue.escalate"
+        target = self._queue.escalation(package, priority, traffic_class)
+        if target is None or self._queue.remove(package, package.traffic_class) is None:
+            return False
+        package.priority, package.traffic_class = target
+        self._queue.push((*package.sort_key(), package), package.traffic_class)
+        return True
+
+
+class AsyncRequestConsumer:
+    # event loop -> {rate limit key: consumer}
+    _registry: WeakKeyDictionary = WeakKeyDictionary()
+
+    def __new__(cls, key: str = None, transport: TransportConfig = None):
+        loop = asyncio.get_running_loop()
+        # a consumer refers to its own loop, so its entry can't vanish on its own - drop the ones for closed loops.
+        for old_loop in [old for old in cls._registry.keys() if old.is_closed()]:
+            del cls._registry[old_loop]
+        consumers = cls._registry.setdefault(loop, {})
+        instance = consumers.get(key)
+        if instance is None:
+            instance = super().__new__(cls)
+            instance._initialised = False
+            consumers[key] = instance
+        return instance
+
+    def __init__(self, key: str = None, transport: TransportConfig = None) -> None:
+        if self._initialised:
+            if transport is not None and transport != self.transport:
+                self.logger.warning(
+                    "The async consumer for this key already exists - ignoring the new transport config"
+                )
+            return
+        self._initialised = True
+        self._loop = asyncio.get_running_loop()
+        self.key = key
+        self.queue = AsyncFairPriorityQueue()
+        self.stop_flag = False
+        self.logger = logging.getLogger("AsyncRequestConsumer")
+        self.limiter = get_rate_limiter(key)
+        self.transport = transport or TransportConfig()
+        self._session = create_session(self.transport)
+        # as in the threaded consumer - up to max_in_flight sends overlap, the rate limiter decides when each goes.
+        self._sender_slots = asyncio.Semaphore(max(1, self.transport.max_in_flight))
+        self._send_tasks = set()
+        self._consumer_task = None
+        self._inflight = {}
+        self.metrics = ConsumerStats()
+        self.handler_pipeline = HandlerPipeline(name="AsyncRequestConsumer-handlers")
+
+    def start(self):
+        self.stop_flag = False
+        if self._consumer_task is None or self._consumer_task.done():
+            self._consumer_task = self._loop.create_task(self._consume_until_stopped())
+
+    def stop(self):
+        self.stop_flag = True
+        # it may be parked on an empty queue - cancelling is how it finds out.
+        if self._consumer_task is not None:
+            self._consumer_task.cancel()
+            self._consumer_task = None
+
+    def stats(self) -> dict:
+        "same shape as RequestConsumer.stats"
+        depth = {}
+        for entry in list(self.queue._queue):
+            package = entry[-1]
+            depth[package.priority] = depth.get(package.priority, 0) + 1
+        snapshot = self.metrics.to_dict()
+        snapshot["queue_depth"] = self.queue.qsize()
+        snapshot["queue_depth_by_priority"] = dict(sorted(depth.items()))
+        snapshot["queue_depth_by_class"] = self.queue._queue.depth_by_class()
+        snapshot["in_flight"] = self.metrics.in_flight
+        snapshot["handler_backlog"] = self.handler_pipeline.backlog()
+        return snapshot
+
+    def set_traffic_class_weights(self, weights: dict):
+        self.queue.set_weights(weights)
+
+    @property
+    def handlers(self) -> dict:
+        return self.handler_pipeline.handlers
+
+    def register_handler(self, handler, identifier, pattern: str = None):
+        """same as RequestConsumer.register_handler - handlers run on worker threads, never on the event loop.
+        On the anonymous consumer it registers with every consumer."""
+        if self.key is None:
+            register_handler(handler, identifier, pattern)
+            return
+        self.handler_pipeline.register(handler, identifier, pattern)
+
+    def put(self, package: AsyncPackagedRequest):
+        # the sequence number is unique, so the packages themselves are never compared.
+        self.queue.put_nowait((*package.sort_key(), package))
+        self.start()
+
+    async def submit(
+        self,
+        priority: float,
+        request: PreparedRequest,
+        ttl: float = None,
+        session: requests.Session = None,
+        traffic_class: str = DEFAULT_TRAFFIC_CLASS,
+    ) -> requests.Response:
+        """queues the request and waits for the response.
+        If `ttl` seconds pass before it's sent, it's dropped and RequestExpiredError is raised.
+        """
+        key = coalesce_key(request)
+        package = self._inflight.get(key) if key is not None else None
+        if package is not None:
+            self.metrics.increment("coalesced")
+            if package.deadline is not None:
+                package.deadline = (
+                    None if ttl is None else max(package.deadline, monotonic() + ttl)
+                )
+            # a more urgent caller shouldn't wait in the less urgent one's place in line
+            self.queue.escalate(package, priority, traffic_class)
+        else:
+            package = AsyncPackagedRequest(
+                priority,
+                request,
+                self._loop.create_future(),
+                ttl=ttl,
+                session=session,
+                traffic_class=traffic_class,
+            )
+            if key is not None:
+                self._inflight[key] = package
+                package.future.add_done_callback(
+                    lambda _: self._inflight.pop(key, None)
+                )
+            self.put(package)
+        # identical GETs share one future - shield it so one caller being cancelled doesn't cancel it for the rest.
+        return await asyncio.shield(package.future)
+
+    def _schedule_retry(self, package: AsyncPackagedRequest, reason: Exception):
+        """re-queues a failed request after its backoff, or fails the caller's future once its retry budget is spent -
+        or straight away, if it isn't safe to send again."""
+        package.attempts += 1
+        if package.attempts > package.max_retries or not is_retryable(
+            package.request, reason
+        ):
+            self.metrics.increment("failed")
+            self.logger.error(
+                "Request %s failed after %s attempts, giving up - reason %s",
+                package.request.url,
+                package.attempts,
+                reason,
+            )
+            if not package.future.done():
+                package.future.set_exception(reason)
+            return
+        self.metrics.increment("retries")
+        delay = retry_delay(package.attempts)
+        self.logger.warning(
+            "Request failed, retrying in %.1f seconds (attempt %s of %s) - reason %s",
+            delay,
+            package.attempts,
+            package.max_retries,
+            reason,
+        )
+        package.priority = 0
+        self._loop.call_later(delay, self.put, package)
+
+    async def _consume_until_stopped(self):
+        while not self.stop_flag:
+            wait = self.limiter.seconds_until_available()
+            if wait > 0:
+                await asyncio.sleep(min(wait, 1))
+                continue
+            await self._sender_slots.acquire()
+            try:
+                package = await self._next_package()
+            except asyncio.CancelledError:
+                self._sender_slots.release()
+                raise
+            if package is None:
+                self._sender_slots.release()
+                continue
+            if not self.limiter.try_acquire():
+                self.put(package)
+                self._sender_slots.release()
+                continue
+            self.metrics.adjust_in_flight(1)
+            task = self._loop.create_task(self._send(package))
+            # the loop only keeps weak references to tasks
+            self._send_tasks.add(task)
+            task.add_done_callback(self._send_tasks.discard)
+
+    async def _next_package(self) -> AsyncPackagedRequest:
+        _, _, package = await self.queue.get()
+        package: AsyncPackagedRequest
+        if package.future.done():
+            # cancelled by the caller
+            return None
+        if package.deadline is not None and monotonic() > package.deadline:
+            self.metrics.increment("expired")
+            package.future.set_exception(
+                RequestExpiredError(f"{package.request.url} expired before sending")
+            )
+            return None
+        return package
+
+    async def _send(self, package: AsyncPackagedRequest):
+        try:
+            sent_at = monotonic()
+            try:
+                # requests is blocking, so each send gets a worker thread while the loop carries on.
+                session = package.session or self._session
+                package.response = await asyncio.to_thread(
+                    session.send,
+                    package.request,
+                    timeout=self.transport.timeout,
+                )
+            except Exception as e:
+                self._schedule_retry(package, e)
+                return
+            finally:
+                self.metrics.record_send(
+                    sent_at - package.enqueued_at, monotonic() - sent_at
+                )
+
+            self.limiter.update_from_response(package.response)
+            if package.response.status_code != 429:
+                self.metrics.increment("completed")
+                if not package.future.done():
+                    package.future.set_result(package.response)
+                self.logger.debug(
+                    f"* Completed priority {package.priority} request {package.request.url} after {datetime.now() - package.time_added} - Q[{self.queue.qsize()}]"
+                )
+            else:
+                self.metrics.increment("rate_limited")
+                package.priority = 0
+                self.put(package)
+            if not self.handler_pipeline.dispatch(package.response, block=False):
+                # the backlog is full - wait for room off the loop, which holds up this send slot (backpressure).
+                await asyncio.to_thread(
+                    self.handler_pipeline.dispatch, package.response
+                )
+        finally:
+            self.metrics.adjust_in_flight(-1)
+            self._sender_slots.release()
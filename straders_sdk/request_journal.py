@@ -0,0 +1,159 @@
+import json
+import logging
+import sqlite3
+import time
+from threading import Event, Lock
+from time import monotonic
+import requests
+
+# an optional on-disk record of what's sitting in the request consumers' queues, so a restart doesn't lose queued work.
+# a request is written when it's queued and deleted once it's complete - whatever is left after a crash was never answered.
+# on restart, GETs that are still relevant go back in the queue with their original age, so when the ship threads
+# re-issue the same reads they coalesce into the recovered ones instead of sending twice.
+# POSTs and PATCHes are never replayed - the server may already have acted on them, and the ships will re-issue any that still matter.
+#
+# the journal holds request headers, bearer tokens included - keep the file somewhere private.
+
+DEFAULT_MAX_AGE_SECONDS = 600
+
+_SCHEMA = """
+create table if not exists queued_requests (
+    id integer primary key autoincrement,
+    consumer_key text,
+    method text not null,
+    url text not null,
+    headers text not null,
+    body blob,
+    priority real not null,
+    traffic_class text,
+    queued_at real not null,
+    deadline real
+)"""
+
+
+class RequestJournal:
+    def __init__(self, path: str, max_age_seconds: float = DEFAULT_MAX_AGE_SECONDS):
+        """`path` is a sqlite database file - it's created if it doesn't exist.
+        Queued GETs older than `max_age_seconds` aren't worth sending after a restart.
+        """
+        self.path = path
+        self.max_age_seconds = max_age_seconds
+        self.logger = logging.getLogger("RequestJournal")
+        self._lock = Lock()
+        self._connection = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None
+        )
+        # a write per queued request - WAL keeps that cheap, and losing the last few on power loss is fine.
+        self._connection.execute("pragma journal_mode=wal")
+        self._connection.execute("pragma synchronous=normal")
+        self._connection.execute(_SCHEMA)
+
+    def record(self, consumer_key: str, package) -> int:
+        "writes a queued package to the journal - returns the row id, for `remove`."
+        request = package.request
+        body = request.body.encode() if isinstance(request.body, str) else request.body
+        now = time.time()
+        # deadlines are monotonic, which doesn't survive a restart - store them as wall clock time.
+        deadline = (
+            now + (package.deadline - monotonic())
+            if package.deadline is not None
+            else None
+        )
+        queued_at = now - (monotonic() - package.enqueued_at)
+        with self._lock:
+            cursor = self._connection.execute(
+                """insert into queued_requests
+                (consumer_key, method, url, headers, body, priority, traffic_class, queued_at, deadline)
+                values (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (
+                    consumer_key,
+                    request.method,
+                    request.url,
+                    json.dumps(dict(request.headers)),
+                    body,
+                    package.priority,
+                    package.traffic_class,
+                    queued_at,
+                    deadline,
+                ),
+            )
+            return cursor.lastrowid
+
+    def remove(self, journal_id: int):
+        with self._lock:
+            self._connection.execute(
+                "delete from queued_requests where id = ?", (journal_id,)
+            )
+
+    def consumer_keys(self) -> list:
+        "the rate limit keys with anything in the journal"
+        with self._lock:
+            rows = self._connection.execute(
+                "select distinct consumer_key from queued_requests"
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def pending(self, consumer_key: str = None) -> list[tuple]:
+        with self._lock:
+            return self._connection.execute(
+                """select id, method, url, headers, body, priority, traffic_class, queued_at, deadline
+                from queued_requests where consumer_key is ? order by id""",
+                (consumer_key,),
+            ).fetchall()
+
+    def recover(self, consumer_key: str = None) -> list:
+        """takes the journal's entries for `consumer_key` out, and returns fresh PackageedRequests for the ones
+        still worth sending - GETs that haven't expired or aged out. Writes and stale reads are dropped.
+        """
+        # the consumer module imports this one
+        from .request_consumer import PackageedRequest
+
+        now = time.time()
+        packages = []
+        seen = set()
+        dropped = 0
+        rows = self.pending(consumer_key)
+        for (
+            journal_id,
+            method,
+            url,
+            headers,
+            body,
+            priority,
+            traffic_class,
+            queued_at,
+            deadline,
+        ) in rows:
+            self.remove(journal_id)
+            stale = now - queued_at > self.max_age_seconds or (
+                deadline is not None and deadline <= now
+            )
+            if method != "GET" or stale or url in seen:
+                dropped += 1
+                continue
+            seen.add(url)
+            request = requests.Request(
+                method, url, headers=json.loads(headers), data=body
+            ).prepare()
+            package = PackageedRequest(
+                priority,
+                request,
+                Event(),
+                ttl=deadline - now if deadline is not None else None,
+                traffic_class=traffic_class,
+            )
+            # keep its place in line - aging depends on how long it has really been waiting.
+            package.enqueued_at = monotonic() - (now - queued_at)
+            package.priority = priority
+            packages.append(package)
+        if rows:
+            self.logger.info(
+                "Recovered %s queued requests, dropped %s writes / stale reads",
+                len(packages),
+                dropped,
+            )
+        return packages
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
@@ -4,6 +4,57 @@ from typing import Protocol, runtime_checkable
 from json import JSONDecodeError
 import logging
 
+# orjson and msgspec are optional - they're several times faster than the stdlib at decoding big payloads (e.g. pages of ships).
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+DECODE_ERRORS = (ValueError,) + ((msgspec.DecodeError,) if msgspec else ())
+
+
+def default_json_decoder():
+    "the fastest available decoder - orjson, then msgspec, then the stdlib."
+    if orjson:
+        return orjson.loads
+    if msgspec:
+        return msgspec.json.Decoder().decode
+    return json.loads
+
+
+_json_decoder = default_json_decoder()
+
+
+def set_json_decoder(decoder=None):
+    "swaps the function used to decode response bodies. It must accept bytes. Pass None to go back to the default."
+    global _json_decoder
+    _json_decoder = decoder or default_json_decoder()
+
+
+def decode_json(content: bytes):
+    return _json_decoder(content)
+
+
+def response_json(response: requests.Response) -> dict:
+    """decodes the response body, exactly once - the result is cached on the response,
+    so coalesced callers, handlers and loggers sharing a response don't decode it again.
+    They all get the same dict, so treat it as read only - deepcopy it first if you need to change it.
+    Raises one of DECODE_ERRORS if the body isn't valid json."""
+    cached = getattr(response, "_straders_json", None)
+    if cached is not None:
+        return cached
+    if response.status_code == 204 or not response.content:
+        decoded = {}
+    else:
+        decoded = decode_json(response.content)
+    response._straders_json = decoded
+    return decoded
+
+
 # We have just turn the Ship into a client (so it can do things like move, buy sell)
 # however now it also needs responses, which has caused a circular import.
 # now presently we have one class per kind of response.
@@ -29,11 +80,13 @@ class SpaceTradersResponse(Protocol):
 
 
 class RemoteSpaceTradersRespose:
-    "base class for all responses"
+    """base class for all responses.
+    `response_json` and `data` may be shared with other callers of the same request - see `response_json`.
+    """
 
     def __init__(self, response: requests.Response, priority: int = None):
         self.data = {}
-        self.url = response.url
+        self.url = response.url if response is not None else None
         self.error = None
 
         self.error_code = None
@@ -46,19 +99,16 @@ class RemoteSpaceTradersRespose:
             return
 
         self.status_code = response.status_code
-        if response.status_code == 204 or response.content == b"":
+        try:
+            self.response_json = response_json(response)
+        except DECODE_ERRORS:
             self.response_json = {}
-        else:
-            try:
-                self.response_json = json.loads(response.content)
-            except JSONDecodeError:
-                self.response_json = {}
-                logging.error(
-                    "SPACE TRADERS REPSONSE DIDN'T HAVE VALID JSON URL: %s,  status code: %s, received content: %s",
-                    response.url,
-                    response.status_code,
-                    response.content,
-                )
+            logging.error(
+                "SPACE TRADERS REPSONSE DIDN'T HAVE VALID JSON URL: %s,  status code: %s, received content: %s",
+                response.url,
+                response.status_code,
+                response.content,
+            )
 
         if "error" in self.response_json:
             self.error_parse()
@@ -0,0 +1,175 @@
+import socket
+from dataclasses import dataclass
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3.connection import HTTPConnection
+from urllib3.exceptions import ConnectTimeoutError
+
+# the HTTP layer the request consumers send through.
+# every consumer gets its own session, with a connection pool kept warm by TCP keep-alive,
+# so a ship waking up after a quiet spell doesn't pay for a fresh TLS handshake.
+# requests is the default client - set `http2=True` to send through httpx instead (pip install httpx[http2]).
+
+
+@dataclass
+class TransportConfig:
+    # the API is a single host, so one pool is enough - pool_maxsize caps the connections to it.
+    pool_connections: int = 1
+    pool_maxsize: int = 10
+    # requests the consumer may have on the wire at once - the rate limit still decides when each one goes.
+    # keep this at or below pool_maxsize, or the extra senders will open connections the pool won't keep.
+    max_in_flight: int = 4
+    keep_alive: bool = True
+    keep_alive_idle: int = 30  # seconds of silence before the first keep-alive probe
+    keep_alive_interval: int = 10  # seconds between probes
+    keep_alive_count: int = 3  # unanswered probes before the connection is dropped
+    connect_timeout: float = 5
+    # a read timeout can land after the server has acted on the request - see `connect_failed`
+    read_timeout: float = 30
+    http2: bool = False
+
+    @property
+    def timeout(self) -> tuple:
+        "(connect, read) - the form `requests` takes"
+        return (self.connect_timeout, self.read_timeout)
+
+    def socket_options(self) -> list:
+        "keep-alive options for the platform we're on - not every OS supports tuning all three."
+        if not self.keep_alive:
+            return []
+        options = [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+        if hasattr(socket, "TCP_KEEPIDLE"):
+            options.append(
+                (socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, self.keep_alive_idle)
+            )
+        elif hasattr(socket, "TCP_KEEPALIVE"):  # macOS
+            options.append(
+                (socket.IPPROTO_TCP, socket.TCP_KEEPALIVE, self.keep_alive_idle)
+            )
+        if hasattr(socket, "TCP_KEEPINTVL"):
+            options.append(
+                (socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, self.keep_alive_interval)
+            )
+        if hasattr(socket, "TCP_KEEPCNT"):
+            options.append(
+                (socket.IPPROTO_TCP, socket.TCP_KEEPCNT, self.keep_alive_count)
+            )
+        return options
+
+
+class ConnectFailed(requests.ConnectionError):
+    "the HTTP/2 client couldn't connect - raised in place of httpx.ConnectError."
+
+
+def connect_failed(error: Exception) -> bool:
+    """True if a send failed before the request reached the server (refused, DNS, connect timeout) -
+    so sending it again can't repeat it. A dropped connection or read timeout could be after the server acted on it.
+    """
+    if isinstance(error, (requests.ConnectTimeout, ConnectFailed)):
+        return True
+    if isinstance(error, requests.ConnectionError) and error.args:
+        # requests wraps urllib3's MaxRetryError - its reason says which phase failed. NewConnectionError is a ConnectTimeoutError.
+        return isinstance(getattr(error.args[0], "reason", None), ConnectTimeoutError)
+    return False
+
+
+class KeepAliveAdapter(HTTPAdapter):
+    "an HTTPAdapter whose pooled connections are opened with extra socket options (e.g. TCP keep-alive)."
+
+    def __init__(self, socket_options: list = None, **kwargs):
+        # HTTPAdapter.__init__ builds the pool manager, so this has to be set first.
+        self.socket_options = socket_options or []
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        if self.socket_options:
+            kwargs["socket_options"] = (
+                HTTPConnection.default_socket_options + self.socket_options
+            )
+        super().init_poolmanager(*args, **kwargs)
+
+
+class Http2Session:
+    """sends prepared `requests` requests through an HTTP/2 httpx client, and hands back `requests.Response` objects,
+    so the consumer and everything downstream of it can't tell the difference."""
+
+    def __init__(self, config: TransportConfig) -> None:
+        try:
+            import httpx
+        except ImportError as err:
+            raise ImportError(
+                "HTTP/2 needs httpx - pip install httpx[http2], or set http2=False"
+            ) from err
+        self._httpx = httpx
+        self.config = config
+        transport = httpx.HTTPTransport(
+            http2=True,
+            limits=httpx.Limits(
+                max_connections=config.pool_maxsize,
+                max_keepalive_connections=config.pool_maxsize,
+            ),
+            socket_options=config.socket_options() or None,
+        )
+        self._client = httpx.Client(
+            transport=transport,
+            timeout=httpx.Timeout(config.read_timeout, connect=config.connect_timeout),
+        )
+
+    def send(
+        self, request: requests.PreparedRequest, timeout=None, **kwargs
+    ) -> requests.Response:
+        httpx = self._httpx
+        if isinstance(timeout, tuple):
+            timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+        elif timeout is None:
+            timeout = self._client.timeout
+        try:
+            raw = self._client.request(
+                request.method,
+                request.url,
+                headers=dict(request.headers),
+                content=request.body,
+                timeout=timeout,
+            )
+        # keep the exceptions callers already handle
+        except httpx.ConnectTimeout as err:
+            raise requests.ConnectTimeout(str(err), request=request) from err
+        except httpx.ConnectError as err:
+            raise ConnectFailed(str(err), request=request) from err
+        except httpx.TimeoutException as err:
+            raise requests.Timeout(str(err), request=request) from err
+        except httpx.TransportError as err:
+            raise requests.ConnectionError(str(err), request=request) from err
+
+        response = requests.Response()
+        response.status_code = raw.status_code
+        response.headers = CaseInsensitiveDict(raw.headers)
+        response._content = raw.content
+        response.url = str(raw.url)
+        response.reason = raw.reason_phrase
+        response.encoding = raw.encoding
+        response.elapsed = raw.elapsed
+        response.request = request
+        return response
+
+    def close(self):
+        self._client.close()
+
+
+def create_session(config: TransportConfig = None) -> requests.Session or Http2Session:
+    "a session set up from `config` - pooled, keep-alive connections by default."
+    config = config or TransportConfig()
+    if config.http2:
+        return Http2Session(config)
+    session = requests.Session()
+    # retries are the consumer's job (with backoff, off the hot path) - the adapter mustn't retry as well.
+    adapter = KeepAliveAdapter(
+        socket_options=config.socket_options(),
+        pool_connections=config.pool_connections,
+        pool_maxsize=config.pool_maxsize,
+        max_retries=0,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
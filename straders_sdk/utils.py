@@ -2,26 +2,54 @@ import requests
 import logging
 import urllib.parse
 from dataclasses import dataclass
+from contextlib import contextmanager
 from logging import FileHandler, StreamHandler
 from sys import stdout
 from datetime import datetime, timedelta
 import random
+import math
 import json, base64
 import time
 from .resp_local_resp import LocalSpaceTradersRespose
 import threading
+import warnings
 import copy
+from concurrent import futures
+from collections import deque
 from requests import Session
 import straders_sdk.request_consumer as rc
+import straders_sdk.request_consumer_async as arc
 from .pg_connection_pool import PGConnectionPool
+from psycopg2.extras import execute_values
 
 st_log_client: "SpaceTradersClient" = None
 ST_LOGGER = logging.getLogger("API-Client")
-SEND_FREQUENCY = 0.33  # 3 requests per second
-SEND_FREQUENCY_VIP = 3  # for every X requests, 1 is a VIP.  to decrease the number of VIP allocations, increase this number.
 DATE_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
 
+# kept so old imports still work - neither does anything any more.
+_DEPRECATED = {
+    "SEND_FREQUENCY": (0.33, "sends are paced by each consumer's RateLimiter"),
+    "SEND_FREQUENCY_VIP": (
+        3,
+        "urgent requests get their share through traffic classes - see rc.TRAFFIC_*",
+    ),
+}
+
+
+def __getattr__(name):
+    if name in _DEPRECATED:
+        value, instead = _DEPRECATED[name]
+        warnings.warn(
+            f"{name} is deprecated and has no effect - {instead}",
+            DeprecationWarning,
+            stacklevel=2,
+        )
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 from .responses import RemoteSpaceTradersRespose, SpaceTradersResponse
+from .resp_responses import response_json, DECODE_ERRORS
 
 
 @dataclass
@@ -44,13 +72,24 @@ class ApiConfig:
 
 
 def get_and_validate_page(
-    url, page_number, params=None, headers=None, session: Session = None, priority=5
+    url,
+    page_number,
+    params=None,
+    headers=None,
+    session: Session = None,
+    priority=5,
+    traffic_class: str = None,
 ) -> SpaceTradersResponse or None:
     params = params or {}
     params["page"] = page_number
     params["limit"] = 20
     return get_and_validate(
-        url, params=params, headers=headers, session=session, priority=priority
+        url,
+        params=params,
+        headers=headers,
+        session=session,
+        priority=priority,
+        traffic_class=traffic_class,
     )
 
 
@@ -62,36 +101,200 @@ def get_and_validate_paginated(
     headers=None,
     session: Session = None,
     priority=5,
+    traffic_class: str = None,
 ) -> SpaceTradersResponse or None:
-    params = params or {}
-    params["limit"] = per_page
+    """fetches every page (up to `page_limit - 1` pages) and merges them, in page order, into one response.
+    Returns the first failed response if any page fails."""
     data = []
-    for i in range(1, page_limit or 2):
-        params["page"] = i
-        response = get_and_validate(
-            url, params=params, headers=headers, session=session, priority=priority
-        )
-        if response and response.data:
-            data.extend(response.data)
-        elif response:
-            response.data = data
-            return response
-        else:
+    response = None
+    for response in iter_and_validate_paginated(
+        url,
+        per_page,
+        page_limit,
+        params=params,
+        headers=headers,
+        session=session,
+        priority=priority,
+        traffic_class=traffic_class,
+    ):
+        if not response:
             return response
-    if not data:
-        return None
+        data.extend(response.data)
     response.data = data
     return response
 
 
+def iter_and_validate_paginated(
+    url,
+    per_page: int,
+    page_limit: int,
+    params=None,
+    headers=None,
+    session: Session = None,
+    priority=5,
+    traffic_class: str = None,
+):
+    """yields each page's response in page order, as soon as it has arrived.
+
+    The first page is fetched on its own, then its `meta.total` is used to queue every remaining page at once,
+    so the consumer can send them back to back. At most `page_limit - 1` pages are fetched.
+    Iteration stops after a failed response (which is yielded) or an empty page.
+    Closing the iterator early cancels the pages it queued that haven't been sent yet.
+    """
+    params = params or {}
+    params["limit"] = per_page
+    last_allowed_page = max(1, (page_limit or 2) - 1)
+
+    response = get_and_validate(
+        url,
+        params={**params, "page": 1},
+        headers=headers,
+        session=session,
+        priority=priority,
+        traffic_class=traffic_class,
+    )
+    if response and not response.data:
+        response.data = []
+    yield response
+    if not response or not response.data:
+        return
+
+    total = response.response_json.get("meta", {}).get("total")
+    if total is None:
+        # no paging metadata - fall back to asking for pages until one comes back empty.
+        for page in range(2, last_allowed_page + 1):
+            response = get_and_validate(
+                url,
+                params={**params, "page": page},
+                headers=headers,
+                session=session,
+                priority=priority,
+                traffic_class=traffic_class,
+            )
+            if response and not response.data:
+                return
+            yield response
+            if not response:
+                return
+        return
+
+    last_page = min(last_allowed_page, math.ceil(total / per_page))
+    consumer = rc.get_consumer_for_headers(headers)
+    pending = deque()
+    for page in range(2, last_page + 1):
+        package = _package_request(
+            "GET",
+            url,
+            headers=headers,
+            params={**params, "page": page},
+            priority=priority,
+            session=session,
+            traffic_class=traffic_class,
+        )
+        pending.append(consumer.put(package))
+    if not consumer._consumer_thread.is_alive():
+        consumer.start()
+    try:
+        while pending:
+            # popped, so a page is only kept alive by the caller once it's been yielded
+            packaged_request = pending.popleft()
+            response = _wait_for_response(packaged_request, url)
+            del packaged_request
+            yield response
+            if not response:
+                return
+    finally:
+        # stopped early - by a failed page, or the caller closing the generator. Don't spend rate limit on the rest,
+        # unless someone else coalesced into the same page and is still waiting for it.
+        for packaged_request in pending:
+            packaged_request.cancel_if_unsent()
+
+
 def rate_limit_check(response: requests.Response):
     if response.status_code != 429:
         return
 
 
 def request_and_validate(
-    method, url, data=None, json=None, headers=None, params=None, priority=6
+    method,
+    url,
+    data=None,
+    json=None,
+    headers=None,
+    params=None,
+    priority=6,
+    ttl: float = None,
+    session: Session = None,
+    traffic_class: str = None,
 ):
+    """Queues the request with the consumer for its token, and waits for the response.
+
+    `ttl` is how many seconds the result stays useful - if the request hasn't been sent by then,
+    it's dropped without spending rate limit and a timeout response is returned.
+    A request that has already been sent is always waited for, however long it takes.
+    `session` replaces the consumer's own pooled session for this request only.
+    `traffic_class` is one of the rc.TRAFFIC_* classes the queue is shared between - "general" if not given.
+    """
+    packaged_request = _queue_request(
+        method,
+        url,
+        data=data,
+        json=json,
+        headers=headers,
+        params=params,
+        priority=priority,
+        ttl=ttl,
+        session=session,
+        traffic_class=traffic_class,
+    )
+    return _wait_for_response(packaged_request, url, ttl)
+
+
+def _queue_request(
+    method,
+    url,
+    data=None,
+    json=None,
+    headers=None,
+    params=None,
+    priority=6,
+    ttl: float = None,
+    session: Session = None,
+    traffic_class: str = None,
+) -> "rc.PackageedRequest":
+    "queues the request without waiting for it - returns the package to wait on."
+    packaged_request = _package_request(
+        method,
+        url,
+        data=data,
+        json=json,
+        headers=headers,
+        params=params,
+        priority=priority,
+        ttl=ttl,
+        session=session,
+        traffic_class=traffic_class,
+    )
+    consumer = rc.get_consumer_for_headers(headers)
+    # an identical GET may already be queued, in which case we wait on that one instead.
+    packaged_request = consumer.put(packaged_request)
+    if not consumer._consumer_thread.is_alive():
+        consumer.start()
+    return packaged_request
+
+
+def _package_request(
+    method,
+    url,
+    data=None,
+    json=None,
+    headers=None,
+    params=None,
+    priority=6,
+    ttl: float = None,
+    session: Session = None,
+    traffic_class: str = None,
+) -> "rc.PackageedRequest":
     if isinstance(data, dict):
         json = data
         data = None
@@ -100,20 +303,264 @@ def request_and_validate(
     request = requests.Request(
         method, url=url, data=data, json=json, headers=headers, params=params
     )
-    prepared_request = request.prepare()
-    packaged_request = rc.PackageedRequest(
-        priority, prepared_request, threading.Event()
+    return rc.PackageedRequest(
+        priority,
+        request.prepare(),
+        threading.Event(),
+        ttl=ttl,
+        session=session,
+        traffic_class=traffic_class,
     )
-    consumer = rc.RequestConsumer()
-    consumer.queue.put((packaged_request.priority, packaged_request))
-    if not consumer._consumer_thread.is_alive():
-        consumer.start()
+
+
+def queue_many(
+    calls: list[dict],
+    priority=5,
+    ttl: float = None,
+    session: Session = None,
+    traffic_class: str = None,
+) -> list["rc.PackageedRequest"]:
+    """queues several requests in one step, all in the same priority band - returns the packages to wait on, in order.
+
+    Each call is a dict of `request_and_validate` arguments - `method` and `url`, plus any of data, json, headers & params.
+    The requests for each token reach its consumer together, so nothing queued at the same time lands in between them.
+    Use `gather` to wait for the lot."""
+    packages = [
+        _package_request(
+            call.get("method", "GET"),
+            call["url"],
+            data=call.get("data"),
+            json=call.get("json"),
+            headers=call.get("headers"),
+            params=call.get("params"),
+            priority=priority,
+            ttl=ttl,
+            session=session,
+            traffic_class=traffic_class,
+        )
+        for call in calls
+    ]
+    by_consumer = {}
+    for index, (call, package) in enumerate(zip(calls, packages)):
+        key = rc.consumer_key_from_headers(call.get("headers"))
+        by_consumer.setdefault(key, []).append(index)
+    for key, indexes in by_consumer.items():
+        consumer = rc.get_consumer(key)
+        queued = consumer.submit_many([packages[i] for i in indexes])
+        # identical GETs are coalesced, same as with `put`
+        for i, package in zip(indexes, queued):
+            packages[i] = package
+        if not consumer._consumer_thread.is_alive():
+            consumer.start()
+    return packages
+
+
+def gather(
+    packages: list["rc.PackageedRequest"], ttl: float = None
+) -> list[SpaceTradersResponse]:
+    """waits for every package from `queue_many`, and returns their responses in the same order.
+    As with `request_and_validate`, only the ones not sent within `ttl` time out."""
+    return [
+        _wait_for_response(package, package.request.url, ttl) for package in packages
+    ]
+
+
+def _wait_for_response(
+    packaged_request: "rc.PackageedRequest", url, ttl: float = None
+) -> SpaceTradersResponse:
+    response = _wait_for_raw_response(packaged_request, url, ttl)
+    if isinstance(response, LocalSpaceTradersRespose):
+        return response
+    return RemoteSpaceTradersRespose(response, packaged_request.priority)
+
+
+def _wait_for_raw_response(
+    packaged_request: "rc.PackageedRequest", url, ttl: float = None
+) -> requests.Response or LocalSpaceTradersRespose:
+    "the requests.Response, body still undecoded - or a LocalSpaceTradersRespose saying why there isn't one."
     # if a request gets stuck, the thread will never end and the ship can't be reprioritised.
     # e.g. if a ship submits a priority 6 request, it's probs never getting serviced.
     # this will def crash the thread - but it will free up the ship for any new behaviour
-    packaged_request.event.wait(timeout=3600)
-    return RemoteSpaceTradersRespose(
-        packaged_request.response, packaged_request.priority
+    future = packaged_request.future
+    try:
+        try:
+            return future.result(timeout=3600 if ttl is None else ttl)
+        except futures.TimeoutError:
+            if future.done() or packaged_request.cancel_if_unsent():
+                raise
+            # it's already on the wire - timing out now could tempt the caller into sending it (e.g. a POST) again.
+            return future.result(timeout=3600)
+    except (TimeoutError, futures.TimeoutError):
+        # RequestExpiredError is a TimeoutError too
+        return LocalSpaceTradersRespose(
+            "Timed out waiting for request to be sent.", 0, 0, url=url
+        )
+    except futures.CancelledError:
+        return LocalSpaceTradersRespose("Request was cancelled.", 0, 0, url=url)
+    except Exception as err:
+        return LocalSpaceTradersRespose(
+            f"Request failed after {packaged_request.attempts} attempts - {err}",
+            0,
+            0,
+            url=url,
+        )
+
+
+def submit_request(
+    method,
+    url,
+    data=None,
+    json=None,
+    headers=None,
+    params=None,
+    priority=6,
+    ttl: float = None,
+    session: Session = None,
+    traffic_class: str = None,
+) -> futures.Future:
+    """like `request_and_validate`, but doesn't wait - returns a concurrent.futures.Future for the SpaceTradersResponse.
+
+    The future raises rc.RequestExpiredError if `ttl` passes before the request is sent, or the network error
+    once retries run out. Chain follow-up work (e.g. a DB write-through) with `add_done_callback`
+    instead of parking a thread on the result."""
+    packaged_request = _queue_request(
+        method,
+        url,
+        data=data,
+        json=json,
+        headers=headers,
+        params=params,
+        priority=priority,
+        ttl=ttl,
+        session=session,
+        traffic_class=traffic_class,
+    )
+    return _response_future(packaged_request)
+
+
+def _response_future(packaged_request: "rc.PackageedRequest") -> futures.Future:
+    "a future for the package's response, wrapped in a RemoteSpaceTradersRespose."
+    wrapped = futures.Future()
+
+    def _wrap(raw: futures.Future):
+        if raw.cancelled():
+            wrapped.cancel()
+        elif raw.exception() is not None:
+            wrapped.set_exception(raw.exception())
+        else:
+            wrapped.set_result(
+                RemoteSpaceTradersRespose(raw.result(), packaged_request.priority)
+            )
+
+    packaged_request.future.add_done_callback(_wrap)
+    return wrapped
+
+
+async def request_and_validate_async(
+    method,
+    url,
+    data=None,
+    json=None,
+    headers=None,
+    params=None,
+    priority=6,
+    ttl: float = None,
+    session: Session = None,
+    traffic_class: str = None,
+) -> SpaceTradersResponse:
+    "awaitable version of `request_and_validate` - must be called from inside a running event loop."
+    if isinstance(data, dict):
+        json = data
+        data = None
+    if priority == 6:
+        logging.warning("Priority not set in url %s", url)
+    request = requests.Request(
+        method, url=url, data=data, json=json, headers=headers, params=params
+    )
+    consumer = arc.AsyncRequestConsumer(key=rc.consumer_key_from_headers(headers))
+    try:
+        response = await consumer.submit(
+            priority,
+            request.prepare(),
+            ttl=ttl,
+            session=session,
+            traffic_class=traffic_class,
+        )
+    except rc.RequestExpiredError:
+        return LocalSpaceTradersRespose(
+            "Timed out waiting for request to be sent.", 0, 0, url=url
+        )
+    except Exception as err:
+        return LocalSpaceTradersRespose(
+            f"Request failed after retrying - {err}", 0, 0, url=url
+        )
+    return RemoteSpaceTradersRespose(response, priority)
+
+
+async def get_and_validate_async(
+    url,
+    params=None,
+    headers=None,
+    priority=5,
+    ttl: float = None,
+    session: Session = None,
+    traffic_class: str = None,
+) -> SpaceTradersResponse:
+    return await request_and_validate_async(
+        "GET",
+        url,
+        params=params,
+        headers=headers,
+        priority=priority,
+        ttl=ttl,
+        session=session,
+        traffic_class=traffic_class,
+    )
+
+
+async def post_and_validate_async(
+    url,
+    data=None,
+    json=None,
+    headers=None,
+    priority=5,
+    ttl: float = None,
+    session: Session = None,
+    traffic_class: str = None,
+) -> SpaceTradersResponse:
+    headers = headers or {}
+    headers["Content-Type"] = "application/json"
+    return await request_and_validate_async(
+        "POST",
+        url,
+        data=data,
+        json=json,
+        headers=headers,
+        priority=priority,
+        ttl=ttl,
+        session=session,
+        traffic_class=traffic_class,
+    )
+
+
+async def patch_and_validate_async(
+    url,
+    data=None,
+    json=None,
+    headers=None,
+    priority=5,
+    session: Session = None,
+    traffic_class: str = None,
+) -> SpaceTradersResponse:
+    return await request_and_validate_async(
+        "PATCH",
+        url,
+        data=data,
+        json=json,
+        headers=headers,
+        priority=priority,
+        session=session,
+        traffic_class=traffic_class,
     )
 
 
@@ -151,30 +598,93 @@ def get_and_validate(
     per_page=None,
     session: Session = None,
     priority=5,
+    ttl: float = None,
+    traffic_class: str = None,
 ) -> SpaceTradersResponse or None:
     "wraps the requests.get function to make it easier to use"
 
     return request_and_validate(
-        "GET", url, params=params, headers=headers, priority=priority
+        "GET",
+        url,
+        params=params,
+        headers=headers,
+        priority=priority,
+        ttl=ttl,
+        session=session,
+        traffic_class=traffic_class,
     )
 
 
+def get_raw(
+    url,
+    params=None,
+    headers=None,
+    session: Session = None,
+    priority=5,
+    ttl: float = None,
+    traffic_class: str = None,
+) -> requests.Response or SpaceTradersResponse:
+    """like `get_and_validate`, but returns the requests.Response itself with its body undecoded -
+    for callers that decode it their own way, e.g. straight into models_structs.
+    Returns a LocalSpaceTradersRespose if there's no response (timed out, cancelled, or retries ran out).
+    """
+    packaged_request = _queue_request(
+        "GET",
+        url,
+        headers=headers,
+        params=params,
+        priority=priority,
+        ttl=ttl,
+        session=session,
+        traffic_class=traffic_class,
+    )
+    return _wait_for_raw_response(packaged_request, url, ttl)
+
+
 def post_and_validate(
-    url, data=None, json=None, headers=None, priority=5, session: Session = None
+    url,
+    data=None,
+    json=None,
+    headers=None,
+    priority=5,
+    session: Session = None,
+    ttl: float = None,
+    traffic_class: str = None,
 ) -> SpaceTradersResponse:
     "wraps the requests.post function to make it easier to use"
     headers = headers or {}
     headers["Content-Type"] = "application/json"
     return request_and_validate(
-        "POST", url, data=data, json=json, headers=headers, priority=priority
+        "POST",
+        url,
+        data=data,
+        json=json,
+        headers=headers,
+        priority=priority,
+        ttl=ttl,
+        session=session,
+        traffic_class=traffic_class,
     )
 
 
 def patch_and_validate(
-    url, data=None, json=None, headers=None, session: Session = None, priority=5
+    url,
+    data=None,
+    json=None,
+    headers=None,
+    session: Session = None,
+    priority=5,
+    traffic_class: str = None,
 ) -> SpaceTradersResponse:
     return request_and_validate(
-        "PATCH", url, data=data, json=json, headers=headers, priority=priority
+        "PATCH",
+        url,
+        data=data,
+        json=json,
+        headers=headers,
+        priority=priority,
+        session=session,
+        traffic_class=traffic_class,
     )
 
 
@@ -187,7 +697,10 @@ def _url(endpoint) -> str:
 def _log_response(response: requests.Response) -> None:
     "log the response from the server"
     # time, status_code, url, error details if present
-    data = response.json() if response.content else {}
+    try:
+        data = response_json(response)
+    except DECODE_ERRORS:
+        data = {}
     url_stub = urllib.parse.urlparse(response.url).path
 
     error_text = f" {data['error']['code']}{data['error']}" if "error" in data else ""
@@ -258,6 +771,108 @@ def waypoint_suffix(anything: str) -> str:
     return pieces[-1]
 
 
+class UnitOfWork:
+    "the transaction a group of writes on one connection share - see `unit_of_work`. Falsy once a statement has failed."
+
+    def __init__(self, connection) -> None:
+        self.connection = connection
+        self.depth = 0
+        self.error = None
+        self._on_commit = []
+        self._on_rollback = []
+
+    def fail(self, err: Exception):
+        if self.error is None:
+            self.error = err
+
+    def on_commit(self, callback):
+        "`callback()` runs once the outermost unit has committed - not when a nested one finishes."
+        self._on_commit.append(callback)
+
+    def on_rollback(self, callback):
+        "`callback()` runs if the unit is rolled back, e.g. to put back state that assumed the write would stick."
+        self._on_rollback.append(callback)
+
+    def _run_callbacks(self, callbacks: list):
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as err:
+                logging.error("Unit of work callback failed: %s", err)
+
+    def response(self) -> LocalSpaceTradersRespose:
+        if self.error is None:
+            return LocalSpaceTradersRespose(
+                None, None, None, url=f"{__name__}.unit_of_work"
+            )
+        return LocalSpaceTradersRespose(
+            error=self.error,
+            status_code=0,
+            error_code=0,
+            url=f"{__name__}.unit_of_work",
+        )
+
+    def __bool__(self):
+        return self.error is None
+
+
+_units_of_work: dict = {}
+_units_of_work_lock = threading.Lock()
+
+
+def _active_unit_of_work(connection) -> UnitOfWork:
+    with _units_of_work_lock:
+        return _units_of_work.get(id(connection))
+
+
+@contextmanager
+def unit_of_work(connection):
+    """groups every upsert on `connection` inside the block into one transaction, committed once on the way out.
+    If a statement fails (or the block raises) the whole lot is rolled back - nothing is half written.
+    Nested units join the outermost one, so an entity's writes can be grouped into a whole mediator call's.
+
+        with unit_of_work(connection) as unit:
+            _upsert_ship(ship, connection)
+            _upsert_agent(agent, connection)
+        if not unit:
+            return unit.response()
+    """
+    key = id(connection)
+    with _units_of_work_lock:
+        unit = _units_of_work.get(key)
+        if unit is None:
+            unit = _units_of_work[key] = UnitOfWork(connection)
+        unit.depth += 1
+    try:
+        yield unit
+    except Exception as err:
+        unit.fail(err)
+        raise
+    finally:
+        with _units_of_work_lock:
+            unit.depth -= 1
+            outermost = unit.depth == 0
+            if outermost:
+                del _units_of_work[key]
+        if outermost:
+            _finish_unit_of_work(unit)
+
+
+def _finish_unit_of_work(unit: UnitOfWork):
+    connection = unit.connection
+    if unit:
+        try:
+            connection.commit()
+            unit._run_callbacks(unit._on_commit)
+            return
+        except Exception as err:
+            logging.error("Couldn't commit unit of work: %s", err)
+            unit.fail(err)
+    if not connection.closed > 0:
+        connection.rollback()
+    unit._run_callbacks(unit._on_rollback)
+
+
 def try_execute_upsert(sql="", params=(), connection=None) -> LocalSpaceTradersRespose:
     skip_return = connection is not None
 
@@ -270,17 +885,25 @@ def try_execute_upsert(sql="", params=(), connection=None) -> LocalSpaceTradersR
         connection = PGConnectionPool().get_connection()
         skip_return = False
 
+    # inside a unit of work the commit (or rollback) waits for the end of the unit
+    unit = _active_unit_of_work(connection)
+    if unit is not None and not unit:
+        # the transaction is already aborted - every statement after the failure would fail too.
+        return unit.response()
     try:
         with connection.cursor() as cur:
             cur.execute(sql, params)
-        connection.commit()
+        if unit is None:
+            connection.commit()
         return LocalSpaceTradersRespose(
             None, None, None, url=f"{__name__}.try_execute_upsert"
         )
     except Exception as err:
         logging.error("Couldn't execute upsert: %s", err)
         logging.debug("SQL: %s", sql)
-        if not connection.closed > 0:
+        if unit is not None:
+            unit.fail(err)
+        elif not connection.closed > 0:
             connection.rollback()
         return LocalSpaceTradersRespose(
             error=err, status_code=0, error_code=0, url=f"{__name__}.try_execute_upsert"
@@ -290,6 +913,57 @@ def try_execute_upsert(sql="", params=(), connection=None) -> LocalSpaceTradersR
             PGConnectionPool().return_connection(connection)
 
 
+def try_execute_values(statements: list, connection=None) -> LocalSpaceTradersRespose:
+    """runs several multi-row upserts as a single transaction - one commit, and one round trip per statement
+    rather than one per row. Each statement is `(sql, rows)`, where the sql has a single `VALUES %s`
+    that `rows` (a list of param tuples) is expanded into. Statements with no rows are skipped.
+    A statement can be `(sql, rows, template)` to expand each row into something other than `(%s, %s, ...)`.
+    """
+    skip_return = connection is not None
+
+    if not connection:
+        logging.warning("try_execute_values is falling back to the connection pool.")
+        connection = PGConnectionPool().get_connection()
+
+    if connection.closed > 1:
+        logging.error("Connection is closed")
+        connection = PGConnectionPool().get_connection()
+        skip_return = False
+
+    unit = _active_unit_of_work(connection)
+    if unit is not None and not unit:
+        return unit.response()
+    try:
+        with connection.cursor() as cur:
+            for sql, rows, *template in statements:
+                if rows:
+                    execute_values(
+                        cur,
+                        sql,
+                        rows,
+                        template=template[0] if template else None,
+                        page_size=max(len(rows), 100),
+                    )
+        if unit is None:
+            connection.commit()
+        return LocalSpaceTradersRespose(
+            None, None, None, url=f"{__name__}.try_execute_values"
+        )
+    except Exception as err:
+        logging.error("Couldn't execute upsert: %s", err)
+        logging.debug("SQL: %s", [statement[0] for statement in statements])
+        if unit is not None:
+            unit.fail(err)
+        elif not connection.closed > 0:
+            connection.rollback()
+        return LocalSpaceTradersRespose(
+            error=err, status_code=0, error_code=0, url=f"{__name__}.try_execute_values"
+        )
+    finally:
+        if not skip_return:
+            PGConnectionPool().return_connection(connection)
+
+
 def try_execute_select(sql="", params=(), connection=None) -> list:
     "Takes a connection from the connection pool, executes the select, and returns a list of rows - or a response object on failure"
     skip_return = connection is not None
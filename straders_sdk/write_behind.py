@@ -0,0 +1,192 @@
+import atexit
+import logging
+import weakref
+from collections import OrderedDict
+from threading import Condition, Thread, current_thread
+from time import monotonic
+
+# an optional write-behind buffer for DB updates - the caller hands over an object and carries on,
+# and a background writer saves it a batch at a time.
+# writes are keyed (a ship by its symbol, a market by its waypoint...) - a newer write for a key that's still waiting
+# replaces the older one, so a ship updated five times in quick succession is written once, in its latest state.
+# objects are written as they are when the batch goes out, not as they were when queued.
+# a ship only writes its dirty parts - the flags are taken as it's written, and put back if the batch rolls back,
+# so a change the ship's own thread makes meanwhile is flagged again and goes out in a later batch.
+
+WRITE_BEHIND_MAX_PENDING = 1000
+WRITE_BEHIND_BATCH_SIZE = 50
+WRITE_BEHIND_LINGER_SECONDS = 0.05
+# the writer thread exits after this long with nothing to write, and the next put starts another -
+# so an idle queue holds no thread, and nothing keeps its owner alive.
+WRITE_BEHIND_IDLE_SECONDS = 1.0
+
+# clients to close at exit, so they don't lose their last few writes - held weakly, so this doesn't keep them alive.
+_close_at_exit = weakref.WeakSet()
+
+
+def close_at_exit(client):
+    "calls `client.close()` when the process exits, if it's still around by then."
+    _close_at_exit.add(client)
+
+
+@atexit.register
+def _close_clients():
+    for client in list(_close_at_exit):
+        try:
+            client.close()
+        except Exception as err:
+            logging.getLogger(__name__).error(
+                "Couldn't close %s at exit: %s", client, err
+            )
+
+
+def write_key(obj) -> tuple:
+    "what a write coalesces on - objects without an identity we recognise are never coalesced."
+    # most specific first - a survey has its waypoint's symbol too, but many surveys share a waypoint.
+    for attribute in (
+        "signature",
+        "id",
+        "name",
+        "symbol",
+        "waypoint_symbol",
+        "waypoint",
+    ):
+        value = getattr(obj, attribute, None)
+        if isinstance(value, str) and value:
+            return (type(obj).__name__, value)
+    return (type(obj).__name__, id(obj))
+
+
+class WriteBehindQueue:
+    def __init__(
+        self,
+        write_batch,
+        max_pending: int = WRITE_BEHIND_MAX_PENDING,
+        batch_size: int = WRITE_BEHIND_BATCH_SIZE,
+        linger_seconds: float = WRITE_BEHIND_LINGER_SECONDS,
+        name: str = "WriteBehind",
+        coalesce: bool = True,
+        idle_seconds: float = WRITE_BEHIND_IDLE_SECONDS,
+    ) -> None:
+        """`write_batch(objects)` is called on the writer thread with up to `batch_size` objects at a time.
+        `put` blocks once `max_pending` distinct keys are waiting, so a stalled database can't eat all the memory.
+        Without `coalesce`, every object is written - e.g. log events, where each one matters.
+        """
+        self.write_batch = write_batch
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.linger_seconds = linger_seconds
+        self.coalesce = coalesce
+        self.idle_seconds = idle_seconds
+        self.name = name
+        self.logger = logging.getLogger(name)
+        self._pending = OrderedDict()  # key -> (sequence, object)
+        self._writing = []  # sequences of the batch being written
+        self._sequence = 0
+        self._flushes_waiting = 0
+        self._closed = False
+        self._condition = Condition()
+        # started by the first put, and again after it's gone idle
+        self._writer = None
+
+    def put(self, obj):
+        key = write_key(obj) if self.coalesce else None
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("write-behind queue is closed")
+            while key not in self._pending and len(self._pending) >= self.max_pending:
+                self._condition.wait()
+            self._sequence += 1
+            if key is None:
+                key = self._sequence
+            # keeps its place in line, with the newest object and sequence
+            self._pending[key] = (self._sequence, obj)
+            if self._writer is None:
+                self._writer = Thread(target=self._run, daemon=True, name=self.name)
+                self._writer.start()
+            self._condition.notify_all()
+
+    def pending(self) -> int:
+        with self._condition:
+            return len(self._pending) + len(self._writing)
+
+    def flush(self, timeout: float = None) -> bool:
+        """a barrier - waits until everything put before the call has been written.
+        Returns False if `timeout` passed first."""
+        deadline = None if timeout is None else monotonic() + timeout
+        with self._condition:
+            target = self._sequence
+            self._flushes_waiting += 1
+            self._condition.notify_all()
+            try:
+                while self._written_up_to() < target:
+                    remaining = None if deadline is None else deadline - monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self._condition.wait(remaining)
+                return True
+            finally:
+                self._flushes_waiting -= 1
+
+    def close(self, timeout: float = None) -> bool:
+        "writes whatever is still waiting, then stops the writer - and, once flushed, waits for it to exit."
+        flushed = self.flush(timeout)
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+            writer = self._writer
+        if flushed and writer is not None and current_thread() is not writer:
+            # anything put between the flush and the close is still written first
+            writer.join(timeout)
+        return flushed
+
+    def _written_up_to(self) -> int:
+        # everything before the oldest write still waiting (or being written) is done
+        waiting = [sequence for sequence, _ in self._pending.values()] + self._writing
+        return min(waiting) - 1 if waiting else self._sequence
+
+    def _next_batch(self) -> list:
+        with self._condition:
+            idle_until = monotonic() + self.idle_seconds
+            while not self._pending:
+                remaining = idle_until - monotonic()
+                if self._closed or remaining <= 0:
+                    # nothing to write - the next put starts a new writer
+                    self._writer = None
+                    return None
+                self._condition.wait(remaining)
+            # give repeated writes a moment to coalesce, and the batch a chance to fill - unless someone's waiting on it
+            linger_until = monotonic() + self.linger_seconds
+            while (
+                len(self._pending) < self.batch_size
+                and not self._flushes_waiting
+                and not self._closed
+            ):
+                remaining = linger_until - monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            batch = []
+            while self._pending and len(batch) < self.batch_size:
+                _, (sequence, obj) = self._pending.popitem(last=False)
+                self._writing.append(sequence)
+                batch.append(obj)
+            # there's room again
+            self._condition.notify_all()
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            try:
+                self.write_batch(batch)
+            except Exception as err:
+                self.logger.error(
+                    "Write-behind batch of %s failed: %s", len(batch), err
+                )
+            finally:
+                with self._condition:
+                    self._writing = []
+                    self._condition.notify_all()
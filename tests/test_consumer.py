@@ -1,8 +1,18 @@
 import requests
-from threading import Event
+import threading
+from threading import Event, Lock
 import straders_sdk.request_consumer as rc
+import straders_sdk.request_consumer_async as arc
+from straders_sdk import utils
+from straders_sdk.transport import TransportConfig
+from straders_sdk.request_journal import RequestJournal
+import asyncio
+import random
+import time
+from queue import PriorityQueue
 import pytest
 from datetime import datetime, timedelta
+from urllib3.exceptions import MaxRetryError, NewConnectionError
 
 
 def test_u_singleton():
@@ -10,6 +20,24 @@ def test_u_singleton():
     assert rc.RequestConsumer() is rc.RequestConsumer()
 
 
+def test_u_consumer_per_token():
+    """each token gets its own consumer, queue and rate limiter"""
+    consumer_a = rc.get_consumer_for_headers(
+        {"Authorization": "Bearer token-a"}, auto_start=False
+    )
+    consumer_b = rc.get_consumer_for_headers(
+        {"Authorization": "Bearer token-b"}, auto_start=False
+    )
+    assert consumer_a is not consumer_b
+    assert consumer_a.queue is not consumer_b.queue
+    assert consumer_a.limiter is not consumer_b.limiter
+    assert consumer_a is rc.get_consumer("token-a")
+    assert consumer_a in rc.registered_consumers()
+
+    assert rc.get_consumer_for_headers({}) is rc.RequestConsumer()
+    assert rc.consumer_key_from_headers(None) is None
+
+
 def test_u_queue():
     """test that the queue is working"""
     consumer = rc.RequestConsumer(auto_start=False)
@@ -45,6 +73,952 @@ def test_send_some_requets():
     assert responses in ([3, 2, 1], [1, 3, 2])
 
 
+def test_u_deprecated_send_frequency():
+    with pytest.deprecated_call():
+        assert utils.SEND_FREQUENCY == 0.33
+    with pytest.deprecated_call():
+        from straders_sdk.utils import SEND_FREQUENCY_VIP
+    assert SEND_FREQUENCY_VIP == 3
+
+
+def _classed_package(traffic_class, priority=5):
+    # distinct urls, so nothing is coalesced
+    request = requests.Request(
+        "GET", f"https://localhost/v2/{traffic_class}/{random.random()}"
+    ).prepare()
+    return rc.PackageedRequest(priority, request, Event(), traffic_class=traffic_class)
+
+
+def test_u_traffic_classes_share_by_weight():
+    """a saturated queue is shared between classes by weight - nothing starves"""
+    queue = rc.FairPriorityQueue(
+        weights={rc.TRAFFIC_NAVIGATION: 3, rc.TRAFFIC_BULK_SYNC: 1}
+    )
+    for _ in range(40):
+        queue.put(_classed_package(rc.TRAFFIC_BULK_SYNC))
+        # bulk sync asks for a more urgent priority, but that only orders requests within its class
+        queue.put(_classed_package(rc.TRAFFIC_NAVIGATION, priority=9))
+    served = [queue.get_nowait().traffic_class for _ in range(40)]
+    assert served.count(rc.TRAFFIC_NAVIGATION) == 30
+    assert served.count(rc.TRAFFIC_BULK_SYNC) == 10
+    # bulk sync gets a turn at least every 4 sends
+    assert all(rc.TRAFFIC_BULK_SYNC in served[i : i + 4] for i in range(0, 40, 4))
+
+
+def test_u_traffic_class_priority_and_idle_credit():
+    queue = rc.FairPriorityQueue()
+    low = _classed_package(rc.TRAFFIC_MARKET_INTEL, priority=5)
+    high = _classed_package(rc.TRAFFIC_MARKET_INTEL, priority=1)
+    queue.put(low)
+    queue.put((high.priority, high))
+    assert queue.get_nowait()[1] is high
+    assert queue.get_nowait() is low
+
+    # a class that was idle while another was busy doesn't get to monopolise the queue when it comes back
+    for _ in range(20):
+        queue.put(_classed_package(rc.TRAFFIC_GENERAL))
+    for _ in range(20):
+        queue.get_nowait()
+    for _ in range(4):
+        queue.put(_classed_package(rc.TRAFFIC_GENERAL))
+        queue.put(_classed_package(rc.TRAFFIC_BULK_SYNC))
+    served = [queue.get_nowait().traffic_class for _ in range(4)]
+    assert rc.TRAFFIC_GENERAL in served[:2]
+    assert queue.queue.depth_by_class() == {
+        rc.TRAFFIC_GENERAL: 4 - served.count(rc.TRAFFIC_GENERAL),
+        rc.TRAFFIC_BULK_SYNC: 4 - served.count(rc.TRAFFIC_BULK_SYNC),
+    }
+
+
+def test_u_consumer_reports_depth_by_class():
+    consumer = rc.get_consumer("traffic-class-token", auto_start=False)
+    consumer.put(_classed_package(rc.TRAFFIC_EXTRACTION))
+    consumer.put(_classed_package(None))
+    stats = consumer.stats()
+    assert stats["queue_depth_by_class"] == {
+        rc.TRAFFIC_EXTRACTION: 1,
+        rc.TRAFFIC_GENERAL: 1,
+    }
+
+
+def _rate_limited_response(status_code=200, remaining=2, reset_in=1):
+    response = requests.Response()
+    response.status_code = status_code
+    reset = datetime.utcnow() + timedelta(seconds=reset_in)
+    response.headers.update(
+        {
+            "x-ratelimit-type": "IP-based",
+            "x-ratelimit-limit": "2",
+            "x-ratelimit-remaining": str(remaining),
+            "x-ratelimit-reset": reset.strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
+            "x-ratelimit-burst": "30",
+            "x-ratelimit-per-second": "60",
+        }
+    )
+    return response
+
+
+def test_u_token_bucket():
+    bucket = rc.TokenBucket(2, 2)
+    now = bucket._last_refill
+    assert bucket.try_take(now)
+    assert bucket.try_take(now)
+    assert not bucket.try_take(now)
+    assert bucket.seconds_until_token(now) == pytest.approx(0.5)
+    assert bucket.try_take(now + 0.5)
+
+
+def test_u_rate_limiter_uses_burst():
+    """the steady bucket empties first, then the burst bucket is spent without waiting"""
+    limiter = rc.RateLimiter(limit_per_second=2, burst_limit=30, burst_period=60)
+    sent = 0
+    while limiter.try_acquire():
+        sent += 1
+    assert sent == 32
+    assert limiter.seconds_until_available() > 0
+
+
+def test_u_rate_limiter_headers():
+    limiter = rc.RateLimiter()
+    limiter.update_from_response(_rate_limited_response(remaining=0))
+    assert limiter.steady.tokens < 1
+    assert limiter.try_acquire()  # burst capacity is still available
+
+    limiter.update_from_response(_rate_limited_response(429, remaining=0, reset_in=2))
+    assert not limiter.try_acquire()
+    assert 1.5 < limiter.seconds_until_available() <= 2.1
+
+    # responses without rate limit headers are ignored
+    limiter = rc.RateLimiter()
+    limiter.update_from_response(requests.Response())
+    assert limiter.try_acquire()
+
+
+def test_u_rate_limiter_refill_from_live_headers():
+    """the live API's headers - limit 2, burst 30, per-second 60 - mean 2 requests a second,
+    plus a burst of 30 that refills over 60 seconds"""
+    limiter = rc.RateLimiter(limit_per_second=5, burst_limit=5, burst_period=1)
+    limiter.update_from_response(_rate_limited_response())
+    assert (limiter.steady.capacity, limiter.steady.refill_rate) == (2, 2)
+    assert limiter.burst.capacity == 30
+    assert limiter.burst.refill_rate == pytest.approx(0.5)
+
+
+def test_u_package_ordering():
+    """strict priority order, first-in-first-out within a priority"""
+    first = rc.PackageedRequest(5, None, None)
+    second = rc.PackageedRequest(5, None, None)
+    urgent = rc.PackageedRequest(1, None, None)
+    assert urgent < first < second
+    assert not first < first
+    assert first == first and first != second
+    assert sorted([second, urgent, first]) == [urgent, first, second]
+
+    # a request re-queued at priority 0 keeps its place ahead of newer priority 0 requests
+    newer_zero = rc.PackageedRequest(0, None, None)
+    second.priority = 0
+    assert second < newer_zero
+
+
+def test_u_package_aging(monkeypatch):
+    """a long-waiting low priority request eventually overtakes new high priority ones"""
+    old = rc.PackageedRequest(5, None, None)
+    monkeypatch.setattr(rc, "monotonic", lambda: old.enqueued_at + 10 * 60)
+    new = rc.PackageedRequest(1, None, None)
+    assert old < new
+
+
+def _drain_through_queue(count: int) -> tuple:
+    queue = PriorityQueue()
+    packages = [
+        rc.PackageedRequest(random.randint(0, 9), None, None) for _ in range(count)
+    ]
+    start = time.perf_counter()
+    for package in packages:
+        queue.put(package)
+    drained = [queue.get() for _ in range(count)]
+    return packages, drained, time.perf_counter() - start
+
+
+def test_u_queue_ordering():
+    """requests come out of the queue in (priority, arrival) order"""
+    packages, drained, _ = _drain_through_queue(10_000)
+    expected = sorted(packages, key=lambda p: (p.priority, p.sequence))
+    # all packages were created within a second or so, so aging can only reorder across adjacent priorities
+    assert [p._key() for p in drained] == sorted(p._key() for p in packages)
+    assert [p.sequence for p in drained][:100] == [p.sequence for p in expected][:100]
+
+
+@pytest.mark.benchmark
+def test_queue_ordering_benchmark():
+    count = 100_000
+    _, _, elapsed = _drain_through_queue(count)
+    assert (
+        count / elapsed > 10_000
+    ), f"{count} requests through the queue in {elapsed:.2f}s"
+
+
+class _FakeSession:
+    "stands in for requests.Session - answers every request with a 200 and records the order they were sent in"
+
+    def __init__(self):
+        self.sent = []
+
+    def send(self, request, **kwargs):
+        self.sent.append(request.url)
+        response = _rate_limited_response(remaining=2)
+        response.url = request.url
+        response._content = b'{"data": {}}'
+        return response
+
+
+class _FlakySession(_FakeSession):
+    "fails every request to /bad with a connection error"
+
+    def send(self, request, **kwargs):
+        if request.url.endswith("/bad"):
+            self.sent.append(request.url)
+            raise requests.ConnectionError("connection reset")
+        return super().send(request, **kwargs)
+
+
+def _refused() -> requests.ConnectionError:
+    "what requests raises when nothing is listening - the request never left"
+    return requests.ConnectionError(
+        MaxRetryError(None, "/", NewConnectionError(None, "connection refused"))
+    )
+
+
+class _TimeoutSession(_FakeSession):
+    "times out reading the answer to /purchase, and refuses the first connection to /refused"
+
+    def send(self, request, **kwargs):
+        if request.url.endswith("/purchase"):
+            self.sent.append(request.url)
+            raise requests.ReadTimeout("read timed out")
+        if request.url.endswith("/refused") and "refused" not in str(self.sent):
+            self.sent.append(request.url)
+            raise _refused()
+        return super().send(request, **kwargs)
+
+
+class _SlowSession:
+    "takes `latency` seconds to answer, and records the most requests it had on the wire at once"
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = Lock()
+
+    def send(self, request, **kwargs):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.latency)
+        with self._lock:
+            self.in_flight -= 1
+        response = requests.Response()
+        response.status_code = 200
+        response.url = request.url
+        response._content = b'{"data": {}}'
+        return response
+
+
+def test_u_pipelined_sends():
+    """the next request goes out on schedule while the previous one is still waiting for its response"""
+    consumer = rc.get_consumer("pipeline-token", auto_start=False)
+    consumer.configure_transport(TransportConfig(max_in_flight=4))
+    consumer.limiter = rc.RateLimiter(limit_per_second=10, burst_limit=0)
+    consumer._session = _SlowSession(latency=0.3)
+    packages = [
+        consumer.put(
+            rc.PackageedRequest(
+                5, requests.Request("GET", f"https://localhost/{i}").prepare(), Event()
+            )
+        )
+        for i in range(8)
+    ]
+    start = time.perf_counter()
+    consumer.start()
+    try:
+        for package in packages:
+            assert package.event.wait(5)
+            assert package.response.status_code == 200
+    finally:
+        consumer.stop()
+    elapsed = time.perf_counter() - start
+    # sends overlapped - one at a time, this would take 8 * 0.3 seconds
+    assert consumer._session.max_in_flight > 1
+    assert elapsed < 8 * 0.3
+    assert consumer._session.max_in_flight <= 4
+    assert consumer.stats()["in_flight"] == 0
+
+
+def test_u_submit_many_is_one_band():
+    """a batch is queued together, in one priority band, in the order given"""
+    consumer = rc.get_consumer("submit-many-token", auto_start=False)
+    before = consumer.put(_classed_package(None, priority=5))
+    batch = [_classed_package(None, priority=p) for p in (9, 1, 5)]
+    queued = consumer.submit_many(batch, priority=3)
+    after = consumer.put(_classed_package(None, priority=3))
+    assert queued == batch
+    assert {package.priority for package in batch} == {3}
+    served = [consumer.queue.get_nowait() for _ in range(5)]
+    assert served == batch + [after, before]
+
+
+def test_u_queue_many_and_gather():
+    consumer = rc.get_consumer("queue-many-token", auto_start=False)
+    consumer._session = _FakeSession()
+    headers = {"Authorization": "Bearer queue-many-token"}
+    calls = [
+        {"url": f"https://localhost/v2/ships/{i}", "headers": headers} for i in range(4)
+    ]
+    calls.append({"url": "https://localhost/v2/ships/0", "headers": headers})
+    calls.append(
+        {
+            "method": "POST",
+            "url": "https://localhost/v2/ships/0/dock",
+            "headers": headers,
+        }
+    )
+    packages = utils.queue_many(calls, priority=2)
+    # the duplicate GET shares the first one's package
+    assert packages[4] is packages[0]
+    try:
+        responses = utils.gather(packages, ttl=5)
+    finally:
+        consumer.stop()
+    assert all(responses)
+    assert len(consumer._session.sent) == 5
+    assert consumer._session.sent[-1] == "https://localhost/v2/ships/0/dock"
+
+
+def test_u_only_safe_requests_are_retried(monkeypatch):
+    """a POST that may have reached the server is never sent again - the caller gets the error.
+    GETs, and anything that never got as far as the server, are retried"""
+    monkeypatch.setattr(rc, "RETRY_BASE_SECONDS", 0.01)
+    consumer = rc.get_consumer("retry-safe-token", auto_start=False)
+    consumer._session = _TimeoutSession()
+    futures = {
+        (method, path): consumer.submit(
+            5, requests.Request(method, f"https://localhost/v2/{path}").prepare()
+        )
+        for method, path in [
+            ("POST", "purchase"),
+            ("GET", "purchase"),
+            ("POST", "refused"),
+        ]
+    }
+    try:
+        with pytest.raises(requests.ReadTimeout):
+            futures["POST", "purchase"].result(5)
+        with pytest.raises(requests.ReadTimeout):
+            futures["GET", "purchase"].result(5)
+        assert futures["POST", "refused"].result(5).status_code == 200
+    finally:
+        consumer.stop()
+    sent = consumer._session.sent
+    # one POST and six GETs
+    assert sent.count("https://localhost/v2/purchase") == 1 + 1 + rc.DEFAULT_MAX_RETRIES
+    assert sent.count("https://localhost/v2/refused") == 2
+
+
+def test_u_async_does_not_retry_unsafe_requests():
+    async def run():
+        consumer = arc.AsyncRequestConsumer(key="async-retry-safe-token")
+        consumer._session = _TimeoutSession()
+        request = requests.Request("POST", "https://localhost/v2/purchase").prepare()
+        try:
+            with pytest.raises(requests.ReadTimeout):
+                await consumer.submit(5, request)
+        finally:
+            consumer.stop()
+        return consumer
+
+    consumer = asyncio.run(run())
+    assert consumer._session.sent == ["https://localhost/v2/purchase"]
+
+
+def test_u_retry_does_not_block_queue(monkeypatch):
+    """a failing request backs off on its own while the others are sent, then reports failure to the caller"""
+    monkeypatch.setattr(rc, "RETRY_BASE_SECONDS", 0.05)
+    consumer = rc.get_consumer("retry-token", auto_start=False)
+    consumer._session = _FlakySession()
+
+    bad = rc.PackageedRequest(
+        0, requests.Request("GET", "https://localhost/bad").prepare(), Event(), 2
+    )
+    good = [
+        rc.PackageedRequest(
+            1, requests.Request("GET", f"https://localhost/{i}").prepare(), Event()
+        )
+        for i in range(3)
+    ]
+    consumer.queue.put((bad.priority, bad))
+    for package in good:
+        consumer.queue.put((package.priority, package))
+    consumer.start()
+    try:
+        for package in good:
+            assert package.event.wait(5)
+            assert package.response.status_code == 200
+        assert bad.event.wait(5)
+    finally:
+        consumer.stop()
+    assert bad.attempts == 3
+    assert isinstance(bad.error, requests.ConnectionError)
+    assert bad.future.exception() is bad.error
+    assert consumer._session.sent.count("https://localhost/bad") == 3
+    # the good requests went out while the bad one was backing off
+    assert (
+        consumer._session.sent.index("https://localhost/2")
+        < len(consumer._session.sent) - 1
+    )
+
+
+def test_u_coalesce_identical_gets():
+    consumer = rc.get_consumer("coalesce-token", auto_start=False)
+    consumer._session = _FakeSession()
+    headers = {"Authorization": "Bearer coalesce-token"}
+
+    def package(method="GET", url="https://localhost/v2/systems/X1", token=headers):
+        request = requests.Request(method, url, headers=token).prepare()
+        return rc.PackageedRequest(5, request, Event())
+
+    first = consumer.put(package())
+    assert consumer.put(package()) is first
+    assert consumer.put(package(url="https://localhost/v2/systems/X2")) is not first
+    other_token = consumer.put(package(token={"Authorization": "Bearer other"}))
+    assert other_token is not first
+    post_url = "https://localhost/v2/my/ships/X/orbit"
+    post = consumer.put(package("POST", post_url))
+    assert consumer.put(package("POST", post_url)) is not post
+
+    consumer.start()
+    try:
+        assert first.event.wait(5)
+        # sends overlap, so the other token's request may still be in flight
+        assert other_token.event.wait(5)
+        assert consumer._session.sent.count("https://localhost/v2/systems/X1") == 2
+        # once the response is in, a new identical request is sent again
+        assert consumer.put(package()) is not first
+    finally:
+        consumer.stop()
+
+
+def test_u_coalesce_escalates_queued_request():
+    """a more urgent caller sharing a queued GET moves it up to its own priority and traffic class"""
+    consumer = rc.get_consumer("escalate-token", auto_start=False)
+    url = "https://localhost/v2/my/ships"
+
+    def package(priority, traffic_class):
+        request = requests.Request("GET", url).prepare()
+        return rc.PackageedRequest(
+            priority, request, Event(), traffic_class=traffic_class
+        )
+
+    sync = consumer.put(package(9, rc.TRAFFIC_BULK_SYNC))
+    assert consumer.put(package(5, rc.TRAFFIC_GENERAL)) is sync
+    assert (sync.priority, sync.traffic_class) == (5, rc.TRAFFIC_GENERAL)
+    assert consumer.put(package(1, rc.TRAFFIC_NAVIGATION)) is sync
+    assert (sync.priority, sync.traffic_class) == (1, rc.TRAFFIC_NAVIGATION)
+    assert consumer.queue.queue.depth_by_class() == {rc.TRAFFIC_NAVIGATION: 1}
+    # a less urgent caller changes nothing
+    assert consumer.put(package(7, rc.TRAFFIC_BULK_SYNC)) is sync
+    assert (sync.priority, sync.traffic_class) == (1, rc.TRAFFIC_NAVIGATION)
+
+    async def run():
+        queue = arc.AsyncFairPriorityQueue()
+        queued = arc.AsyncPackagedRequest(
+            9,
+            requests.Request("GET", url).prepare(),
+            None,
+            traffic_class=rc.TRAFFIC_BULK_SYNC,
+        )
+        queue.put_nowait((*queued.sort_key(), queued))
+        assert queue.escalate(queued, 1, rc.TRAFFIC_NAVIGATION)
+        assert queue._queue.depth_by_class() == {rc.TRAFFIC_NAVIGATION: 1}
+        assert (await queue.get())[-1] is queued
+        assert not queue.escalate(queued, 0, rc.TRAFFIC_NAVIGATION)
+
+    asyncio.run(run())
+
+
+def test_u_consumer_stats():
+    consumer = rc.get_consumer("stats-token", auto_start=False)
+    consumer._session = _FakeSession()
+    packages = []
+    for priority in (1, 1, 3):
+        request = requests.Request("POST", "https://localhost/v2/x").prepare()
+        packages.append(consumer.put(rc.PackageedRequest(priority, request, Event())))
+
+    stats = consumer.stats()
+    assert stats["queue_depth"] == 3
+    assert stats["queue_depth_by_priority"] == {1: 2, 3: 1}
+    assert stats["sent"] == 0
+
+    snapshots = []
+    snapshot_taken = Event()
+
+    def snapshot(stats):
+        snapshots.append(stats)
+        snapshot_taken.set()
+
+    consumer.start_stats_snapshots(0.05, snapshot)
+    consumer.start()
+    try:
+        for package in packages:
+            package.future.result(5)
+        assert snapshot_taken.wait(5)
+    finally:
+        consumer.stop()
+    stats = consumer.stats()
+    assert stats["queue_depth"] == 0
+    assert stats["sent"] == stats["completed"] == 3
+    assert stats["wait_time"]["count"] == 3
+    assert stats["send_latency"]["count"] == 3
+    assert stats["requests_per_second"] > 0
+    assert snapshots
+
+
+def test_u_expired_requests_are_dropped():
+    consumer = rc.get_consumer("ttl-token", auto_start=False)
+    consumer._session = _FakeSession()
+    stale = rc.PackageedRequest(
+        1,
+        requests.Request("GET", "https://localhost/v2/stale").prepare(),
+        Event(),
+        ttl=-1,
+    )
+    fresh = rc.PackageedRequest(
+        2, requests.Request("GET", "https://localhost/v2/fresh").prepare(), Event()
+    )
+    consumer.put(stale)
+    consumer.put(fresh)
+    consumer.start()
+    try:
+        assert fresh.event.wait(5)
+        assert stale.event.wait(5)
+    finally:
+        consumer.stop()
+    assert stale.expired and stale.response is None
+    assert isinstance(stale.future.exception(), rc.RequestExpiredError)
+    assert consumer._session.sent == ["https://localhost/v2/fresh"]
+    assert consumer.stats()["expired"] == 1
+
+
+def test_u_request_ttl_returns_timeout():
+    consumer = rc.get_consumer("ttl-caller-token", auto_start=False)
+    consumer._session = _FakeSession()
+    consumer.limiter.block_for(2)
+    resp = utils.request_and_validate(
+        "GET",
+        "https://localhost/v2/markets",
+        headers={"Authorization": "Bearer ttl-caller-token"},
+        priority=5,
+        ttl=0.2,
+    )
+    consumer.stop()
+    assert not resp
+    assert resp.error == "Timed out waiting for request to be sent."
+
+
+def test_u_handlers_run_off_the_send_path():
+    """a slow handler doesn't hold up sending, and only sees the endpoints it subscribed to"""
+    consumer = rc.get_consumer("handler-token", auto_start=False)
+    # no rate limit headers, so the limiter stays wide open
+    consumer._session = _SlowSession(latency=0)
+    consumer.limiter = rc.RateLimiter(limit_per_second=100, burst_limit=0)
+    seen = {"markets": [], "everything": []}
+    release = Event()
+    all_handled = Event()
+
+    def slow_market_handler(response):
+        release.wait(5)
+        seen["markets"].append(response.url)
+
+    def everything_handler(response):
+        seen["everything"].append(response.url)
+        if len(seen["everything"]) == len(urls):
+            all_handled.set()
+
+    consumer.register_handler(slow_market_handler, "markets", pattern=r"/market$")
+    consumer.register_handler(everything_handler, "everything")
+    urls = [f"https://localhost/v2/systems/X1/waypoints/A{i}/market" for i in range(6)]
+    urls += ["https://localhost/v2/my/ships"]
+    futures = [
+        consumer.submit(5, requests.Request("GET", url).prepare()) for url in urls
+    ]
+    try:
+        # every response arrives while the market handler is still stuck
+        for future in futures:
+            future.result(5)
+        assert seen["markets"] == []
+        release.set()
+        assert all_handled.wait(5)
+    finally:
+        release.set()
+        consumer.stop()
+    assert sorted(seen["markets"]) == sorted(urls[:6])
+    assert sorted(seen["everything"]) == sorted(urls)
+
+
+def test_u_handler_backpressure():
+    pipeline = rc.HandlerPipeline(workers=1, max_backlog=1)
+    release = Event()
+    picked_up = Event()
+
+    def blocking(response):
+        picked_up.set()
+        release.wait(5)
+
+    pipeline.register(blocking, "blocking")
+    response = _rate_limited_response()
+    response.url = "https://localhost/v2/my/ships"
+    assert pipeline.dispatch(response)
+    # the worker has the first response - wait for it to pick it up, then fill the backlog
+    assert picked_up.wait(5)
+    assert pipeline.dispatch(response)
+    assert not pipeline.dispatch(response, block=False)
+    release.set()
+    pipeline.join()
+    assert pipeline.backlog() == 0
+
+
+def test_u_global_handlers():
+    """a handler registered on the anonymous consumer sees every token's traffic, including consumers created later"""
+    seen = []
+    handled = Event()
+
+    def handler(response):
+        seen.append(response.url)
+        handled.set()
+
+    rc.RequestConsumer(auto_start=False).register_handler(
+        handler, "everything-everywhere"
+    )
+    try:
+        consumer = rc.get_consumer("global-handler-token", auto_start=False)
+        consumer._session = _FakeSession()
+        future = consumer.submit(
+            5, requests.Request("GET", "https://localhost/v2/my/agent").prepare()
+        )
+        try:
+            future.result(5)
+            # handlers run after the caller is woken
+            assert handled.wait(5)
+        finally:
+            consumer.stop()
+        assert "everything-everywhere" in consumer.handlers
+    finally:
+        rc.unregister_handler("everything-everywhere")
+    assert seen == ["https://localhost/v2/my/agent"]
+    assert "everything-everywhere" not in consumer.handlers
+
+
+def test_u_futures():
+    """callers get a concurrent.futures.Future - callbacks chain off it, and cancelled requests aren't sent"""
+    consumer = rc.get_consumer("futures-token", auto_start=False)
+    consumer._session = _FakeSession()
+    cancelled = consumer.put(
+        rc.PackageedRequest(
+            1,
+            requests.Request("GET", "https://localhost/v2/cancelled").prepare(),
+            Event(),
+        )
+    )
+    assert cancelled.future.cancel()
+    written_through = []
+    future = consumer.submit(
+        5, requests.Request("GET", "https://localhost/v2/markets").prepare()
+    )
+    future.add_done_callback(lambda f: written_through.append(f.result().url))
+    typed = utils.submit_request(
+        "GET",
+        "https://localhost/v2/systems",
+        headers={"Authorization": "Bearer futures-token"},
+        priority=5,
+    )
+    try:
+        assert future.result(5).status_code == 200
+        response = typed.result(5)
+    finally:
+        consumer.stop()
+    assert written_through == ["https://localhost/v2/markets"]
+    assert response and response.data == {}
+    assert "https://localhost/v2/cancelled" not in consumer._session.sent
+
+
+class _GatedSession(_FakeSession):
+    "holds every request on the wire until `release` is set"
+
+    def __init__(self):
+        super().__init__()
+        self.sending = Event()
+        self.release = Event()
+
+    def send(self, request, **kwargs):
+        self.sending.set()
+        self.release.wait(5)
+        return super().send(request, **kwargs)
+
+
+def test_u_ttl_only_times_out_unsent_requests():
+    """a request already on the wire is waited for past its ttl, so the caller never sends it twice -
+    one that was never sent times out, and is cancelled so it never will be"""
+    consumer = rc.get_consumer("ttl-sent-token", auto_start=False)
+    consumer._session = _GatedSession()
+
+    def post(path):
+        return consumer.put(
+            rc.PackageedRequest(
+                5,
+                requests.Request("POST", f"https://localhost/v2/{path}").prepare(),
+                Event(),
+                ttl=0.05,
+            )
+        )
+
+    unsent = post("unsent")
+    timed_out = utils._wait_for_response(unsent, unsent.request.url, 0.05)
+    assert not timed_out and "Timed out" in timed_out.error
+    assert unsent.future.cancelled()
+
+    in_flight = post("in-flight")
+    consumer.start()
+    try:
+        assert consumer._session.sending.wait(5)
+        threading.Timer(0.2, consumer._session.release.set).start()
+        response = utils._wait_for_response(in_flight, in_flight.request.url, 0.05)
+    finally:
+        consumer._session.release.set()
+        consumer.stop()
+    assert response and response.data == {}
+    assert consumer._session.sent == ["https://localhost/v2/in-flight"]
+
+
+def test_u_timed_out_caller_only_detaches_from_shared_request():
+    """a coalesced caller timing out leaves the request queued for the others still waiting on it -
+    it's only cancelled once the last of them gives up"""
+    consumer = rc.get_consumer("ttl-shared-token", auto_start=False)
+
+    def get(ttl):
+        return consumer.put(
+            rc.PackageedRequest(
+                5,
+                requests.Request("GET", "https://localhost/v2/shared").prepare(),
+                Event(),
+                ttl=ttl,
+            )
+        )
+
+    impatient = get(0.05)
+    patient = get(None)
+    assert patient is impatient and impatient.waiters == 2
+    timed_out = utils._wait_for_response(impatient, impatient.request.url, 0.05)
+    assert not timed_out and "Timed out" in timed_out.error
+    assert not impatient.future.cancelled() and impatient.deadline is None
+    assert patient.cancel_if_unsent()
+    assert patient.future.cancelled()
+
+
+def _journaled(consumer, method, path, ttl=None):
+    request = requests.Request(
+        method,
+        f"https://localhost/v2/{path}",
+        headers={"Authorization": f"Bearer {consumer.key}"},
+        data=b"{}" if method == "POST" else None,
+    ).prepare()
+    return consumer.put(rc.PackageedRequest(5, request, Event(), ttl=ttl))
+
+
+def test_u_journal_clears_answered_requests(tmp_path):
+    journal = RequestJournal(str(tmp_path / "queue.db"))
+    consumer = rc.get_consumer("journal-clear-token", auto_start=False)
+    consumer._session = _FakeSession()
+    consumer.attach_journal(journal)
+    package = _journaled(consumer, "GET", "systems")
+    assert len(journal.pending(consumer.key)) == 1
+    consumer.start()
+    try:
+        assert package.future.result(5).status_code == 200
+    finally:
+        consumer.stop()
+    assert journal.pending(consumer.key) == []
+
+
+def test_u_journal_recovers_after_restart(tmp_path):
+    """unanswered GETs come back in their place in line - writes, expired and stale reads don't"""
+    path = str(tmp_path / "queue.db")
+    key = "journal-restart-token"
+    consumer = rc.get_consumer(key, auto_start=False)
+    consumer.attach_journal(RequestJournal(path, max_age_seconds=60))
+    _journaled(consumer, "GET", "my/ships")
+    _journaled(consumer, "POST", "my/ships/SHIP-1/extract")
+    _journaled(consumer, "GET", "markets", ttl=-1)
+    _journaled(consumer, "GET", "systems")
+    # age what's on disk - one read has waited 30 seconds, the other longer than max_age
+    journal = RequestJournal(path, max_age_seconds=60)
+    journal._connection.execute(
+        "update queued_requests set queued_at = queued_at - 120 where url like '%systems'"
+    )
+    journal._connection.execute(
+        "update queued_requests set queued_at = queued_at - 30 where url like '%my/ships'"
+    )
+
+    # the process dies - a new one starts with an empty registry
+    del rc.RequestConsumer._registry[key]
+    restarted = rc.get_consumer(key, auto_start=False)
+    assert restarted is not consumer
+    assert restarted.attach_journal(journal) == 1
+    (recovered,) = [entry for entry in restarted.queue.queue]
+    assert recovered.request.url == "https://localhost/v2/my/ships"
+    assert recovered.request.headers["Authorization"] == f"Bearer {key}"
+    assert 29 < time.monotonic() - recovered.enqueued_at < 40
+
+    # the ship re-issues the same read - it waits on the recovered one
+    assert _journaled(restarted, "GET", "my/ships") is recovered
+    assert [row[2] for row in journal.pending(key)] == ["https://localhost/v2/my/ships"]
+
+
+def test_u_use_journal_counts_each_request_once(tmp_path):
+    """recovers for consumers that exist and ones that don't yet - and counts each recovered request once"""
+    path = str(tmp_path / "queue.db")
+    previous_run = RequestJournal(path)
+    for key in ("use-journal-existing", "use-journal-new"):
+        request = requests.Request(
+            "GET",
+            "https://localhost/v2/my/ships",
+            headers={"Authorization": f"Bearer {key}"},
+        ).prepare()
+        previous_run.record(key, rc.PackageedRequest(5, request, Event()))
+    previous_run.close()
+
+    existing = rc.get_consumer("use-journal-existing", auto_start=False)
+    rc.RequestConsumer._registry.pop("use-journal-new", None)
+    journal = RequestJournal(path)
+    try:
+        assert rc.use_journal(journal) == 2
+        assert len(existing.queue.queue) == 1
+        # created, started and sent straight away
+        assert rc.get_consumer("use-journal-new", auto_start=False).recovered == 1
+    finally:
+        rc._journal = None
+        for consumer in rc.registered_consumers():
+            if consumer.journal is journal:
+                consumer.journal = None
+            if consumer.key == "use-journal-new":
+                consumer.stop()
+
+
+class _PagedSession(_FakeSession):
+    "one item per page, five pages"
+
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+        response._content = b'{"data": [1], "meta": {"total": 5}}'
+        return response
+
+
+def test_u_iter_paginated_cancels_unread_pages(monkeypatch):
+    """closing the iterator early cancels the pages it queued - but not a page it shares with another caller"""
+    headers = {"Authorization": "Bearer iter-pages-token"}
+    consumer = rc.get_consumer("iter-pages-token", auto_start=False)
+    consumer._session = _PagedSession()
+    pages = utils.iter_and_validate_paginated(
+        "https://localhost/v2/systems", 1, 10, headers=headers, priority=5
+    )
+    assert next(pages).data == [1]
+    consumer.stop()
+    consumer._consumer_thread.join(5)
+    # keep the rest of the pages in the queue
+    monkeypatch.setattr(consumer, "start", lambda: None)
+
+    # someone else already has page 2 in flight, and its answer is in
+    shared = consumer.put(
+        rc.PackageedRequest(
+            5,
+            requests.Request(
+                "GET",
+                "https://localhost/v2/systems",
+                params={"limit": 1, "page": 2},
+                headers=headers,
+            ).prepare(),
+            Event(),
+        )
+    )
+    shared.future.set_result(_PagedSession().send(shared.request))
+    assert next(pages).data == [1]
+    queued = [entry for entry in consumer.queue.queue if entry is not shared]
+    assert len(queued) == 3
+    pages.close()
+    assert all(package.future.cancelled() for package in queued)
+    assert not shared.future.cancelled()
+
+
+def test_u_async_consumer():
+    async def run():
+        consumer = arc.AsyncRequestConsumer(key="async-token")
+        assert consumer is arc.AsyncRequestConsumer(key="async-token")
+        consumer._session = _FakeSession()
+        requests_to_send = [
+            requests.Request("GET", f"https://localhost/v2/{i}").prepare()
+            for i in range(5)
+        ]
+        responses = await asyncio.gather(
+            *[consumer.submit(5, request) for request in requests_to_send]
+        )
+        consumer.stop()
+        return consumer, responses
+
+    consumer, responses = asyncio.run(run())
+    assert [r.status_code for r in responses] == [200] * 5
+    assert consumer._session.sent == [f"https://localhost/v2/{i}" for i in range(5)]
+
+
+def test_u_async_coalesce():
+    async def run():
+        consumer = arc.AsyncRequestConsumer(key="async-coalesce-token")
+        consumer._session = _FakeSession()
+        request = requests.Request("GET", "https://localhost/v2/markets/1").prepare()
+        responses = await asyncio.gather(
+            *[consumer.submit(5, request) for _ in range(4)]
+        )
+        consumer.stop()
+        return consumer, responses
+
+    consumer, responses = asyncio.run(run())
+    assert len(consumer._session.sent) == 1
+    assert all(r is responses[0] for r in responses)
+
+
+def test_u_async_consumer_stops_and_forgets_closed_loops():
+    """an idle consumer waits on its queue until it's cancelled, handing back its sender slot -
+    and consumers for loops that have closed are dropped from the registry"""
+
+    async def run():
+        consumer = arc.AsyncRequestConsumer(key="async-stop-token")
+        consumer.start()
+        task = consumer._consumer_task
+        await asyncio.sleep(0)
+        consumer.stop()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert consumer._sender_slots._value == consumer.transport.max_in_flight
+        return asyncio.get_running_loop()
+
+    old_loop = asyncio.run(run())
+    assert old_loop.is_closed()
+
+    async def new_loop():
+        return arc.AsyncRequestConsumer(key="async-stop-token")
+
+    asyncio.run(new_loop())
+    assert old_loop not in arc.AsyncRequestConsumer._registry
+
+
 # this test should take about 60 seconds to run
 @pytest.mark.execution_timeout(2)
 def test_send_a_lot_of_requests():
@@ -0,0 +1,119 @@
+from threading import Event
+import pytest
+import requests
+import straders_sdk.request_consumer as rc
+from straders_sdk.client_api import SpaceTradersApiClient
+from straders_sdk.models_misc import Waypoint, Market, System
+from straders_sdk.models_ship import Ship
+from straders_sdk.replay_server import (
+    RecordedTraffic,
+    ServerRateLimit,
+    TrafficRecorder,
+)
+
+
+def test_u_replay_client(replay_server):
+    """the api client works unchanged against the replay server"""
+    client = SpaceTradersApiClient("replay-client-token", replay_server.base_url, "v2")
+
+    wayp = client.waypoints_view_one("X1-TEST-A1")
+    assert isinstance(wayp, Waypoint)
+    assert wayp.symbol == "X1-TEST-A1"
+
+    market = client.system_market(wayp)
+    assert isinstance(market, Market)
+    assert market.listings[0].symbol == "IRON"
+
+    system = client.systems_view_one("X1-TEST")
+    assert isinstance(system, System)
+
+    missing = client.systems_view_one("X1-MISSING")
+    assert not missing
+    assert missing.error_code == 404
+
+
+def test_u_paginated_fetches_pages_concurrently(replay_server):
+    """every page after the first is queued at once, using meta.total - no probing for an empty page"""
+    client = SpaceTradersApiClient("replay-pages-token", replay_server.base_url, "v2")
+    systems = client.systems_view_all()
+    assert [s.symbol for s in systems] == [f"X1-T{i:03d}" for i in range(45)]
+    assert replay_server.request_count == 3
+
+    waypoints = client.waypoints_view("X1-TEST")
+    assert list(waypoints) == [f"X1-TEST-A{i}" for i in range(1, 26)]
+    assert replay_server.request_count == 5
+
+
+def test_u_iter_systems(replay_server):
+    """systems are yielded page by page, in order"""
+    client = SpaceTradersApiClient("replay-iter-token", replay_server.base_url, "v2")
+    systems = client.iter_systems()
+    first = next(systems)
+    assert isinstance(first, System) and first.symbol == "X1-T000"
+    rest = list(systems)
+    assert [s.symbol for s in rest] == [f"X1-T{i:03d}" for i in range(1, 45)]
+
+    waypoints = list(client.iter_waypoints("X1-TEST"))
+    assert len(waypoints) == 25
+    assert all(isinstance(w, Waypoint) for w in waypoints)
+    assert list(client.iter_waypoints("X1-MISSING")) == []
+
+
+def test_u_client_batch(replay_server, ship_response_data):
+    """a fleet's worth of requests queued with one call and collected with one wait"""
+    replay_server.traffic.add("GET", "/v2/my/ships/*", {"data": ship_response_data})
+    replay_server.traffic.add(
+        "POST", "/v2/my/ships/*/orbit", {"data": {"nav": ship_response_data["nav"]}}
+    )
+    client = SpaceTradersApiClient("replay-batch-token", replay_server.base_url, "v2")
+    docked = Ship.from_json(ship_response_data)
+    docked.nav.status = "DOCKED"
+    with client.batch(priority=3) as batch:
+        views = [batch.ships_view_one(f"CTRI-{i}") for i in range(5)]
+        orbit = batch.ship_orbit(docked)
+        already_docked = batch.ship_dock(docked)
+    results = batch.gather()
+
+    assert all(isinstance(ship, Ship) for ship in results[:5])
+    assert views[0].result() is results[0]
+    assert orbit.result()
+    assert docked.nav.status == ship_response_data["nav"]["status"]
+    # answered locally - the server never saw it
+    assert already_docked.result()
+    assert replay_server.request_count == 6
+
+
+def test_u_replay_rate_limit(replay_server):
+    """the server enforces its limit with 429s, and the consumer recovers from them"""
+    replay_server.rate_limit = ServerRateLimit(limit_per_second=10, burst_limit=0)
+    consumer = rc.get_consumer("replay-429-token")
+    headers = {"Authorization": "Bearer replay-429-token"}
+    packages = []
+    for i in range(15):
+        # distinct urls, so nothing is coalesced
+        request = requests.Request(
+            "GET", f"{replay_server.base_url}/v2/systems/X1-TEST?n={i}", headers=headers
+        ).prepare()
+        packages.append(consumer.put(rc.PackageedRequest(5, request, Event())))
+    for package in packages:
+        assert package.event.wait(10)
+        assert package.response.status_code == 200
+        assert package.response.headers["x-ratelimit-limit"] == "10"
+    assert replay_server.rate_limited_count > 0
+    assert consumer.stats()["rate_limited"] == replay_server.rate_limited_count
+
+
+def test_u_traffic_recorder(tmp_path):
+    path = tmp_path / "recorded.jsonl"
+    recorder = TrafficRecorder(str(path))
+    response = requests.Response()
+    response.status_code = 200
+    response.url = "http://localhost/v2/systems/X1-REC?page=2"
+    response.request = requests.Request("GET", response.url).prepare()
+    response._content = b'{"data": {"symbol": "X1-REC"}}'
+    recorder(response)
+
+    traffic = RecordedTraffic.from_file(str(path))
+    entry = traffic.match("GET", "/v2/systems/X1-REC", {"page": "2"})
+    assert entry["body"]["data"]["symbol"] == "X1-REC"
+    assert traffic.match("GET", "/v2/systems/X1-REC", {"page": "3"}) is None
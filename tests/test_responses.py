@@ -0,0 +1,87 @@
+import json
+import time
+import requests
+import pytest
+from straders_sdk import resp_responses
+from straders_sdk.resp_responses import (
+    RemoteSpaceTradersRespose,
+    response_json,
+    set_json_decoder,
+)
+
+
+def _response(content: bytes, status_code=200) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status_code
+    response.url = "https://localhost/v2/my/ships"
+    response._content = content
+    return response
+
+
+def test_u_decode_once():
+    calls = []
+
+    def counting_decoder(content):
+        calls.append(content)
+        return json.loads(content)
+
+    set_json_decoder(counting_decoder)
+    try:
+        response = _response(b'{"data": {"symbol": "X1-TEST"}}')
+        first = RemoteSpaceTradersRespose(response)
+        second = RemoteSpaceTradersRespose(response)
+        assert response_json(response) is first.response_json
+        assert second.data == {"symbol": "X1-TEST"}
+        assert len(calls) == 1
+    finally:
+        set_json_decoder()
+
+
+def test_u_invalid_and_empty_bodies():
+    resp = RemoteSpaceTradersRespose(_response(b"<html>bad gateway</html>", 502))
+    assert resp.response_json == {}
+    resp = RemoteSpaceTradersRespose(_response(b"", 204))
+    assert resp.response_json == {}
+    assert resp
+
+
+def test_u_default_decoder_agrees_with_stdlib(
+    ship_response_data, market_response_data, system_response_data
+):
+    fast_decoder = resp_responses.default_json_decoder()
+    for payload in _payloads(
+        ship_response_data, market_response_data, system_response_data
+    ).values():
+        assert fast_decoder(payload) == json.loads(payload)
+
+
+@pytest.mark.benchmark
+def test_decoder_benchmark(
+    ship_response_data, market_response_data, system_response_data
+):
+    """the default decoder (orjson or msgspec when installed) shouldn't be slower than the stdlib"""
+    fast_decoder = resp_responses.default_json_decoder()
+    rounds = 200
+    for name, payload in _payloads(
+        ship_response_data, market_response_data, system_response_data
+    ).items():
+        timings = {}
+        for label, decoder in (("stdlib", json.loads), ("default", fast_decoder)):
+            start = time.perf_counter()
+            for _ in range(rounds):
+                decoder(payload)
+            timings[label] = time.perf_counter() - start
+        assert timings["default"] <= timings["stdlib"] * 1.5, (
+            f"{name} ({len(payload)} bytes): stdlib {timings['stdlib'] / rounds * 1e6:.0f}us, "
+            f"default {timings['default'] / rounds * 1e6:.0f}us"
+        )
+
+
+def _payloads(ship_response_data, market_response_data, system_response_data):
+    return {
+        "ships page": json.dumps(
+            {"data": [ship_response_data] * 20, "meta": {"total": 200}}
+        ).encode(),
+        "market": json.dumps({"data": market_response_data}).encode(),
+        "system": json.dumps({"data": system_response_data}).encode(),
+    }
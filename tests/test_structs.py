@@ -0,0 +1,145 @@
+import copy
+import json
+import time
+import pytest
+import requests
+import straders_sdk.request_consumer as rc
+from straders_sdk.client_api import SpaceTradersApiClient
+from straders_sdk.models_misc import Market, System, Waypoint
+from straders_sdk.models_ship import Ship
+
+msgspec = pytest.importorskip("msgspec")
+from straders_sdk import models_structs  # noqa: E402
+
+
+def _body(data) -> bytes:
+    return json.dumps({"data": data}).encode()
+
+
+def test_u_decode_ship(ship_response_data):
+    struct = models_structs.decode_ship(_body(ship_response_data))
+    ship = Ship.from_json(ship_response_data)
+    assert struct.symbol == ship.name
+    assert struct.nav.waypoint_symbol == ship.nav.waypoint_symbol
+    assert struct.nav.route.destination.symbol == ship.nav.destination.symbol
+    assert struct.frame.fuel_capacity == ship.frame.fuel_capacity
+    assert struct.engine.speed == ship.engine.speed
+    assert struct.fuel.current == ship.fuel_current
+    assert struct.cargo.units == ship.cargo_units_used
+    assert [m.symbol for m in struct.mounts] == [m.symbol for m in ship.mounts]
+    assert not hasattr(struct, "__dict__")
+
+    ships = models_structs.decode_ships(_body([ship_response_data] * 3))
+    assert [s.symbol for s in ships] == [ship.name] * 3
+
+
+def test_u_decode_market(market_response_data):
+    struct = models_structs.decode_market(_body(market_response_data))
+    market = Market.from_json(market_response_data)
+    assert struct.symbol == market.symbol
+    assert [g.symbol for g in struct.exports] == [g.symbol for g in market.exports]
+    assert [(l.symbol, l.purchase_price) for l in struct.trade_goods] == [
+        (l.symbol, l.purchase_price) for l in market.listings
+    ]
+
+
+def test_u_decode_waypoint_and_system(waypoint_response_data, system_response_data):
+    struct = models_structs.decode_waypoint(_body(waypoint_response_data))
+    wayp = Waypoint.from_json(waypoint_response_data)
+    assert struct.symbol == wayp.symbol
+    assert [t.symbol for t in struct.traits] == [t.symbol for t in wayp.traits]
+    assert [o.symbol for o in struct.orbitals] == wayp.orbital_symbols
+
+    system = models_structs.decode_system(_body(system_response_data))
+    assert system.sector_symbol == "X1"
+    assert len(system.waypoints) == len(system_response_data["waypoints"])
+
+
+def test_u_decode_rejects_bad_schema():
+    with pytest.raises(msgspec.ValidationError):
+        models_structs.decode_waypoint(_body({"symbol": "X1-TEST-A1"}))
+
+
+def test_u_from_json_leaves_input_alone(waypoint_response_data, system_response_data):
+    stub = {"systemSymbol": "X1-TEST", "symbol": "X1-TEST-A1", "type": "PLANET"}
+    stub.update(x=1, y=2)
+    original = copy.deepcopy(stub)
+    Waypoint.from_json(stub)
+    assert stub == original
+
+    original = copy.deepcopy(system_response_data)
+    System.from_json(system_response_data)
+    assert system_response_data == original
+
+
+@pytest.mark.benchmark
+def test_struct_decode_benchmark(ship_response_data, market_response_data):
+    """single-pass struct decoding vs json.loads + from_json, for a fleet and a market snapshot"""
+    cases = {
+        "fleet": (
+            _body([ship_response_data] * 20),
+            models_structs.decode_ships,
+            lambda b: [Ship.from_json(s) for s in json.loads(b)["data"]],
+        ),
+        "market": (
+            _body(market_response_data),
+            models_structs.decode_market,
+            lambda b: Market.from_json(json.loads(b)["data"]),
+        ),
+    }
+    rounds = 100
+    for name, (payload, fast, compat) in cases.items():
+        timings = {}
+        for label, decoder in (("from_json", compat), ("struct", fast)):
+            start = time.perf_counter()
+            for _ in range(rounds):
+                decoder(payload)
+            timings[label] = time.perf_counter() - start
+        assert timings["struct"] <= timings["from_json"], (
+            f"{name}: from_json {timings['from_json'] / rounds * 1e6:.0f}us, "
+            f"struct {timings['struct'] / rounds * 1e6:.0f}us"
+        )
+
+
+class _ShipPages:
+    "stands in for the consumer's session - /my/ships has 25 ships over two pages, and X1-BAD has no market"
+
+    def __init__(self, ship):
+        self.ship = ship
+        self.sent = []
+
+    def send(self, request, **kwargs):
+        self.sent.append(request.url)
+        response = requests.Response()
+        response.url = request.url
+        response.status_code = 200
+        if "/market" in request.url:
+            response.status_code = 404
+            body = {"error": {"message": "no market", "code": 404}}
+        elif "page=2" in request.url:
+            body = {"data": [self.ship] * 5, "meta": {"total": 25}}
+        elif "page=" in request.url:
+            body = {"data": [self.ship] * 20, "meta": {"total": 25}}
+        else:
+            body = {"data": self.ship}
+        response._content = json.dumps(body).encode()
+        return response
+
+
+def test_u_client_struct_views(ship_response_data):
+    """the client's struct views decode each body straight into structs, and still hand back failures"""
+    consumer = rc.get_consumer("structs-token", auto_start=False)
+    consumer._session = _ShipPages(ship_response_data)
+    client = SpaceTradersApiClient("structs-token")
+    try:
+        ships = client.ships_view_structs()
+        ship = client.ships_view_one_struct(ship_response_data["symbol"])
+        market = client.system_market_struct(
+            Waypoint("X1-BAD", "X1-BAD-A1", "PLANET", 0, 0)
+        )
+    finally:
+        consumer.stop()
+    assert len(ships) == 25
+    assert all(isinstance(s, models_structs.ShipStruct) for s in ships)
+    assert ship.symbol == ship_response_data["symbol"]
+    assert not market and market.error_code == 404
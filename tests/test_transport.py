@@ -0,0 +1,122 @@
+import socket
+from threading import Event
+import pytest
+import requests
+import straders_sdk.request_consumer as rc
+from straders_sdk.client_api import SpaceTradersApiClient
+from straders_sdk.transport import (
+    TransportConfig,
+    KeepAliveAdapter,
+    create_session,
+)
+
+
+class _RecordingSession(requests.Session):
+    "a real session that remembers what it sent, and with which timeout"
+
+    def __init__(self):
+        super().__init__()
+        self.sent = []
+
+    def send(self, request, **kwargs):
+        self.sent.append((request.url, kwargs.get("timeout")))
+        return super().send(request, **kwargs)
+
+
+def test_u_session_pool_and_keep_alive():
+    session = create_session(TransportConfig(pool_maxsize=4))
+    adapter = session.get_adapter("https://api.spacetraders.io/v2/")
+    assert isinstance(adapter, KeepAliveAdapter)
+    assert adapter._pool_maxsize == 4
+    assert adapter.max_retries.total == 0
+    options = adapter.poolmanager.connection_pool_kw["socket_options"]
+    assert (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1) in options
+
+    session = create_session(TransportConfig(keep_alive=False))
+    adapter = session.get_adapter("https://api.spacetraders.io/v2/")
+    assert "socket_options" not in adapter.poolmanager.connection_pool_kw
+
+
+class _ClosingSession(requests.Session):
+    def __init__(self):
+        super().__init__()
+        self.closed = Event()
+
+    def close(self):
+        super().close()
+        self.closed.set()
+
+
+def test_u_transport_for_existing_consumer():
+    """asking for an existing consumer with a transport applies it - and the replaced session is closed"""
+    consumer = rc.get_consumer("transport-swap-token", auto_start=False)
+    old_session = _ClosingSession()
+    consumer._session = old_session
+    transport = TransportConfig(max_in_flight=2, read_timeout=9)
+    assert (
+        rc.RequestConsumer(key="transport-swap-token", transport=transport) is consumer
+    )
+    assert consumer.transport == transport
+    assert consumer._session is not old_session
+    assert old_session.closed.wait(5)
+
+
+def test_u_consumer_reuses_connections(replay_server):
+    """sequential requests go down one pooled connection, with the configured timeouts"""
+    consumer = rc.get_consumer("transport-pool-token", auto_start=False)
+    consumer.configure_transport(TransportConfig(connect_timeout=2, read_timeout=7))
+    recorder = _RecordingSession()
+    consumer._session = recorder
+    consumer.start()
+    try:
+        for i in range(3):
+            request = requests.Request(
+                "GET", f"{replay_server.base_url}/v2/systems/X1-TEST?n={i}"
+            ).prepare()
+            package = consumer.put(rc.PackageedRequest(5, request, Event()))
+            assert package.event.wait(5)
+            assert package.response.status_code == 200
+    finally:
+        consumer.stop()
+    assert [timeout for _, timeout in recorder.sent] == [(2, 7)] * 3
+    manager = recorder.get_adapter(replay_server.base_url).poolmanager
+    pools = [manager.pools[key] for key in manager.pools.keys()]
+    assert [pool.num_connections for pool in pools] == [1]
+
+
+def test_u_session_is_wired_through(replay_server):
+    """a session handed to the client is the one the consumer sends with"""
+    session = _RecordingSession()
+    client = SpaceTradersApiClient(
+        "transport-session-token", replay_server.base_url, "v2", session=session
+    )
+    assert client.systems_view_one("X1-TEST")
+    assert client.waypoints_view_one("X1-TEST-A1")
+    assert [url.split("/v2/")[1] for url, _ in session.sent] == [
+        "systems/X1-TEST",
+        "systems/X1-TEST/waypoints/X1-TEST-A1",
+    ]
+
+
+def test_u_http2_session(replay_server):
+    """the httpx client hands back requests.Response objects, and raises requests' exceptions"""
+    pytest.importorskip("httpx")
+    session = create_session(TransportConfig(http2=True))
+    try:
+        request = requests.Request(
+            "GET", f"{replay_server.base_url}/v2/systems/X1-TEST"
+        ).prepare()
+        response = session.send(request, timeout=(2, 5))
+        assert isinstance(response, requests.Response)
+        assert response.status_code == 200
+        assert response.json()["data"]["symbol"] == "X1-TEST"
+        assert response.headers["X-RateLimit-Limit"] == "20"
+
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            closed_port = sock.getsockname()[1]
+        request = requests.Request("GET", f"http://127.0.0.1:{closed_port}/").prepare()
+        with pytest.raises(requests.ConnectionError):
+            session.send(request, timeout=(1, 1))
+    finally:
+        session.close()